@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Harvest arXiv's daily metadata over OAI-PMH instead of searching per keyword.
+
+Every keyword search scans the same small set of new submissions, so this
+module downloads the new metadata for the configured categories once,
+stores it locally, and lets fetch_papers.py match all keywords.md lines
+against it in-process. The number of requests depends on how many papers
+were announced, not on how many keywords there are.
+
+Harvests are incremental: the last harvest datestamp and any in-progress
+resumption token are persisted in the data directory, so an interrupted
+harvest picks up where it stopped.
+"""
+
+import json
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+import requests
+
+OAI_URL = "https://oaipmh.arxiv.org/oai"
+METADATA_PREFIX = "arXivRaw"
+
+NS = {
+    'oai': 'http://www.openarchives.org/OAI/2.0/',
+    'raw': 'http://arxiv.org/OAI/arXivRaw/',
+}
+
+# Archives that live under the physics set in arXiv's OAI set hierarchy
+PHYSICS_ARCHIVES = {
+    'astro-ph', 'cond-mat', 'gr-qc', 'hep-ex', 'hep-lat', 'hep-ph', 'hep-th',
+    'math-ph', 'nlin', 'nucl-ex', 'nucl-th', 'physics', 'quant-ph',
+}
+
+# Pause between resumption requests, and retries for 503 flow control
+REQUEST_DELAY = 3
+MAX_RETRIES = 5
+
+STATE_FILE = ".arxiv_harvest_state.json"
+STORE_DIR = "arxiv_harvest"
+
+
+def category_set(category):
+    """Map an arXiv category (cs.HC, astro-ph.GA, econ) to its OAI set spec"""
+    archive = category.split('.', 1)[0]
+    if archive in PHYSICS_ARCHIVES:
+        return f"physics:{archive}"
+    return archive
+
+
+def in_categories(paper_categories, categories):
+    """Check whether any of a paper's categories is selected by the config.
+
+    Entries with a dot (cs.HC) must match exactly; bare archives (econ)
+    select every category in that archive.
+    """
+    for category in paper_categories:
+        archive = category.split('.', 1)[0]
+        if category in categories or archive in categories:
+            return True
+    return False
+
+
+def load_harvest_state(data_dir):
+    """Load the persisted harvest state (last datestamp, resumption tokens)"""
+    state_file = Path(data_dir) / STATE_FILE
+    if state_file.exists():
+        with open(state_file, 'r') as f:
+            return json.load(f)
+    return {'sets': {}}
+
+
+def save_harvest_state(data_dir, state):
+    """Save harvest state, replacing the file atomically"""
+    state_file = Path(data_dir) / STATE_FILE
+    tmp_file = state_file.with_suffix('.tmp')
+    with open(tmp_file, 'w') as f:
+        json.dump(state, f, indent=2)
+    tmp_file.replace(state_file)
+
+
+def parse_record(record):
+    """Convert an OAI arXivRaw <record> element into a paper dict.
+
+    Returns None for deleted records.
+    """
+    header = record.find('oai:header', NS)
+    if header is None or header.get('status') == 'deleted':
+        return None
+
+    meta = record.find('oai:metadata/raw:arXivRaw', NS)
+    if meta is None:
+        return None
+
+    def text(tag):
+        value = meta.findtext(f'raw:{tag}', default='', namespaces=NS)
+        return ' '.join(value.split())
+
+    arxiv_id = text('id')
+    versions = meta.findall('raw:version', NS)
+    first_date = parsedate_to_datetime(versions[0].findtext('raw:date', namespaces=NS))
+    latest = versions[-1].get('version', 'v1')
+
+    return {
+        'title': text('title'),
+        'authors': text('authors'),
+        'year': first_date.year,
+        'abstract': text('abstract'),
+        'url': f"http://arxiv.org/abs/{arxiv_id}{latest}",
+        'pdf_url': f"http://arxiv.org/pdf/{arxiv_id}{latest}",
+        'source': 'arXiv',
+        'id': arxiv_id,
+        'published': first_date.isoformat(),
+        'categories': text('categories').split(),
+        'comment': text('comments'),
+        'journal_ref': text('journal-ref'),
+    }
+
+
+def _request(session, params):
+    """GET one OAI-PMH page, honoring 503 Retry-After flow control"""
+    for attempt in range(MAX_RETRIES):
+        resp = session.get(OAI_URL, params=params, timeout=60)
+        if resp.status_code == 503:
+            delay = int(resp.headers.get('Retry-After', 10 * (attempt + 1)))
+            print(f"    503 from OAI-PMH, retrying in {delay}s (attempt {attempt + 1}/{MAX_RETRIES})...", flush=True)
+            time.sleep(delay)
+            continue
+        resp.raise_for_status()
+        return ET.fromstring(resp.content)
+    raise RuntimeError(f"OAI-PMH still unavailable after {MAX_RETRIES} attempts")
+
+
+def harvest_set(session, set_spec, from_date, data_dir, state, limiter=None):
+    """Harvest one OAI set into the local store, resuming a saved token if present.
+
+    Args:
+        session: requests.Session to issue requests with
+        set_spec: OAI set spec (e.g. "cs", "physics:quant-ph")
+        from_date: First datestamp (YYYY-MM-DD) to harvest
+        data_dir: Research data directory
+        state: Harvest state dict (updated and saved after every page)
+        limiter: Optional TokenBucket pacing requests (default: REQUEST_DELAY)
+
+    Returns:
+        Number of records stored
+    """
+    set_state = state['sets'].setdefault(set_spec, {})
+    store_file = Path(data_dir) / STORE_DIR / f"{datetime.now().strftime('%Y-%m-%d')}.jsonl"
+    store_file.parent.mkdir(parents=True, exist_ok=True)
+
+    token = set_state.get('resumption_token') if set_state.get('token_from') == from_date else None
+    stored = 0
+    page = 0
+
+    while True:
+        if token:
+            params = {'verb': 'ListRecords', 'resumptionToken': token}
+        else:
+            params = {'verb': 'ListRecords', 'metadataPrefix': METADATA_PREFIX,
+                      'set': set_spec, 'from': from_date}
+
+        if limiter:
+            limiter.acquire()
+        elif page > 0:
+            time.sleep(REQUEST_DELAY)
+        page += 1
+
+        root = _request(session, params)
+        response_date = root.findtext('oai:responseDate', namespaces=NS)
+
+        error = root.find('oai:error', NS)
+        if error is not None:
+            code = error.get('code')
+            if code == 'noRecordsMatch':
+                set_state['last_datestamp'] = response_date[:10]
+                save_harvest_state(data_dir, state)
+                break
+            if code == 'badResumptionToken' and token:
+                # Token expired since the interrupted run; restart the window
+                print(f"    Resumption token for {set_spec} expired, restarting from {from_date}", flush=True)
+                token = None
+                continue
+            raise RuntimeError(f"OAI-PMH error for set {set_spec}: {code}: {error.text}")
+
+        list_records = root.find('oai:ListRecords', NS)
+        papers = [parse_record(r) for r in list_records.findall('oai:record', NS)]
+        papers = [p for p in papers if p]
+
+        with open(store_file, 'a') as f:
+            for paper in papers:
+                f.write(json.dumps(paper) + '\n')
+        stored += len(papers)
+
+        token_elem = list_records.find('oai:resumptionToken', NS)
+        token = token_elem.text if token_elem is not None and token_elem.text else None
+
+        print(f"    [{set_spec} page {page}] {len(papers)} records", flush=True)
+
+        # Persist progress so an interrupted harvest resumes from this page
+        set_state['resumption_token'] = token
+        set_state['token_from'] = from_date if token else None
+        if not token:
+            set_state['last_datestamp'] = response_date[:10]
+        save_harvest_state(data_dir, state)
+
+        if not token:
+            break
+
+    return stored
+
+
+def harvest(data_dir, categories, days_back=1, limiter=None, session=None):
+    """Harvest new metadata for the configured categories.
+
+    Each OAI set is harvested from its last completed datestamp (or
+    days_back days ago on the first run) up to now. session defaults to a
+    new requests.Session.
+
+    Returns:
+        Number of records stored by this harvest
+    """
+    state = load_harvest_state(data_dir)
+    default_from = (datetime.now() - timedelta(days=days_back)).strftime('%Y-%m-%d')
+
+    session = session or requests.Session()
+    total = 0
+    for set_spec in dict.fromkeys(category_set(c) for c in categories):
+        from_date = state['sets'].get(set_spec, {}).get('last_datestamp', default_from)
+        print(f"  Harvesting arXiv set '{set_spec}' from {from_date}...", flush=True)
+        total += harvest_set(session, set_spec, from_date, data_dir, state, limiter)
+
+    return total
+
+
+def load_harvested(data_dir, categories, days_back=1, keep_days=14):
+    """Load harvested papers first submitted in the last days_back days.
+
+    Reads the local store (newest record per arXiv ID wins) and prunes
+    store files older than keep_days.
+
+    Returns:
+        List of paper dicts, newest submissions first
+    """
+    store_dir = Path(data_dir) / STORE_DIR
+    if not store_dir.exists():
+        return []
+
+    today = datetime.now().date()
+    window_start = today - timedelta(days=max(days_back, 1))
+    papers = {}
+
+    for store_file in sorted(store_dir.glob('*.jsonl')):
+        file_date = datetime.strptime(store_file.stem, '%Y-%m-%d').date()
+        if (today - file_date).days > keep_days:
+            store_file.unlink()
+            continue
+        if file_date < window_start:
+            continue
+
+        with open(store_file, 'r') as f:
+            for line in f:
+                paper = json.loads(line)
+                papers[paper['id']] = paper
+
+    # Same window as search mode: papers from the last N days
+    recent = [
+        p for p in papers.values()
+        if in_categories(p['categories'], categories)
+        and (datetime.now() - datetime.fromisoformat(p['published']).replace(tzinfo=None)).days <= days_back
+    ]
+    recent.sort(key=lambda p: p['published'], reverse=True)
+    return recent
@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for fetch_papers.py.
+
+Throughput changes to the arXiv and Google Scholar searches could only be
+measured against the live APIs, with their rate limits and day-to-day
+variation. This harness runs the real fetch (run_fetch: search, seen
+filtering, dedupe, digest and store writing) against a local HTTP server
+that stands in for both services:
+
+- `/api/query` answers arXiv API requests with synthetic Atom feeds. Every
+  quoted phrase in the search_query gets `per_keyword` entries submitted
+  in the last day whose titles contain the phrase, plus two just outside
+  the window, so combined queries, windowed paging and keyword attribution
+  all do their usual work.
+- `/search` answers SerpAPI requests with synthetic `organic_results`.
+- Either can replay a recorded response instead (--arxiv-feed,
+  --scholar-json), served verbatim for every query.
+- Every response is delayed by `latency` seconds, and a seeded fraction
+  of requests fail with 429 or 503.
+
+Pacing is simulated: the token buckets, the arxiv client's delay between
+pages and the 429/503 back-off sleep on a virtual clock, so a run that
+would take hours live finishes in seconds while still issuing every
+request. The virtual sleep is reported, so "live" time is roughly wall
+time plus virtual sleep.
+
+Each scenario runs in its own process and reports end-to-end fetch time,
+requests issued (by source and status), virtual sleep and peak resident
+memory:
+
+    python3 benchmark_fetch.py                         # all scenarios
+    python3 benchmark_fetch.py keywords-100 --latency 0.05 --rate-429 0.01
+    python3 benchmark_fetch.py --save baseline.json    # record a baseline
+    python3 benchmark_fetch.py --baseline baseline.json  # compare with it
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import random
+import re
+import resource
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+import arxiv
+import serpapi.http
+
+import fetch_papers
+from fetch_checkpoint import FetchCheckpoint
+from rate_limiter import TokenBucket
+from seen_store import SeenStore, ARXIV, GOOGLE_SCHOLAR
+
+KEYWORDS_PER_TOPIC = 10
+
+SCENARIOS = {
+    'keywords-10': {'keywords': 10, 'seen': 0},
+    'keywords-100': {'keywords': 100, 'seen': 0},
+    'keywords-1000': {'keywords': 1000, 'seen': 0},
+    'seen-50k': {'keywords': 100, 'seen': 50000},
+}
+
+_PHRASE_RE = re.compile(r'"([^"]+)"')
+
+# Vocabulary for synthetic keywords and titles. Titles draw several words
+# from it, so unrelated papers share about as few shingles as real titles
+# do and duplicate detection sees a realistic candidate load.
+_WORDS = (
+    'adaptive', 'agents', 'algorithmic', 'analysis', 'attention', 'auditing', 'automation',
+    'bargaining', 'behavior', 'benchmarks', 'bias', 'budgeting', 'causal', 'clinical',
+    'coaching', 'cognition', 'collaborative', 'communities', 'compliance', 'consumers',
+    'creativity', 'crowds', 'curriculum', 'dashboards', 'decisions', 'deliberation', 'design',
+    'diffusion', 'discovery', 'economics', 'education', 'empirical', 'engagement', 'ethics',
+    'evaluation', 'experiments', 'explanations', 'fairness', 'feedback', 'field', 'forecasting',
+    'framework', 'governance', 'healthcare', 'heuristics', 'hiring', 'incentives', 'innovation',
+    'interfaces', 'interviews', 'journeys', 'knowledge', 'labor', 'leadership', 'learning',
+    'longitudinal', 'markets', 'measurement', 'meetings', 'mentoring', 'methods', 'metrics',
+    'models', 'motivation', 'negotiation', 'networks', 'onboarding', 'organizations', 'personas',
+    'platforms', 'practice', 'pricing', 'privacy', 'products', 'prototyping', 'qualitative',
+    'ranking', 'reasoning', 'retention', 'review', 'robustness', 'sensemaking', 'signals',
+    'simulation', 'startups', 'strategy', 'surveys', 'systems', 'teams', 'trust', 'users',
+    'workflows',
+)
+
+
+def synthetic_keyword(index):
+    """Distinct two-word phrase for the index-th synthetic keyword line"""
+    first = index % len(_WORDS)
+    second = (first + index // len(_WORDS) + 1) % len(_WORDS)
+    return f"{_WORDS[first]} {_WORDS[second]}"
+
+
+def synthetic_title(text, index):
+    """A title containing text plus filler words chosen by index"""
+    number = zlib.crc32(f"{text}\t{index}".encode('utf-8'))
+    words = [_WORDS[(number >> shift) % len(_WORDS)] for shift in (0, 6, 12, 18, 24)]
+    return f"{text}: {' '.join(words)}"
+
+
+def arxiv_url(phrase, index):
+    """Stable abs URL of the index-th synthetic entry for a phrase"""
+    number = zlib.crc32(f"{phrase}\t{index}".encode('utf-8'))
+    return f"http://arxiv.org/abs/{2600 + number % 12:04d}.{number % 100000:05d}v1"
+
+
+def scholar_url(keyword, index):
+    number = zlib.crc32(f"{keyword}\t{index}".encode('utf-8'))
+    return f"https://example.org/scholar/{number:08x}"
+
+
+class FakeSources:
+    """Local HTTP server standing in for the arXiv API and SerpAPI.
+
+    Args:
+        latency: Seconds to delay every response
+        rate_429: Fraction of requests answered with 429
+        rate_503: Fraction of requests answered with 503
+        per_keyword: Entries per quoted phrase (arXiv) or keyword (Scholar)
+        seed: Seed for the injected failures
+        arxiv_feed: Recorded Atom feed to serve for every arXiv query
+        scholar_json: Recorded SerpAPI response to serve for every search
+    """
+
+    def __init__(self, latency=0.01, rate_429=0.0, rate_503=0.0, per_keyword=5, seed=1,
+                 arxiv_feed=None, scholar_json=None):
+        self.latency = latency
+        self.rate_429 = rate_429
+        self.rate_503 = rate_503
+        self.per_keyword = per_keyword
+        self.arxiv_feed = Path(arxiv_feed).read_bytes() if arxiv_feed else None
+        self.scholar_json = Path(scholar_json).read_bytes() if scholar_json else None
+        self.requests = {}             # (source, status) -> count
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        sources = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                sources.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset(self):
+        with self._lock:
+            self.requests = {}
+
+    def handle(self, handler):
+        url = urlparse(handler.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        source = ARXIV if url.path == '/api/query' else GOOGLE_SCHOLAR
+
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.rate_429:
+            status, body, content_type = 429, b'Rate exceeded.', 'text/plain'
+        elif roll < self.rate_429 + self.rate_503:
+            status, body, content_type = 503, b'Service unavailable.', 'text/plain'
+        elif source == ARXIV:
+            status, body, content_type = 200, self.arxiv_response(params), 'application/atom+xml'
+        else:
+            status, body, content_type = 200, self.scholar_response(params), 'application/json'
+
+        with self._lock:
+            self.requests[(source, status)] = self.requests.get((source, status), 0) + 1
+
+        # Event.wait rather than time.sleep, which the benchmark virtualizes
+        threading.Event().wait(self.latency)
+        handler.send_response(status)
+        handler.send_header('Content-Type', content_type)
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def arxiv_response(self, params):
+        if self.arxiv_feed:
+            return self.arxiv_feed
+
+        phrases = _PHRASE_RE.findall(params.get('search_query', ''))
+        in_window = [(phrase, index) for index in range(self.per_keyword) for phrase in phrases]
+        older = [(phrase, self.per_keyword + index) for index in range(2) for phrase in phrases[:1]]
+        entries = in_window + older
+
+        start = int(params.get('start', 0))
+        page = entries[start:start + int(params.get('max_results', 10))]
+        now = datetime.now(timezone.utc)
+        step = timedelta(hours=20) / max(1, len(in_window))
+
+        xml = [
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/"'
+            ' xmlns:arxiv="http://arxiv.org/schemas/atom">\n'
+            f'<opensearch:totalResults>{len(entries)}</opensearch:totalResults>\n'
+            f'<opensearch:startIndex>{start}</opensearch:startIndex>\n'
+            f'<opensearch:itemsPerPage>{len(page)}</opensearch:itemsPerPage>\n'
+        ]
+        for position, (phrase, index) in enumerate(page, start):
+            published = now - (step * (position + 1) if position < len(in_window) else timedelta(days=1, hours=12))
+            stamp = published.strftime('%Y-%m-%dT%H:%M:%SZ')
+            url = arxiv_url(phrase, index)
+            xml.append(
+                f'<entry><id>{url}</id><updated>{stamp}</updated><published>{stamp}</published>'
+                f'<title>{escape(synthetic_title(phrase, index))}</title>'
+                f'<summary>A synthetic abstract about {escape(phrase)} for benchmarking paper {index}.</summary>'
+                f'<author><name>A Author{position}</name></author>'
+                f'<link href="{url}" rel="alternate" type="text/html"/>'
+                f'<link title="pdf" href="{url.replace("/abs/", "/pdf/")}" rel="related" type="application/pdf"/>'
+                '<arxiv:primary_category term="cs.HC"/><category term="cs.HC"/></entry>\n'
+            )
+        xml.append('</feed>\n')
+        return ''.join(xml).encode('utf-8')
+
+    def scholar_response(self, params):
+        if self.scholar_json:
+            return self.scholar_json
+
+        keyword = params.get('q', '')
+        title = keyword.replace('"', '')
+        year = datetime.now().year
+        results = [
+            {
+                'title': synthetic_title(title, index),
+                'link': scholar_url(keyword, index),
+                'snippet': f"Synthetic snippet {index} for benchmarking.",
+                'publication_info': {
+                    'summary': f"S Scholar{index} - Journal of Benchmarks, {year}",
+                    'authors': [{'name': f"S Scholar{index}"}],
+                },
+                'inline_links': {'cited_by': {'total': index}},
+            }
+            for index in range(min(self.per_keyword, int(params.get('num', 10))))
+        ]
+        return json.dumps({'organic_results': results}).encode('utf-8')
+
+
+class VirtualClock:
+    """Simulated time for sleeps, kept per thread.
+
+    Each thread's clock is the real monotonic clock plus everything that
+    thread has slept, so token buckets refill as if the sleeps had
+    happened while the worker threads still overlap in real time.
+    """
+
+    def __init__(self):
+        self._slept = {}
+        self._lock = threading.Lock()
+
+    def _offset(self):
+        return self._slept.get(threading.get_ident(), 0.0)
+
+    def monotonic(self):
+        return time.monotonic() + self._offset()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            with self._lock:
+                self._slept[threading.get_ident()] = self._offset() + seconds
+
+    @property
+    def slept(self):
+        """Longest virtual sleep of any thread (threads sleep concurrently)"""
+        return max(self._slept.values(), default=0.0)
+
+    def time_module(self):
+        """Stand-in for the time module whose sleep() is virtual"""
+        clock = self
+
+        class VirtualTime:
+            sleep = staticmethod(clock.sleep)
+
+            def __getattr__(self, name):
+                return getattr(time, name)
+
+        return VirtualTime()
+
+
+@contextlib.contextmanager
+def patched_fetch(url, clock):
+    """Point the fetch at the fake sources at url and put its sleeps on the clock"""
+    def limiter(config, section, default_interval):
+        source_config = config.get(section) or {}
+        return TokenBucket(
+            source_config.get('request_interval', default_interval),
+            source_config.get('request_burst', 1),
+            clock=clock.monotonic,
+            sleep=clock.sleep
+        )
+
+    virtual_time = clock.time_module()
+    with mock.patch.object(arxiv.Client, 'query_url_format', f"{url}/api/query?{{}}"), \
+            mock.patch.object(serpapi.http.HTTPClient, 'BASE_DOMAIN', url), \
+            mock.patch.object(arxiv, 'time', virtual_time), \
+            mock.patch.object(fetch_papers, 'time', virtual_time), \
+            mock.patch.object(fetch_papers, 'source_limiter', limiter):
+        yield
+
+
+def scenario_topics(keywords):
+    """keywords.md-style topics of KEYWORDS_PER_TOPIC synthetic keyword lines"""
+    topics = {}
+    for index in range(keywords):
+        topic = f"Benchmark Topic {index // KEYWORDS_PER_TOPIC + 1}"
+        topics.setdefault(topic, []).append(f'"{synthetic_keyword(index)}"')
+    return topics
+
+
+def seed_seen(data_dir, topics, count, per_keyword):
+    """Fill the seen store with count URLs, including half of each keyword's arXiv results"""
+    urls = [
+        arxiv_url(phrase, index)
+        for keywords in topics.values() for keyword in keywords
+        for phrase in _PHRASE_RE.findall(keyword) for index in range(per_keyword // 2)
+    ][:count]
+    urls += [f"http://arxiv.org/abs/seen.{index:06d}" for index in range(count - len(urls))]
+
+    store = SeenStore(data_dir)
+    store.add(urls, ARXIV)
+    store.add([f"https://example.org/seen/{index:06d}" for index in range(count // 10)], GOOGLE_SCHOLAR)
+    store.close()
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+
+def _fetch_in_child(config, topics, checkpoint, url, verbose, conn):
+    clock = VirtualClock()
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    start_mb = peak_rss_mb()
+
+    start = time.perf_counter()
+    with patched_fetch(url, clock), output:
+        fetch_papers.run_fetch(config, topics, checkpoint)
+    elapsed = time.perf_counter() - start
+
+    conn.send({'seconds': elapsed, 'virtual_sleep': clock.slept, 'peak_mb': peak_rss_mb(), 'start_mb': start_mb})
+    conn.close()
+
+
+def run_scenario(name, spec, sources, weekly=True, verbose=False):
+    """Run one scenario in a fresh research root and return its measurements.
+
+    The fetch runs in a forked child process, so its peak memory is
+    measured on its own and nothing (seen stores, caches) carries over
+    between scenarios.
+    """
+    with tempfile.TemporaryDirectory(prefix='fetch-bench-') as root:
+        config = {
+            'paths': {'research_root': root, 'daily_digests': 'daily-digests', 'data': '.research-data'},
+            'arxiv': {'max_results': 10, 'days_back': 1},
+            'google_scholar': {'max_results': 10, 'search_days': 7},
+            'serpapi': {'api_key': 'benchmark'},
+        }
+        data_dir = Path(root) / '.research-data'
+        topics = scenario_topics(spec['keywords'])
+        if spec['seen']:
+            seed_seen(data_dir, topics, spec['seen'], sources.per_keyword)
+
+        checkpoint = FetchCheckpoint(data_dir)
+        checkpoint.start(datetime.now().strftime('%Y-%m-%d'), 1, weekly)
+        sources.reset()
+
+        context = multiprocessing.get_context('fork')
+        receiver, sender = context.Pipe(duplex=False)
+        child = context.Process(target=_fetch_in_child, args=(config, topics, checkpoint, sources.url, verbose, sender))
+        child.start()
+        sender.close()
+        try:
+            measured = receiver.recv()
+        except EOFError:
+            child.join()
+            raise RuntimeError(f"Scenario {name} failed (exit code {child.exitcode})")
+        child.join()
+
+        with open(data_dir / 'metrics' / 'fetch_runs.jsonl', 'r') as f:
+            run = json.loads(f.readlines()[-1])
+
+    requests_by_status = {}
+    for (source, status), count in sorted(sources.requests.items()):
+        requests_by_status.setdefault(source, {})[str(status)] = count
+
+    return {
+        'scenario': name,
+        'keywords': spec['keywords'],
+        'seen': spec['seen'],
+        'seconds': round(measured['seconds'], 3),
+        'virtual_sleep': round(measured['virtual_sleep'], 1),
+        'requests': sum(sources.requests.values()),
+        'requests_by_status': requests_by_status,
+        'peak_mb': round(measured['peak_mb'], 1),
+        'start_mb': round(measured['start_mb'], 1),
+        'kept': run['run']['kept'],
+        'aborted': run['aborted'],
+    }
+
+
+def print_results(results, baseline=None):
+    baseline = {result['scenario']: result for result in baseline or []}
+
+    def delta(result, field):
+        before = baseline.get(result['scenario'], {}).get(field)
+        if not before:
+            return ''
+        return f" ({(result[field] - before) / before:+.0%})"
+
+    print(f"{'scenario':<15} {'seconds':>16} {'requests':>16} {'peak MB':>16} {'virtual sleep':>14} {'kept':>6}")
+    for result in results:
+        print(
+            f"{result['scenario']:<15}"
+            f" {str(result['seconds']) + delta(result, 'seconds'):>16}"
+            f" {str(result['requests']) + delta(result, 'requests'):>16}"
+            f" {str(result['peak_mb']) + delta(result, 'peak_mb'):>16}"
+            f" {result['virtual_sleep']:>13.0f}s"
+            f" {result['kept']:>6}"
+            + ("  ABORTED" if result['aborted'] else '')
+        )
+        statuses = ', '.join(
+            f"{source} " + '/'.join(f"{count}x{status}" for status, count in counts.items())
+            for source, counts in result['requests_by_status'].items()
+        )
+        print(f"{'':<15} {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fetch_papers.py against local fake arXiv and SerpAPI servers.")
+    parser.add_argument('scenarios', nargs='*', metavar='SCENARIO',
+                        help=f"Scenarios to run ({', '.join(SCENARIOS)}; default: all)")
+    parser.add_argument('--latency', type=float, default=0.01, help="Seconds added to every response (default: 0.01)")
+    parser.add_argument('--rate-429', type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument('--rate-503', type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument('--per-keyword', type=int, default=5, help="Results per keyword per day (default: 5)")
+    parser.add_argument('--seed', type=int, default=1, help="Seed for injected failures")
+    parser.add_argument('--arxiv-feed', help="Recorded Atom feed to serve for every arXiv query")
+    parser.add_argument('--scholar-json', help="Recorded SerpAPI response to serve for every search")
+    parser.add_argument('--daily', action='store_true', help="Search arXiv only (default: a Sunday run with Google Scholar)")
+    parser.add_argument('--save', help="Write results as JSON to this file")
+    parser.add_argument('--baseline', help="Compare with results saved by --save")
+    parser.add_argument('--verbose', action='store_true', help="Show the fetch output")
+    args = parser.parse_args()
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)['results']
+
+    results = []
+    with FakeSources(args.latency, args.rate_429, args.rate_503, args.per_keyword, args.seed,
+                     args.arxiv_feed, args.scholar_json) as sources:
+        for name in args.scenarios or SCENARIOS:
+            print(f"Running {name}...", flush=True)
+            results.append(run_scenario(name, SCENARIOS[name], sources, weekly=not args.daily, verbose=args.verbose))
+
+    print()
+    print_results(results, baseline)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'date': datetime.now().isoformat(), 'options': vars(args), 'results': results}, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the Sources/ scan in monitor_sources.py.
+
+Builds synthetic research trees of increasing size (topic folders with
+Sources/ and Notes/ folders full of small, distinct PDFs) in a temporary directory
+and times, for each size:
+
+- full walk: the scan monitor_sources.py did before the snapshot index
+  (list every topic folder, glob every Sources/ folder, check each PDF
+  against the processed list loaded from JSON)
+- cold: the first indexed scan, which lists and hashes everything and
+  builds the index
+- warm: an indexed scan with nothing changed
+- one new: an indexed scan after one PDF was added to one topic
+
+    python3 benchmark_sources.py                        # 1k, 10k and 50k PDFs
+    python3 benchmark_sources.py --sizes 1000 100000 --topics 200
+    python3 benchmark_sources.py --root /Volumes/Drive/tmp   # on a synced drive
+
+Timings are the median of --repeat runs and include opening the index.
+"""
+
+import argparse
+import json
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from monitor_sources import find_new_pdfs
+from source_index import SourceIndex, SKIP_DIRS
+
+
+def build_tree(root, pdfs, topics):
+    """Create topics x (pdfs / topics) small PDFs, half of them with a note"""
+    per_topic = max(1, pdfs // topics)
+    for t in range(topics):
+        sources = root / f"Topic {t:04d}" / 'Sources'
+        notes = root / f"Topic {t:04d}" / 'Notes'
+        sources.mkdir(parents=True)
+        notes.mkdir()
+        for i in range(per_topic):
+            (sources / f"paper-{i:06d}.pdf").write_bytes(f"%PDF-1.4 topic {t} paper {i}\n".encode())
+            if i % 2:
+                (notes / f"paper-{i:06d}.md").touch()
+    (root / '.research-data').mkdir()
+    return per_topic * topics
+
+
+def full_walk(research_root, processed_file):
+    """The scan as it was before the snapshot index"""
+    with open(processed_file, 'r') as f:
+        processed = set(json.load(f))
+    new_pdfs = []
+    for topic_dir in research_root.iterdir():
+        if not topic_dir.is_dir() or topic_dir.name in SKIP_DIRS:
+            continue
+        sources_dir = topic_dir / 'Sources'
+        if not sources_dir.exists():
+            continue
+        for pdf_file in sources_dir.glob('*.pdf'):
+            pdf_id = str(pdf_file.absolute())
+            if pdf_id not in processed:
+                new_pdfs.append((pdf_file, (topic_dir / 'Notes' / f"{pdf_file.stem}.md").exists(), pdf_id))
+    return new_pdfs
+
+
+def indexed_scan(research_root, data_dir):
+    index = SourceIndex(data_dir)
+    try:
+        new_pdfs, _ = find_new_pdfs(research_root, index)
+        index.mark_processed(
+            (str(pdf_path) for pdf_path, _, _, _ in new_pdfs),
+            hashes={str(pdf_path): pdf_id for pdf_path, _, pdf_id, _ in new_pdfs}
+        )
+        return new_pdfs
+    finally:
+        index.close()
+
+
+def timed(function, repeat=1, before=None):
+    times = []
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def run_size(base, pdfs, topics, repeat):
+    root = Path(tempfile.mkdtemp(prefix='sources-bench-', dir=base)).resolve()
+    try:
+        total = build_tree(root, pdfs, topics)
+        data_dir = root / '.research-data'
+        processed_file = data_dir / 'processed.json'
+        processed_file.write_text(json.dumps([
+            str(path) for path in root.glob('*/Sources/*.pdf')
+        ]))
+
+        # Let directory mtimes age past the index's racy window
+        time.sleep(2.1)
+        result = {'pdfs': total, 'topics': topics}
+        result['full walk'] = timed(lambda: full_walk(root, processed_file), repeat)
+        result['cold'] = timed(lambda: indexed_scan(root, data_dir), 1)
+        result['warm'] = timed(lambda: indexed_scan(root, data_dir), repeat)
+
+        counter = iter(range(repeat))
+
+        def add_pdf():
+            n = next(counter)
+            (root / 'Topic 0000' / 'Sources' / f"new-{n}.pdf").write_bytes(f"%PDF-1.4 new {n}\n".encode())
+
+        result['one new'] = timed(lambda: indexed_scan(root, data_dir), repeat, before=add_pdf)
+        return result
+    finally:
+        shutil.rmtree(root)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the Sources/ scan against research tree size.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000], help="Total PDFs per tree")
+    parser.add_argument('--topics', type=int, default=50, help="Topic folders per tree (default: 50)")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per timing (median is reported)")
+    parser.add_argument('--root', help="Directory to build the trees in (default: system temp)")
+    args = parser.parse_args()
+
+    columns = ('full walk', 'cold', 'warm', 'one new')
+    print(f"{'PDFs':>8} {'topics':>7}" + ''.join(f" {column:>12}" for column in columns))
+    for size in args.sizes:
+        result = run_size(args.root, size, args.topics, args.repeat)
+        print(f"{result['pdfs']:>8} {result['topics']:>7}"
+              + ''.join(f" {result[column] * 1000:>10.1f}ms" for column in columns), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate detection across sources and against past digests.
+
+arXiv results are keyed by entry_id and Scholar results by link, so the
+same paper could appear twice on a Sunday: once from arXiv and once from
+Scholar's publisher (or arxiv.org) link. Exact URL matching can't catch
+that, and comparing every new paper with every past one doesn't scale.
+
+Papers are matched on their normalized title and first author's surname.
+Titles are reduced to character shingles and summarized with MinHash;
+locality-sensitive hashing (LSH) splits each signature into bands, and
+only papers sharing a band become candidates, which are then confirmed
+by exact shingle Jaccard similarity. An arXiv ID in either URL is an
+exact match on its own.
+
+Within a topic, duplicates are merged: the arXiv record is kept (abstract,
+PDF link) and takes the Scholar citation count. Against earlier topics and
+past digests, duplicates are dropped. Past digests are indexed in
+`.dedupe_index.db`; band keys are indexed, so lookups stay constant-time
+as years of history accumulate.
+"""
+
+import re
+import sqlite3
+import threading
+import unicodedata
+import zlib
+from pathlib import Path
+
+from digest_store import ARXIV_ID_RE, query_papers
+
+DB_FILE = ".dedupe_index.db"
+
+SHINGLE_SIZE = 5
+NUM_PERM = 32
+BANDS = 8                  # 8 bands x 4 rows: pairs above ~0.6 similarity become candidates
+ROWS = NUM_PERM // BANDS
+DEFAULT_TITLE_SIMILARITY = 0.8
+
+_PRIME = (1 << 61) - 1
+# Fixed (a, b) pairs so signatures stay comparable across runs
+_PERMUTATIONS = [
+    ((i * 0x9E3779B97F4A7C15 + 1) % _PRIME or 1, (i * 0xBF58476D1CE4E5B9 + 7) % _PRIME)
+    for i in range(1, NUM_PERM + 1)
+]
+
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_title(title):
+    """Lowercase, strip accents and punctuation, collapse whitespace"""
+    text = unicodedata.normalize('NFKD', title or '').encode('ascii', 'ignore').decode('ascii')
+    return _NON_ALNUM_RE.sub(' ', text.lower()).strip()
+
+
+def first_author_key(authors):
+    """Surname of the first author ("J Smith", "John Smith, Jane Doe" -> "smith")"""
+    first = (authors or '').split(',')[0]
+    words = normalize_title(first).split()
+    if not words or words[-1] == 'unknown':
+        return ''
+    return words[-1]
+
+
+def arxiv_id(paper):
+    match = ARXIV_ID_RE.search(paper.get('url') or '')
+    return match.group(1) if match else ''
+
+
+def shingles(title):
+    """Set of character shingles of a normalized title"""
+    text = title.replace(' ', '')
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash(shingle_set):
+    """MinHash signature (NUM_PERM ints) of a shingle set"""
+    hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingle_set]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def band_keys(signature):
+    """LSH band keys ("band:hash") of a signature"""
+    return [
+        f"{band}:{zlib.crc32(repr(signature[band * ROWS:(band + 1) * ROWS]).encode('utf-8')):08x}"
+        for band in range(BANDS)
+    ]
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class Fingerprint:
+    """Normalized identity of a paper for duplicate checks"""
+
+    def __init__(self, paper):
+        self.title = normalize_title(paper.get('title'))
+        self.author = first_author_key(paper.get('authors'))
+        self.arxiv_id = arxiv_id(paper)
+        self.shingles = shingles(self.title)
+        self.bands = band_keys(minhash(self.shingles)) if self.shingles else []
+
+    def matches(self, other, threshold=DEFAULT_TITLE_SIMILARITY):
+        if self.arxiv_id and self.arxiv_id == other.arxiv_id:
+            return True
+        if self.author and other.author and self.author != other.author:
+            return False
+        # Without an author to compare, require near-identical titles
+        if not (self.author and other.author):
+            threshold = max(threshold, 0.9)
+        return jaccard(self.shingles, other.shingles) >= threshold
+
+
+def merge(papers):
+    """Merge duplicate paper dicts, preferring the arXiv record.
+
+    The result keeps the arXiv URL, abstract and PDF link, the highest
+    citation count, and every matched keyword.
+    """
+    papers = sorted(papers, key=lambda paper: paper['source'] != 'arXiv')
+    merged = dict(papers[0])
+    for other in papers[1:]:
+        if other.get('citations'):
+            merged['citations'] = max(merged.get('citations') or 0, other['citations'])
+        if 'pdf_url' not in merged and other.get('pdf_url'):
+            merged['pdf_url'] = other['pdf_url']
+        for keyword in other.get('keywords') or []:
+            if keyword not in merged.setdefault('keywords', []):
+                merged['keywords'].append(keyword)
+    merged['sources'] = sorted({paper['source'] for paper in papers})
+    return merged
+
+
+def merge_duplicates(papers, threshold=DEFAULT_TITLE_SIMILARITY):
+    """Merge near-duplicates within a list of papers, keeping first-seen order"""
+    fingerprints = [Fingerprint(paper) for paper in papers]
+    buckets = {}
+    groups = []            # list of indexes per group
+    group_of = {}
+
+    for index, fingerprint in enumerate(fingerprints):
+        candidates = set()
+        for key in fingerprint.bands + ([f"id:{fingerprint.arxiv_id}"] if fingerprint.arxiv_id else []):
+            candidates.update(buckets.setdefault(key, []))
+
+        group = next(
+            (group_of[other] for other in sorted(candidates)
+             if fingerprint.matches(fingerprints[other], threshold)),
+            None
+        )
+        if group is None:
+            group = len(groups)
+            groups.append([])
+        groups[group].append(index)
+        group_of[index] = group
+
+        for key in fingerprint.bands + ([f"id:{fingerprint.arxiv_id}"] if fingerprint.arxiv_id else []):
+            buckets[key].append(index)
+
+    return [
+        papers[group[0]] if len(group) == 1 else merge([papers[index] for index in group])
+        for group in groups
+    ]
+
+
+class DedupeIndex:
+    """LSH index of every paper already written to a digest, backed by SQLite.
+
+    Safe to share between threads. On first use it is filled from the
+    digest store (digest_store.py).
+    """
+
+    def __init__(self, data_dir, threshold=DEFAULT_TITLE_SIMILARITY):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.data_dir / DB_FILE, check_same_thread=False)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS papers ("
+            " id INTEGER PRIMARY KEY,"
+            " url TEXT NOT NULL,"
+            " title TEXT NOT NULL,"
+            " author TEXT NOT NULL,"
+            " arxiv_id TEXT NOT NULL,"
+            " date TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS bands ("
+            " key TEXT NOT NULL,"
+            " paper INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS bands_key ON bands (key);"
+            "CREATE INDEX IF NOT EXISTS papers_arxiv_id ON papers (arxiv_id);"
+        )
+        self._unique_papers()
+        self._conn.commit()
+
+        if self._conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0] == 0:
+            self._import_digest_store()
+
+    def _unique_papers(self):
+        """Index each (url, date) once, dropping rows added twice before it was enforced"""
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'papers_url_date'"
+        ).fetchone()
+        if exists:
+            return
+        keep = "SELECT MIN(id) FROM papers GROUP BY url, date"
+        self._conn.execute(f"DELETE FROM bands WHERE paper NOT IN ({keep})")
+        self._conn.execute(f"DELETE FROM papers WHERE id NOT IN ({keep})")
+        self._conn.execute("CREATE UNIQUE INDEX papers_url_date ON papers (url, date)")
+
+    def _import_digest_store(self):
+        by_date = {}
+        for record in query_papers(self.data_dir):
+            by_date.setdefault(record['date'], []).append(record)
+        for date, records in by_date.items():
+            self.add(records, date)
+        if by_date:
+            print(f"  Indexed {sum(len(r) for r in by_date.values())} past digest papers for duplicate detection", flush=True)
+
+    def find(self, paper):
+        """Return (url, date) of a past digest paper this one duplicates, or None.
+
+        A paper with the same URL is the same record (e.g. a topic rewritten
+        by a resumed run), not a duplicate.
+        """
+        fingerprint = Fingerprint(paper)
+        url = paper.get('url', '')
+
+        with self._lock:
+            rows = []
+            if fingerprint.arxiv_id:
+                rows += self._conn.execute(
+                    "SELECT url, title, author, arxiv_id, date FROM papers WHERE arxiv_id = ?",
+                    (fingerprint.arxiv_id,)
+                ).fetchall()
+            if fingerprint.bands:
+                placeholders = ','.join('?' * len(fingerprint.bands))
+                rows += self._conn.execute(
+                    "SELECT DISTINCT p.url, p.title, p.author, p.arxiv_id, p.date FROM bands b"
+                    f" JOIN papers p ON p.id = b.paper WHERE b.key IN ({placeholders})",
+                    fingerprint.bands
+                ).fetchall()
+
+        for row_url, title, author, row_arxiv_id, date in rows:
+            if row_url == url:
+                continue
+            other = Fingerprint({'title': title})
+            other.author = author
+            other.arxiv_id = row_arxiv_id
+            if fingerprint.matches(other, self.threshold):
+                return row_url, date
+        return None
+
+    def add(self, papers, date):
+        """Index papers written to the digest for date.
+
+        A paper already indexed for date (a topic rewritten by a resumed
+        run) is left as it is.
+        """
+        with self._lock, self._conn:
+            for paper in papers:
+                fingerprint = Fingerprint(paper)
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO papers (url, title, author, arxiv_id, date) VALUES (?, ?, ?, ?, ?)",
+                    (paper.get('url', ''), fingerprint.title, fingerprint.author, fingerprint.arxiv_id, date)
+                )
+                if not cursor.rowcount:
+                    continue
+                self._conn.executemany(
+                    "INSERT INTO bands (key, paper) VALUES (?, ?)",
+                    ((key, cursor.lastrowid) for key in fingerprint.bands)
+                )
+
+    def close(self):
+        self._conn.close()
+
+
+def dedupe_topic(index, papers, date):
+    """Merge a topic's cross-source duplicates and drop papers already in a digest.
+
+    Returns:
+        (papers to write, number merged, number dropped as already shown)
+    """
+    merged = merge_duplicates(papers, index.threshold)
+    kept = [paper for paper in merged if not index.find(paper)]
+    index.add(kept, date)
+    return kept, len(papers) - len(merged), len(merged) - len(kept)
+
+
+def get_dedupe_index(config):
+    """Return a DedupeIndex for the config, or None if dedupe.enabled is false"""
+    dedupe_config = config.get('dedupe') or {}
+    if not dedupe_config.get('enabled', True):
+        return None
+
+    research_root = Path(config['paths']['research_root']).expanduser().resolve()
+    data_dir = research_root / config['paths']['data']
+    return DedupeIndex(data_dir, dedupe_config.get('title_similarity', DEFAULT_TITLE_SIMILARITY))
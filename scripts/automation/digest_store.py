@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Machine-readable store of every paper written to a daily digest.
+
+The markdown digest is for reading; downstream stages (filtering, research
+digests) had to re-parse it by splitting on `## ` and `### ` headers. Each
+run now also appends its papers to `<data>/digest_store/YYYY-MM-DD.jsonl`,
+one JSON record per paper with a stable ID, the digest date, topic, source
+and matched keyword(s). Filter decisions are kept next to it in
+`YYYY-MM-DD.filter.json`, so "not yet filtered" is a cheap lookup.
+
+Query from Python:
+
+    from digest_store import query_papers
+    for paper in query_papers(data_dir, start='2025-11-01', topic='Discovery', unfiltered=True):
+        ...
+
+or from the command line (prints JSONL):
+
+    python3 digest_store.py --from 2025-11-01 --to 2025-11-30 --source arXiv
+    python3 digest_store.py --date 2025-11-09 --unfiltered
+    python3 digest_store.py --date 2025-11-09 --mark-kept ID... --mark-removed ID...
+
+Only the files for the requested dates are opened, so multi-month queries
+stay fast.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+import yaml
+
+STORE_DIR = "digest_store"
+
+# Paper dict fields copied into store records
+PAPER_FIELDS = (
+    'title', 'authors', 'year', 'abstract', 'snippet', 'url', 'pdf_url',
+    'citations', 'published', 'keywords', 'relevance', 'sources',
+)
+
+ARXIV_ID_RE = re.compile(r'arxiv\.org/abs/(.+?)(v\d+)?$')
+
+
+def paper_id(paper):
+    """Stable ID for a paper: "arxiv:<id>" without version, else a hash of its URL"""
+    match = ARXIV_ID_RE.search(paper.get('url', ''))
+    if match:
+        return f"arxiv:{match.group(1)}"
+    digest = hashlib.sha1(paper.get('url', paper.get('title', '')).encode('utf-8')).hexdigest()
+    return f"url:{digest[:16]}"
+
+
+def store_dir(data_dir):
+    return Path(data_dir) / STORE_DIR
+
+
+def append_papers(data_dir, date, topic, papers):
+    """Append a topic's digest papers to the day's store file (with fsync)"""
+    if not papers:
+        return
+    path = store_dir(data_dir) / f"{date}.jsonl"
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, 'a') as f:
+        for paper in papers:
+            record = {'id': paper_id(paper), 'date': date, 'topic': topic, 'source': paper['source']}
+            record.update({field: paper[field] for field in PAPER_FIELDS if field in paper})
+            f.write(json.dumps(record) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def store_dates(data_dir, start=None, end=None):
+    """Dates (YYYY-MM-DD) with a store file, oldest first, within [start, end]"""
+    directory = store_dir(data_dir)
+    if not directory.exists():
+        return []
+    dates = sorted(path.stem for path in directory.glob('*.jsonl'))
+    return [date for date in dates if (not start or date >= start) and (not end or date <= end)]
+
+
+def load_filter_marks(data_dir, date):
+    """Filter decisions for a day, as {paper id: True (kept) / False (removed)}"""
+    path = store_dir(data_dir) / f"{date}.filter.json"
+    if not path.exists():
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def mark_filtered(data_dir, date, kept=(), removed=()):
+    """Record filter decisions for papers in a day's digest"""
+    marks = load_filter_marks(data_dir, date)
+    marks.update({paper: True for paper in kept})
+    marks.update({paper: False for paper in removed})
+
+    path = store_dir(data_dir) / f"{date}.filter.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(marks, f, indent=2)
+    tmp_path.replace(path)
+
+
+def query_papers(data_dir, start=None, end=None, topic=None, source=None, unfiltered=False):
+    """Yield stored paper records matching every given criterion.
+
+    Args:
+        data_dir: Research data directory
+        start: First digest date (YYYY-MM-DD), inclusive
+        end: Last digest date (YYYY-MM-DD), inclusive
+        topic: Only papers in this topic
+        source: Only papers from this source ('arXiv' or 'Google Scholar')
+        unfiltered: Only papers with no filter decision yet
+
+    Yields:
+        Record dicts, by date then digest order. Each record carries
+        'filtered': True (kept), False (removed) or None.
+    """
+    for date in store_dates(data_dir, start, end):
+        marks = load_filter_marks(data_dir, date)
+
+        # A resumed run may rewrite a topic; the last record per ID wins
+        records = {}
+        with open(store_dir(data_dir) / f"{date}.jsonl", 'r') as f:
+            for line in f:
+                record = json.loads(line)
+                records.pop(record['id'], None)
+                records[record['id']] = record
+
+        for record in records.values():
+            if topic and record['topic'] != topic:
+                continue
+            if source and record['source'] != source:
+                continue
+            record['filtered'] = marks.get(record['id'])
+            if unfiltered and record['filtered'] is not None:
+                continue
+            yield record
+
+
+def load_config():
+    """Load configuration from config.yaml"""
+    config_path = Path.home() / ".claude" / "research-system-config" / "config.yaml"
+
+    if not config_path.exists():
+        raise FileNotFoundError(
+            f"Config file not found at {config_path}\n"
+            f"Please create ~/.claude/research-system-config/config.yaml\n"
+            f"See the plugin's config/config.template.yaml for reference."
+        )
+
+    with open(config_path, 'r') as f:
+        return yaml.safe_load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the structured digest store (prints JSONL).")
+    parser.add_argument('--date', help="Single digest date (YYYY-MM-DD)")
+    parser.add_argument('--from', dest='start', help="First digest date (YYYY-MM-DD)")
+    parser.add_argument('--to', dest='end', help="Last digest date (YYYY-MM-DD)")
+    parser.add_argument('--topic', help="Only this topic")
+    parser.add_argument('--source', help="Only this source (arXiv, Google Scholar)")
+    parser.add_argument('--unfiltered', action='store_true', help="Only papers not yet filtered")
+    parser.add_argument('--mark-kept', nargs='+', default=[], metavar='ID', help="Mark papers as kept by the filter (needs --date)")
+    parser.add_argument('--mark-removed', nargs='+', default=[], metavar='ID', help="Mark papers as removed by the filter (needs --date)")
+    args = parser.parse_args()
+
+    config = load_config()
+    research_root = Path(config['paths']['research_root']).expanduser().resolve()
+    data_dir = research_root / config['paths']['data']
+
+    if args.mark_kept or args.mark_removed:
+        if not args.date:
+            parser.error("--mark-kept/--mark-removed need --date")
+        mark_filtered(data_dir, args.date, args.mark_kept, args.mark_removed)
+        print(f"Marked {len(args.mark_kept)} kept, {len(args.mark_removed)} removed for {args.date}")
+        return
+
+    start = args.date or args.start
+    end = args.date or args.end
+    for record in query_papers(data_dir, start, end, args.topic, args.source, args.unfiltered):
+        sys.stdout.write(json.dumps(record) + '\n')
+
+
+if __name__ == "__main__":
+    main()
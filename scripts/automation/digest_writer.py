@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Streaming, crash-safe writer for the markdown daily digest.
+
+The digest used to be built in memory after every topic had finished and
+written once at the end, so a crash or kill late in a long run left no
+digest at all even though the papers were already marked as seen.
+
+DigestWriter appends each topic's section to a `<date>.md.part` file (with
+fsync) as soon as that topic is finished, and after every section
+republishes `<date>.md` through a temp file, fsync and atomic rename. The
+published digest is therefore always complete up to the last finished
+topic. finalize() writes the final header and summary and puts the
+sections in keywords.md order. Sections are copied from the .part file one
+at a time, so memory does not grow with the number of papers.
+
+Section offsets are recorded in the fetch checkpoint, so a resumed run
+truncates the .part file to the last recorded section and carries on.
+"""
+
+import os
+from pathlib import Path
+
+
+def format_paper(paper):
+    """Render one paper dict as a digest entry"""
+    content = [f"\n### {paper['title']}\n"]
+    content.append(f"**Authors:** {paper['authors']}  \n")
+    content.append(f"**Year:** {paper['year']}")
+
+    # Scholar papers, and arXiv papers merged with their Scholar duplicate
+    if paper.get('citations'):
+        content.append(f" | **Citations:** {paper['citations']}")
+
+    content.append("  \n")
+
+    # Add abstract or snippet
+    if 'abstract' in paper:
+        # Truncate long abstracts
+        abstract = paper['abstract'][:300] + '...' if len(paper['abstract']) > 300 else paper['abstract']
+        content.append(f"**Abstract:** {abstract}\n")
+    elif 'snippet' in paper:
+        content.append(f"**Snippet:** {paper['snippet']}\n")
+
+    # Add links
+    links = [f"[View Paper]({paper['url']})"]
+    if 'pdf_url' in paper:
+        links.append(f"[PDF]({paper['pdf_url']})")
+    content.append(' | '.join(links) + '\n')
+    content.append('\n---\n')
+    return ''.join(content)
+
+
+def format_topic(topic, papers):
+    """Render a topic section (empty string for a topic without papers)"""
+    if not papers:
+        return ''
+    return f"\n## {topic}\n" + ''.join(format_paper(paper) for paper in papers)
+
+
+def _write_atomic(path, write):
+    """Write a file through a temp file, fsync and rename"""
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    tmp_path.replace(path)
+
+
+class DigestWriter:
+    """Appends topic sections as they finish and republishes the digest.
+
+    Args:
+        output_path: Digest path (daily-digests/YYYY-MM-DD.md)
+        date: Digest date (YYYY-MM-DD)
+        topics: Topic names in keywords.md order
+        sections: Sections already in the .part file from an interrupted
+            run, as {topic: [offset, length, papers]} (default: none)
+        note: Note shown under the header, e.g. the catch-up window
+    """
+
+    def __init__(self, output_path, date, topics, sections=None, note=None):
+        self.path = Path(output_path)
+        self.part_path = self.path.with_name(self.path.name + '.part')
+        self.date = date
+        self.topics = list(topics)
+        self.sections = dict(sections or {})
+        self.note = note
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._truncate_part()
+
+    def _truncate_part(self):
+        """Drop anything after the last recorded section (a section written but never recorded)"""
+        size = self.part_path.stat().st_size if self.part_path.exists() else 0
+        lost = [topic for topic, (offset, length, _) in self.sections.items() if offset + length > size]
+        for topic in lost:
+            print(f"  Warning: digest section for '{topic}' is missing from {self.part_path.name}", flush=True)
+            del self.sections[topic]
+
+        end = max((offset + length for offset, length, _ in self.sections.values()), default=0)
+        with open(self.part_path, 'a') as f:
+            f.truncate(end)
+
+    @property
+    def total_papers(self):
+        return sum(papers for _, _, papers in self.sections.values())
+
+    def write_topic(self, topic, papers, publish=True):
+        """Append a finished topic's section and (by default) republish the digest.
+
+        Returns:
+            The section's [offset, length, papers] record
+        """
+        data = format_topic(topic, papers).encode('utf-8')
+        with open(self.part_path, 'ab') as f:
+            offset = f.tell()
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.sections[topic] = [offset, len(data), len(papers)]
+        if publish:
+            self.publish()
+        return self.sections[topic]
+
+    def publish(self, rate_limit_note=None, total_keywords=0, final=False):
+        """Atomically rewrite the digest from the header and the sections so far"""
+        written = [topic for topic in self.topics if topic in self.sections]
+
+        def write(f):
+            f.write(f"# Research Digest - {self.date}\n")
+
+            if self.note:
+                f.write(f"\n> **Note:** {self.note}\n")
+
+            # Add rate limit warning if present
+            if rate_limit_note:
+                f.write(f"\n> **Note:** {rate_limit_note}\n")
+
+            if not final:
+                f.write(f"\n> **Note:** Fetch in progress ({len(written)} of {len(self.topics)} topics finished).\n")
+            elif self.total_papers == 0:
+                # All searches returned 0 results
+                f.write("\n**No papers found today.**\n")
+                f.write("\nAll searches returned 0 results. This can happen when:\n")
+                f.write("- No new papers were published matching your keywords\n")
+                f.write("- arXiv had no new submissions in your research areas\n")
+                f.write("- The `days_back` setting is filtering out older papers\n")
+                f.write(f"\nSearched {total_keywords} keywords across {len(self.topics)} topics.\n")
+
+            with open(self.part_path, 'rb') as part:
+                for topic in written:
+                    offset, length, _ = self.sections[topic]
+                    part.seek(offset)
+                    f.write(part.read(length).decode('utf-8'))
+
+        _write_atomic(self.path, write)
+
+    def finalize(self, rate_limit_note=None, total_keywords=0, keep_part=False):
+        """Write the final digest; keep the .part file only if the run will be resumed
+
+        Returns:
+            Number of papers in the digest
+        """
+        self.publish(rate_limit_note, total_keywords, final=True)
+        if not keep_part:
+            self.part_path.unlink(missing_ok=True)
+        return self.total_papers
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Checkpoint of a fetch run, so an interrupted run can be resumed.
+
+A run is split into units of work: one (source, topic, keyword) query
+within the run's time window. As each unit finishes, the checkpoint
+records it together with the papers it produced, and is rewritten
+atomically in the data directory. If the run stops early (arXiv rate
+limiting, a crash, a kill), the next run - or `fetch_papers.py --resume` -
+loads the checkpoint, skips the finished units, searches the rest with
+the original window, and continues the same day's digest. The checkpoint
+also records which digest sections are already on disk (see
+digest_writer.py); papers of written topics are dropped from it. The
+checkpoint is deleted once a run completes, and the completed run's window
+is recorded in `.last_fetch.json` so the next run can catch up on any
+days missed in between.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+CHECKPOINT_FILE = ".fetch_checkpoint.json"
+LAST_RUN_FILE = ".last_fetch.json"
+
+
+class FetchCheckpoint:
+    """Persisted record of finished (source, topic, keyword) units and their papers.
+
+    Safe to share between the arXiv and Scholar worker threads. If set,
+    on_complete is called (outside the lock) after every complete().
+    """
+
+    def __init__(self, data_dir):
+        self.path = Path(data_dir) / CHECKPOINT_FILE
+        self.last_run_path = Path(data_dir) / LAST_RUN_FILE
+        self._lock = threading.Lock()
+        self.state = None
+        self.on_complete = None
+
+    def load(self):
+        """Load an unfinished run's checkpoint.
+
+        Returns:
+            True if there is a run to resume
+        """
+        if not self.path.exists():
+            return False
+        with open(self.path, 'r') as f:
+            self.state = json.load(f)
+        self.state.setdefault('sections', {})
+        self._done = set(self.state['completed'])
+        return True
+
+    def start(self, date, arxiv_days, weekly, backfill=(), backfill_days=0, catch_up=None, schedule=None):
+        """Begin a new run for a digest date
+
+        Args:
+            date: Digest date (YYYY-MM-DD)
+            arxiv_days: arXiv days_back window for this run
+            weekly: Whether this run includes Google Scholar
+            backfill: Keyword lines searched over backfill_days instead
+                of arxiv_days (see keyword_coverage.py)
+            backfill_days: arXiv days_back window for the backfill lines
+            catch_up: Date of the last completed run, if arxiv_days was
+                widened to cover the days since
+            schedule: Per-keyword arXiv windows and max_results from
+                keyword_scheduler.run_schedule()
+        """
+        self.state = {
+            'date': date,
+            'started': datetime.now().isoformat(),
+            'arxiv_days': arxiv_days,
+            'weekly': weekly,
+            'backfill': list(backfill),
+            'backfill_days': backfill_days,
+            'catch_up': catch_up,
+            'schedule': schedule or {},
+            'completed': [],
+            'papers': {},
+            'sections': {},
+        }
+        self._done = set()
+        self._save()
+
+    @property
+    def date(self):
+        return self.state['date']
+
+    @property
+    def weekly(self):
+        return self.state['weekly']
+
+    def arxiv_days(self):
+        """days_back that reaches back to the original run's window start"""
+        return self._extend(self.state['arxiv_days'])
+
+    @property
+    def catch_up(self):
+        """Date of the last completed run if this run catches up on missed days"""
+        return self.state.get('catch_up')
+
+    def keyword_days(self, keyword):
+        """Scheduled arXiv days_back for a keyword last checked before the window (0 if none)"""
+        days = self.state.get('schedule', {}).get('days', {}).get(keyword)
+        return self._extend(days) if days else 0
+
+    def max_results(self, source):
+        """Scheduled max_results per keyword for a source, as {keyword: max_results}"""
+        return self.state.get('schedule', {}).get('max_results', {}).get(source, {})
+
+    @property
+    def backfill(self):
+        """Keyword lines this run backfills"""
+        return self.state.get('backfill', [])
+
+    def backfill_days(self):
+        """days_back that reaches back to the original run's backfill window start"""
+        return self._extend(self.state.get('backfill_days', 0))
+
+    def _extend(self, days_back):
+        started = datetime.fromisoformat(self.state['started'])
+        return days_back + (datetime.now() - started).days
+
+    @staticmethod
+    def _key(source, topic, keyword):
+        return f"{source}\t{topic}\t{keyword}"
+
+    def is_done(self, source, topic, keyword):
+        return self._key(source, topic, keyword) in self._done
+
+    def complete(self, source, units, topics_papers):
+        """Record finished units and the papers they produced
+
+        Args:
+            source: 'arXiv' or 'Google Scholar'
+            units: Iterable of (topic, keyword) pairs that finished
+            topics_papers: Dict mapping topic names to new paper dicts
+        """
+        with self._lock:
+            for topic, keyword in units:
+                key = self._key(source, topic, keyword)
+                if key not in self._done:
+                    self._done.add(key)
+                    self.state['completed'].append(key)
+            source_papers = self.state['papers'].setdefault(source, {})
+            for topic, papers in topics_papers.items():
+                if papers:
+                    source_papers.setdefault(topic, []).extend(papers)
+            self._save()
+
+        if self.on_complete:
+            self.on_complete()
+
+    def papers(self, source):
+        """Dict mapping topic names to all papers collected for a source"""
+        return self.state['papers'].get(source, {})
+
+    @property
+    def sections(self):
+        """Digest sections already written, as {topic: [offset, length, papers]}"""
+        return self.state['sections']
+
+    def record_section(self, topic, section):
+        """Record a topic's written digest section and forget its papers"""
+        with self._lock:
+            self.state['sections'][topic] = section
+            for source_papers in self.state['papers'].values():
+                source_papers.pop(topic, None)
+            self._save()
+
+    def finish(self):
+        """The run completed: record its window and remove the checkpoint
+
+        A resumed run's windows were extended up to now (see _extend), so
+        the window it covered ends now rather than when it started.
+        """
+        last_run = self.last_run() or {}
+        self._write(self.last_run_path, {
+            'date': self.date,
+            'started': self.state['started'],
+            'covered_until': datetime.now().isoformat(),
+            'arxiv_days': self.state['arxiv_days'],
+            'scholar_started': self.state['started'] if self.weekly else last_run.get('scholar_started'),
+        })
+        if self.path.exists():
+            self.path.unlink()
+        self.state = None
+
+    def last_run(self):
+        """The last completed run as {date, started, covered_until, arxiv_days, scholar_started}, or None"""
+        if not self.last_run_path.exists():
+            return None
+        with open(self.last_run_path, 'r') as f:
+            return json.load(f)
+
+    def _save(self):
+        self._write(self.path, self.state)
+
+    @staticmethod
+    def _write(path, state):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path.replace(path)
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Per-query metrics and run telemetry for fetch_papers.py.
+
+Every arXiv and Google Scholar query is recorded with its wall time, time
+spent sleeping (rate limiter, retry back-off, the arXiv client's pause
+between result pages), HTTP time, parse/processing time (the remainder),
+requests issued, 429 and 503 retries, results returned and results kept
+after the date and seen filters. Queries are totalled per topic (a
+combined query's cost is split across its topics by keyword count), per
+source and per run.
+
+At the end of a run the record is appended to
+`<data>/metrics/fetch_runs.jsonl` and a Prometheus textfile-collector file
+is written (default `<data>/metrics/fetch_papers.prom`; point
+`metrics.textfile` at node_exporter's textfile directory to scrape it).
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import requests
+
+METRICS_DIR = "metrics"
+RUNS_FILE = "fetch_runs.jsonl"
+TEXTFILE = "fetch_papers.prom"
+
+TIMINGS = ('wall', 'sleep', 'http', 'parse')
+COUNTS = ('requests', 'retries_429', 'retries_503', 'returned', 'kept')
+
+
+class QueryMetrics:
+    """Measurements for one query (a keyword, a combined query or a harvest)"""
+
+    def __init__(self, source='', query='', topics=None, keywords=None):
+        self.source = source
+        self.query = query
+        self.topics = topics or {}     # topic -> keywords in this query
+        self.keywords = list(keywords or [])   # keyword lines searched (not for a harvest)
+        self.cached = False
+        self.kept_by_topic = {}
+        self.kept_by_keyword = {}
+        self.last_response = None      # monotonic end of the last HTTP response
+        for field in TIMINGS + COUNTS:
+            setattr(self, field, 0)
+
+    def add_kept(self, topic, count):
+        self.kept += count
+        self.kept_by_topic[topic] = self.kept_by_topic.get(topic, 0) + count
+
+    def add_kept_papers(self, papers):
+        """Count kept papers against the keyword lines each one matched"""
+        for paper in papers:
+            for keyword in paper.get('keywords', []):
+                self.kept_by_keyword[keyword] = self.kept_by_keyword.get(keyword, 0) + 1
+
+    def to_dict(self):
+        record = {'source': self.source, 'query': self.query, 'topics': self.topics, 'cached': self.cached}
+        record.update({field: round(getattr(self, field), 3) for field in TIMINGS})
+        record.update({field: getattr(self, field) for field in COUNTS})
+        return record
+
+
+class RunMetrics:
+    """Collects QueryMetrics for a run; safe to share between worker threads"""
+
+    def __init__(self, date=None):
+        self.date = date or datetime.now().strftime('%Y-%m-%d')
+        self.started = time.time()
+        self._start = time.monotonic()
+        self.queries = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def query(self, source, query, topics=None, keywords=None):
+        """Measure a query; code inside the block reaches it via current()"""
+        if isinstance(topics, str):
+            topics = {topics: 1}
+        metrics = QueryMetrics(source, query, topics, keywords)
+        self._local.current = metrics
+        start = time.monotonic()
+        try:
+            yield metrics
+        finally:
+            metrics.wall = time.monotonic() - start
+            metrics.parse = max(0.0, metrics.wall - metrics.sleep - metrics.http)
+            self._local.current = None
+            with self._lock:
+                self.queries.append(metrics)
+
+    def current(self):
+        """The calling thread's query in progress (a throwaway one outside a query)"""
+        return getattr(self._local, 'current', None) or QueryMetrics()
+
+    def _totals(self, queries, share=lambda query: 1.0):
+        totals = {field: 0.0 for field in TIMINGS + COUNTS}
+        for query in queries:
+            weight = share(query)
+            for field in TIMINGS + COUNTS:
+                if field != 'kept':
+                    totals[field] += getattr(query, field) * weight
+        for field in COUNTS:
+            totals[field] = round(totals[field])
+        for field in TIMINGS:
+            totals[field] = round(totals[field], 3)
+        totals['queries'] = len(queries)
+        totals['cached'] = sum(1 for query in queries if query.cached)
+        return totals
+
+    def record(self, aborted=False, hosts=None):
+        """The run record: every query plus per-topic, per-source and run totals
+        (and per-host HTTP stats from http_transport, if given)"""
+        with self._lock:
+            queries = list(self.queries)
+
+        by_topic = {}
+        for query in queries:
+            for topic in query.topics:
+                by_topic.setdefault(topic, []).append(query)
+
+        topics = {}
+        for topic, topic_queries in by_topic.items():
+            def share(query, topic=topic):
+                return query.topics[topic] / sum(query.topics.values())
+            totals = self._totals(topic_queries, share)
+            totals['kept'] = sum(query.kept_by_topic.get(topic, 0) for query in topic_queries)
+            topics[topic] = totals
+
+        sources = {}
+        for source in sorted({query.source for query in queries}):
+            source_queries = [query for query in queries if query.source == source]
+            totals = self._totals(source_queries)
+            totals['kept'] = sum(query.kept for query in source_queries)
+            sources[source] = totals
+
+        run = self._totals(queries)
+        run['kept'] = sum(query.kept for query in queries)
+        run['wall'] = round(time.monotonic() - self._start, 3)
+
+        return {
+            'date': self.date,
+            'started': datetime.fromtimestamp(self.started).isoformat(),
+            'aborted': aborted,
+            'run': run,
+            'sources': sources,
+            'topics': topics,
+            'hosts': hosts or {},
+            'queries': [query.to_dict() for query in queries],
+        }
+
+    def write(self, data_dir, textfile=None, aborted=False, hosts=None):
+        """Append the run record to fetch_runs.jsonl and write the Prometheus textfile"""
+        record = self.record(aborted, hosts)
+        metrics_dir = Path(data_dir) / METRICS_DIR
+        metrics_dir.mkdir(parents=True, exist_ok=True)
+
+        with open(metrics_dir / RUNS_FILE, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+        textfile = Path(textfile).expanduser() if textfile else metrics_dir / TEXTFILE
+        write_textfile(textfile, record, self.started)
+        return record
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def write_textfile(path, record, timestamp):
+    """Write a run record in Prometheus text format (atomically, as node_exporter expects)"""
+    lines = []
+
+    def metric(name, help_text, samples, kind='gauge'):
+        lines.append(f"# HELP research_fetch_{name} {help_text}")
+        lines.append(f"# TYPE research_fetch_{name} {kind}")
+        for labels, value in samples:
+            label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+            lines.append(f"research_fetch_{name}{{{label_text}}} {value}" if label_text else f"research_fetch_{name} {value}")
+
+    run, sources, topics = record['run'], record['sources'], record['topics']
+
+    metric('last_run_timestamp_seconds', 'Start time of the last fetch run.', [({}, round(timestamp))])
+    metric('run_duration_seconds', 'Wall time of the last fetch run.', [({}, run['wall'])])
+    metric('run_aborted', 'Whether the last run stopped on arXiv rate limiting.', [({}, int(record['aborted']))])
+
+    for field, help_text in (
+        ('sleep', 'Seconds spent sleeping for rate limits and retries.'),
+        ('http', 'Seconds spent in HTTP requests.'),
+        ('parse', 'Seconds spent parsing and filtering results.'),
+    ):
+        metric(f'{field}_seconds', help_text, [({'source': source}, totals[field]) for source, totals in sources.items()])
+
+    metric('queries', 'Queries in the last run.', [({'source': source}, totals['queries']) for source, totals in sources.items()])
+    metric('cached_queries', 'Queries answered from the query cache.', [({'source': source}, totals['cached']) for source, totals in sources.items()])
+    metric('requests', 'HTTP requests issued in the last run.', [({'source': source}, totals['requests']) for source, totals in sources.items()])
+    metric('retries', 'Retries after 429/503 responses in the last run.', [
+        ({'source': source, 'status': status}, totals[f'retries_{status}'])
+        for source, totals in sources.items() for status in ('429', '503')
+    ])
+    metric('results_returned', 'Results returned by the sources.', [({'source': source}, totals['returned']) for source, totals in sources.items()])
+    metric('results_kept', 'Results kept after date and seen filters.', [({'source': source}, totals['kept']) for source, totals in sources.items()])
+    metric('topic_seconds', 'Query wall time attributed to each topic.', [({'topic': topic}, totals['wall']) for topic, totals in topics.items()])
+    metric('topic_results_kept', 'Results kept per topic.', [({'topic': topic}, totals['kept']) for topic, totals in topics.items()])
+
+    hosts = record.get('hosts') or {}
+    metric('http_connections', 'New HTTP connections opened per host.', [({'host': host}, stats['connections']) for host, stats in hosts.items()])
+    metric('http_bytes', 'Response bytes received per host (compressed).', [({'host': host}, stats['bytes']) for host, stats in hosts.items()])
+    metric('http_revalidated', 'Responses answered 304 Not Modified per host.', [({'host': host}, stats['revalidated']) for host, stats in hosts.items()])
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp_path, path)
+
+
+class TimedSession(requests.Session):
+    """requests.Session that adds HTTP time and request counts to the current query.
+
+    Args:
+        metrics: RunMetrics whose current() query is charged
+        pacing: The client's own minimum pause between requests (the arxiv
+            client's delay_seconds); the gap between responses within a
+            query, up to this long, is counted as sleep
+    """
+
+    def __init__(self, metrics, pacing=0):
+        super().__init__()
+        self.metrics = metrics
+        self.pacing = pacing
+
+    def send(self, request, **kwargs):
+        query = self.metrics.current()
+        start = time.monotonic()
+        if self.pacing and query.last_response is not None:
+            query.sleep += min(self.pacing, start - query.last_response)
+
+        try:
+            response = super().send(request, **kwargs)
+            if not kwargs.get('stream'):
+                response.content
+            return response
+        finally:
+            end = time.monotonic()
+            query.http += end - start
+            query.requests += 1
+            query.last_response = end
+
+
+class MeteredLimiter:
+    """Wraps a TokenBucket so its waits count as sleep for the current query"""
+
+    def __init__(self, limiter, metrics):
+        self.limiter = limiter
+        self.metrics = metrics
+
+    def acquire(self):
+        waited = self.limiter.acquire()
+        self.metrics.current().sleep += waited
+        return waited
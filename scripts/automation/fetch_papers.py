@@ -4,17 +4,37 @@ Fetch papers from arXiv and Google Scholar based on keywords.
 Generates daily digest in markdown format.
 """
 
-import os
 import sys
+import argparse
 import yaml
-import json
 import time
 import logging
+import threading
 import warnings
 import arxiv
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from urllib.parse import quote_plus
 import serpapi
+from query_planner import (
+    plan_queries, attribute_keywords, ARXIV_MAX_PAGE_SIZE, ARXIV_MAX_RESULTS,
+    DEFAULT_MAX_QUERY_LENGTH, DEFAULT_MAX_KEYWORDS_PER_QUERY
+)
+from keyword_matcher import KeywordMatcher, prepare_record
+from arxiv_harvest import harvest, load_harvested
+from rate_limiter import source_limiter
+from seen_store import get_seen_store, ARXIV, GOOGLE_SCHOLAR
+from fetch_checkpoint import FetchCheckpoint
+from query_cache import get_query_cache, date_window
+from digest_writer import DigestWriter
+from digest_store import append_papers, mark_filtered, paper_id
+from dedupe import get_dedupe_index, dedupe_topic
+from fetch_metrics import RunMetrics, QueryMetrics, TimedSession, MeteredLimiter
+from http_transport import get_transport, format_host_stats
+from keyword_coverage import KeywordCoverage, DEFAULT_BACKFILL_DAYS, DEFAULT_BACKFILL_MAX_RESULTS
+from keyword_scheduler import run_schedule, record_run
+from relevance_scorer import get_scorer, prescore, DEFAULT_ACCEPT_MARGIN, DEFAULT_REJECT_MARGIN
 
 
 def setup_logging(config):
@@ -54,6 +74,14 @@ class RateLimitAbort(Exception):
         self.total_queries = total_queries
         super().__init__(f"Rate limit abort at query {query_num}/{total_queries}: {keyword}")
 
+def rate_limit_message(e):
+    """Build the digest note for a RateLimitAbort"""
+    return (
+        f"arXiv rate limiting encountered at topic \"{e.topic}\" "
+        f"(query {e.query_num} of {e.total_queries}). "
+        f"Papers from remaining topics may be incomplete."
+    )
+
 def load_config():
     """Load configuration from config.yaml"""
     # Config stored outside plugin directory to survive updates
@@ -104,32 +132,204 @@ def load_keywords(research_root):
 
     return topics
 
-def load_seen_arxiv_papers(config):
-    """Load previously seen arXiv papers from tracking file"""
-    research_root = Path(config['paths']['research_root']).expanduser().resolve()
-    data_dir = research_root / config['paths']['data']
-    tracking_file = data_dir / ".seen_arxiv_papers.json"
+# 429 retry delays: 1 minute, 5 minutes, 10 minutes
+RATE_LIMIT_DELAYS = [60, 300, 600]
 
-    if tracking_file.exists():
-        with open(tracking_file, 'r') as f:
-            data = json.load(f)
-            return set(data.get('urls', []))
-    return set()
+# Default seconds between requests per source (arxiv.request_interval,
+# google_scholar.request_interval in config.yaml)
+ARXIV_REQUEST_INTERVAL = 10
+SCHOLAR_REQUEST_INTERVAL = 2
 
-def save_seen_arxiv_papers(config, seen_urls):
-    """Save seen arXiv papers to tracking file"""
-    research_root = Path(config['paths']['research_root']).expanduser().resolve()
-    data_dir = research_root / config['paths']['data']
-    tracking_file = data_dir / ".seen_arxiv_papers.json"
+# Longest gap since the last completed run that is caught up on (days)
+DEFAULT_CATCH_UP_DAYS = 14
 
-    with open(tracking_file, 'w') as f:
-        json.dump({
-            'urls': list(seen_urls),
-            'last_updated': datetime.now().isoformat()
-        }, f, indent=2)
+def window_max_results(max_results, days, base_days):
+    """Per-keyword cap for a days-long window, given the cap for base_days.
 
-def search_arxiv(keywords, config, max_results=10, days_back=1, topic_name=None, global_query_offset=0, total_global_queries=0):
-    """Search arXiv for papers matching keywords.
+    max_results is configured for the usual days_back window; a window n
+    times as long (a catch-up after missed runs) gets n times the cap, so
+    the missed days are not cut off by a cap sized for one day.
+    """
+    return max_results * max(1, -(-days // max(1, base_days)))
+
+def arxiv_paper(result):
+    """Convert an arxiv.Result into a digest paper dict"""
+    return {
+        'title': result.title,
+        'authors': ', '.join([author.name for author in result.authors]),
+        'year': result.published.year,
+        'abstract': result.summary.replace('\n', ' '),
+        'url': result.entry_id,
+        'pdf_url': result.pdf_url,
+        'source': 'arXiv',
+        'published': result.published.isoformat()
+    }
+
+def arxiv_client(config, metrics):
+    """arxiv.Client on the shared transport whose HTTP requests are timed into metrics"""
+    client = arxiv.Client()
+    # arxiv.Client takes no session argument; swap in a timed one
+    client._session = get_transport(config).mount(TimedSession(metrics, pacing=client.delay_seconds))
+    return client
+
+def days_old(paper):
+    """Age in days of an arXiv paper dict's first submission"""
+    return (datetime.now() - datetime.fromisoformat(paper['published']).replace(tzinfo=None)).days
+
+def window_query(query, days_back):
+    """Restrict an arXiv query to submissions from the last days_back days.
+
+    The window runs from midnight UTC days_back + 1 days ago to the end of
+    today (UTC), so it is wider than days_back and the client-side
+    days_old <= days_back check, not the server, decides the boundary.
+    Aligning it to whole days keeps the URL the same for a whole day, so
+    repeated runs can revalidate the response (see http_transport.py)
+    instead of downloading it again.
+    """
+    today = datetime.now(timezone.utc).date()
+    start = today - timedelta(days=days_back + 1)
+    return f"({query}) AND submittedDate:[{start:%Y%m%d}0000 TO {today:%Y%m%d}2359]"
+
+def windowed_results(client, search, days_back, first_page, caps=None):
+    """Page through a date-sorted search until the window is exhausted.
+
+    The first page asks for first_page entries and each further page twice
+    as many (up to arXiv's page limit), so quiet days cost one small
+    request and busy days few large ones. Iteration stops at the first
+    entry older than days_back, since everything after it is older still,
+    or once caps (a BatchCaps) reports that every keyword is full.
+    """
+    # arxiv.Client reads page_size when it requests each page
+    client.page_size = max(1, min(first_page, ARXIV_MAX_PAGE_SIZE))
+    next_page_at = client.page_size
+    if caps:
+        caps.reset()
+
+    for count, result in enumerate(client.results(search), 1):
+        if (datetime.now() - result.published.replace(tzinfo=None)).days > days_back:
+            break
+        yield result
+        if caps and caps.add(result):
+            break
+        if count == next_page_at:
+            client.page_size = min(client.page_size * 2, ARXIV_MAX_PAGE_SIZE)
+            next_page_at += client.page_size
+
+def run_arxiv_query(client, query, max_results, days_back=None, first_page=None, query_metrics=None, caps=None):
+    """Run a single arXiv query with retries for 503 and 429 errors.
+
+    Args:
+        client: arxiv.Client to page through results with
+        query: arXiv search_query string
+        max_results: Max results to fetch
+        days_back: If given, restrict the query to submissions in the last
+            days_back days and stop paging once the window is exhausted
+        first_page: Size of the first page in windowed mode (default: max_results)
+        query_metrics: Optional QueryMetrics charged with retries and back-off
+        caps: Optional BatchCaps ending a windowed query once every
+            keyword of a combined query has its max_results entries
+
+    Returns:
+        List of arxiv.Result objects (newest first), or None if 429 errors
+        persisted after all retries
+    """
+    query_metrics = query_metrics or QueryMetrics()
+
+    def fetch():
+        search = arxiv.Search(
+            query=window_query(query, days_back) if days_back is not None else query,
+            max_results=max_results,
+            sort_by=arxiv.SortCriterion.SubmittedDate
+        )
+        if days_back is None:
+            return list(client.results(search))
+        return list(windowed_results(client, search, days_back, first_page or max_results, caps))
+
+    # Retry logic for 503 errors (quick retries)
+    max_503_retries = 3
+    retry_delay_503 = 5  # Start with 5 seconds
+
+    for attempt_503 in range(max_503_retries):
+        try:
+            return fetch()
+
+        except Exception as e:
+            error_str = str(e)
+
+            # Handle 429 rate limit errors with longer backoff
+            if '429' in error_str:
+                # Try the 429 retry sequence: 1min, 5min, 10min
+                for retry_num, delay in enumerate(RATE_LIMIT_DELAYS):
+                    delay_mins = delay // 60
+                    print(f"    429 rate limit, waiting {delay_mins} minute(s) (attempt {retry_num + 1}/{len(RATE_LIMIT_DELAYS)})...", flush=True)
+                    time.sleep(delay)
+                    query_metrics.sleep += delay
+                    query_metrics.retries_429 += 1
+
+                    try:
+                        results = fetch()
+                        print(f"    Retry successful after {delay_mins} minute wait", flush=True)
+                        return results
+
+                    except Exception as retry_e:
+                        if '429' not in str(retry_e):
+                            # Different error, re-raise
+                            raise retry_e
+                        # Still 429, continue to next delay
+                        continue
+
+                # All 429 retries exhausted
+                return None
+
+            # Handle 503 errors with quick retries
+            elif '503' in error_str and attempt_503 < max_503_retries - 1:
+                print(f"    503 error, retrying in {retry_delay_503}s (attempt {attempt_503 + 1}/{max_503_retries})...", flush=True)
+                time.sleep(retry_delay_503)
+                query_metrics.sleep += retry_delay_503
+                query_metrics.retries_503 += 1
+                retry_delay_503 *= 2  # Exponential backoff
+            else:
+                # Unknown error or final 503 attempt, raise
+                raise
+
+def cached_arxiv_query(client, query, max_results, days_back, limiter, cache, first_page=None, query_metrics=None, caps=None):
+    """Run a date-windowed arXiv query through the query cache.
+
+    On a miss the request is paced by limiter and run as in
+    run_arxiv_query, and the converted results are cached for the window
+    (and caps, which decide where the results end). Cache hits, limiter
+    waits and results returned are recorded in query_metrics.
+
+    Returns:
+        List of paper dicts (newest first), or None if 429 errors persisted
+    """
+    query_metrics = query_metrics or QueryMetrics()
+    window = date_window(days_back)
+    limit = [max_results, caps.key] if caps else max_results
+    papers = cache.get(ARXIV, query, limit, window)
+    if papers is not None:
+        print(f"    Using cached results ({len(papers)} entries)", flush=True)
+        query_metrics.cached = True
+        query_metrics.returned = len(papers)
+        return papers
+
+    # Respect arXiv rate limit: 10 seconds between requests to avoid 429 errors
+    query_metrics.sleep += limiter.acquire()
+
+    results = run_arxiv_query(client, query, max_results, days_back, first_page, query_metrics, caps)
+    if results is None:
+        return None
+
+    papers = [arxiv_paper(result) for result in results]
+    query_metrics.returned = len(papers)
+    cache.put(ARXIV, query, limit, window, papers)
+    return papers
+
+def search_arxiv(keywords, config, max_results=10, days_back=1, topic_name=None, global_query_offset=0, total_global_queries=0, limiter=None, checkpoint=None, metrics=None, keyword_max_results=None):
+    """Search arXiv for papers matching keywords, one request per keyword.
+
+    Fallback for search_arxiv_planned when query batching is disabled
+    (arxiv.max_keywords_per_query: 1).
 
     Args:
         keywords: List of search keywords
@@ -139,6 +339,11 @@ def search_arxiv(keywords, config, max_results=10, days_back=1, topic_name=None,
         topic_name: Name of current topic (for error reporting)
         global_query_offset: Number of queries already completed in this run
         total_global_queries: Total queries planned for entire run
+        limiter: TokenBucket pacing arXiv requests (default: from config)
+        checkpoint: Optional FetchCheckpoint recording each finished keyword
+        metrics: Optional RunMetrics recording each query
+        keyword_max_results: Optional {keyword: max_results} overriding
+            max_results for scheduled keywords
 
     Returns:
         List of paper dicts
@@ -152,163 +357,330 @@ def search_arxiv(keywords, config, max_results=10, days_back=1, topic_name=None,
     seen_urls = set()
 
     # Load previously seen papers to avoid duplicates across runs
-    previously_seen = load_seen_arxiv_papers(config)
-
-    # 429 retry delays: 1 minute, 5 minutes, 10 minutes
-    RATE_LIMIT_DELAYS = [60, 300, 600]
+    seen_store = get_seen_store(config)
+    previously_seen = seen_store.urls(ARXIV)
 
     # Create a single client instance to reuse across all queries
     # This is the recommended approach per arxiv.py documentation
-    client = arxiv.Client()
+    keyword_max_results = keyword_max_results or {}
+    metrics = metrics or RunMetrics()
+    client = arxiv_client(config, metrics)
+    limiter = limiter or source_limiter(config, 'arxiv', ARXIV_REQUEST_INTERVAL)
+    cache = get_query_cache(config)
 
     for i, keyword in enumerate(keywords, 1):
         global_query_num = global_query_offset + i
         print(f"  [arXiv {i}/{len(keywords)}] Searching: {keyword[:80]}...", flush=True)
 
-        # Respect arXiv rate limit: 10 seconds between requests to avoid 429 errors
-        if i > 1:
-            time.sleep(10)
+        with metrics.query(ARXIV, keyword, topic_name, [keyword]) as query_metrics:
+            # Use the keyword as-is (assumes each line is a complete search)
+            results = cached_arxiv_query(client, keyword, keyword_max_results.get(keyword, max_results), days_back, limiter, cache, query_metrics=query_metrics)
+
+            if results is None:
+                # All 429 retries exhausted - abort (finished keywords are already saved)
+                raise RateLimitAbort(
+                    topic=topic_name or "Unknown",
+                    keyword=keyword,
+                    query_num=global_query_num,
+                    total_queries=total_global_queries
+                )
 
-        # Track if we succeeded for this keyword
-        query_succeeded = False
+            keyword_papers = []
+            for paper in results:
+                # Skip duplicates (both from this run and previous runs)
+                if paper['url'] in seen_urls or paper['url'] in previously_seen:
+                    continue
 
-        # Retry logic for 503 errors (quick retries)
-        max_503_retries = 3
-        retry_delay_503 = 5  # Start with 5 seconds
+                # Only include papers from last N days
+                if days_old(paper) <= days_back:
+                    paper['keywords'] = [keyword]
+                    keyword_papers.append(paper)
+                    seen_urls.add(paper['url'])
 
-        for attempt_503 in range(max_503_retries):
-            try:
-                # Use the keyword as-is (assumes each line is a complete search)
-                search = arxiv.Search(
-                    query=keyword,
-                    max_results=max_results,
-                    sort_by=arxiv.SortCriterion.SubmittedDate
+            query_metrics.add_kept(topic_name, len(keyword_papers))
+            query_metrics.add_kept_papers(keyword_papers)
+
+        # Record newly seen URLs as each query finishes, so an abort or
+        # crash never loses a finished query's results
+        all_papers.extend(keyword_papers)
+        seen_store.add([paper['url'] for paper in keyword_papers], ARXIV)
+        if checkpoint:
+            checkpoint.complete(ARXIV, [(topic_name, keyword)], {topic_name: keyword_papers})
+
+    return all_papers
+
+class BatchCaps:
+    """Tracks when every keyword of a combined query has max_results entries.
+
+    Entries are attributed to the batch's keyword lines as the planned
+    search attributes them, before seen-paper filtering, so a batch stops
+    where a per-keyword search with the same max_results would have.
+
+    Args:
+        batch: Batch dict from plan_queries
+        matcher: KeywordMatcher compiled from the batch's keyword lines
+        caps: Dict mapping each of the batch's keyword lines to max_results
+    """
+
+    def __init__(self, batch, matcher, caps):
+        self.batch = batch
+        self.matcher = matcher
+        self.caps = caps
+        self.key = sorted(caps.items())
+        self.reset()
+
+    def reset(self):
+        self.counts = dict.fromkeys(self.caps, 0)
+        self.open = {keyword for keyword, cap in self.caps.items() if cap > 0}
+
+    def add(self, result):
+        """Count an arxiv.Result; True once every keyword is full"""
+        record = prepare_record(arxiv_paper(result), self.matcher.fields)
+        for keyword in attribute_keywords(self.batch, self.matcher.match_prepared(record), record):
+            self.counts[keyword] += 1
+            if self.counts[keyword] >= self.caps[keyword]:
+                self.open.discard(keyword)
+        return not self.open
+
+def search_arxiv_planned(topics, config, max_results=10, days_back=1, limiter=None, checkpoint=None, metrics=None, keyword_max_results=None):
+    """Search arXiv for all topics at once using combined OR'd queries.
+
+    Keyword lines are packed into as few requests as arXiv's URL and result
+    limits allow (see query_planner.py). Each returned paper is matched
+    back to its keyword line(s) locally and assigned to the first topic in
+    keywords.md order that lists one of them, the same topic that would
+    have claimed it with one search per keyword.
+
+    Each query is restricted to the days_back submission window and paged
+    until the window is exhausted or every keyword in the batch has
+    max_results entries, so a busy keyword can no longer crowd the others
+    in its batch out of a fixed result limit, and a long window is not
+    downloaded in full once the batch is full.
+
+    Args:
+        topics: Dict mapping topic names to lists of keywords
+        config: Configuration dict
+        max_results: Max results per keyword
+        days_back: Only include papers from last N days
+        limiter: TokenBucket pacing arXiv requests (default: from config)
+        checkpoint: Optional FetchCheckpoint recording each finished batch
+        metrics: Optional RunMetrics recording each query
+        keyword_max_results: Optional {keyword: max_results} overriding
+            max_results for scheduled keywords
+
+    Returns:
+        Dict mapping topic names to lists of paper dicts
+
+    Raises:
+        RateLimitAbort: If 429 errors persist after all retries exhausted
+    """
+    arxiv_config = config['arxiv']
+    # Leave room for the submittedDate window added to every query
+    window_length = len(quote_plus(window_query('', days_back)))
+    batches = plan_queries(
+        topics,
+        max_results,
+        max_query_length=arxiv_config.get('max_query_length', DEFAULT_MAX_QUERY_LENGTH) - window_length,
+        max_keywords_per_query=arxiv_config.get('max_keywords_per_query', DEFAULT_MAX_KEYWORDS_PER_QUERY)
+    )
+    total_keywords = sum(len(batch['keywords']) for batch in batches)
+    print(f"  Planned {len(batches)} arXiv queries for {total_keywords} unique keywords", flush=True)
+
+    # Compile every keyword line once to attribute results locally
+    matcher = KeywordMatcher(keyword for batch in batches for keyword in batch['keywords'])
+    for keyword, error in matcher.errors.items():
+        print(f"  Warning: can't match keyword locally ({error})", flush=True)
+
+    topic_order = list(topics)
+    topics_papers = {topic: [] for topic in topics}
+    seen_urls = set()  # Entries already considered in this run
+    keyword_max_results = keyword_max_results or {}
+
+    # Load previously seen papers to avoid duplicates across runs
+    seen_store = get_seen_store(config)
+    previously_seen = seen_store.urls(ARXIV)
+
+    metrics = metrics or RunMetrics()
+    client = arxiv_client(config, metrics)
+    limiter = limiter or source_limiter(config, 'arxiv', ARXIV_REQUEST_INTERVAL)
+    cache = get_query_cache(config)
+
+    for i, batch in enumerate(batches, 1):
+        print(f"  [arXiv {i}/{len(batches)}] Searching {len(batch['keywords'])} keywords: {batch['query'][:80]}...", flush=True)
+
+        batch_topics = {}
+        for keyword in batch['keywords']:
+            for topic in batch['topics'][keyword]:
+                batch_topics[topic] = batch_topics.get(topic, 0) + 1
+
+        with metrics.query(ARXIV, batch['query'], batch_topics, batch['keywords']) as query_metrics:
+            # Fetch in-window entries until every keyword is full (keywords
+            # are capped locally below), starting with a page sized for the batch
+            caps = BatchCaps(batch, matcher, {
+                keyword: keyword_max_results.get(keyword, max_results) for keyword in batch['keywords']
+            })
+            results = cached_arxiv_query(
+                client, batch['query'], ARXIV_MAX_RESULTS, days_back, limiter, cache,
+                first_page=batch['max_results'], query_metrics=query_metrics, caps=caps
+            )
+
+            if results is None:
+                # All 429 retries exhausted - abort (finished batches are already saved)
+                first_keyword = batch['keywords'][0]
+                raise RateLimitAbort(
+                    topic=batch['topics'][first_keyword][0],
+                    keyword=first_keyword,
+                    query_num=i,
+                    total_queries=len(batches)
                 )
 
-                for result in client.results(search):
-                    # Skip duplicates (both from this run and previous runs)
-                    if result.entry_id in seen_urls or result.entry_id in previously_seen:
-                        continue
+            candidates = []
+            for paper in results:
+                if paper['url'] in seen_urls or paper['url'] in previously_seen:
+                    continue
 
-                    # Only include papers from last N days
-                    days_old = (datetime.now() - result.published.replace(tzinfo=None)).days
-                    if days_old <= days_back:
-                        all_papers.append({
-                            'title': result.title,
-                            'authors': ', '.join([author.name for author in result.authors]),
-                            'year': result.published.year,
-                            'abstract': result.summary.replace('\n', ' '),
-                            'url': result.entry_id,
-                            'pdf_url': result.pdf_url,
-                            'source': 'arXiv'
-                        })
-                        seen_urls.add(result.entry_id)
-
-                # If successful, break out of retry loop
-                query_succeeded = True
-                break
+                # Only include papers from last N days
+                if days_old(paper) <= days_back:
+                    candidates.append(dict(paper))
+                    seen_urls.add(paper['url'])
+
+            # Cap each keyword at max_results, as a per-keyword search would
+            keyword_counts = {keyword: 0 for keyword in batch['keywords']}
+            batch_papers = {}
+
+            for paper in candidates:
+                record = prepare_record(paper, matcher.fields)
+                matched = [
+                    keyword for keyword in attribute_keywords(batch, matcher.match_prepared(record), record)
+                    if keyword_counts[keyword] < keyword_max_results.get(keyword, max_results)
+                ]
+                if not matched:
+                    seen_urls.discard(paper['url'])
+                    continue
 
-            except Exception as e:
-                error_str = str(e)
-
-                # Handle 429 rate limit errors with longer backoff
-                if '429' in error_str:
-                    # Try the 429 retry sequence: 1min, 5min, 10min
-                    for retry_num, delay in enumerate(RATE_LIMIT_DELAYS):
-                        delay_mins = delay // 60
-                        print(f"    429 rate limit, waiting {delay_mins} minute(s) (attempt {retry_num + 1}/{len(RATE_LIMIT_DELAYS)})...", flush=True)
-                        time.sleep(delay)
-
-                        try:
-                            search = arxiv.Search(
-                                query=keyword,
-                                max_results=max_results,
-                                sort_by=arxiv.SortCriterion.SubmittedDate
-                            )
-
-                            for result in client.results(search):
-                                if result.entry_id in seen_urls or result.entry_id in previously_seen:
-                                    continue
-                                days_old = (datetime.now() - result.published.replace(tzinfo=None)).days
-                                if days_old <= days_back:
-                                    all_papers.append({
-                                        'title': result.title,
-                                        'authors': ', '.join([author.name for author in result.authors]),
-                                        'year': result.published.year,
-                                        'abstract': result.summary.replace('\n', ' '),
-                                        'url': result.entry_id,
-                                        'pdf_url': result.pdf_url,
-                                        'source': 'arXiv'
-                                    })
-                                    seen_urls.add(result.entry_id)
-
-                            # Success after retry
-                            print(f"    Retry successful after {delay_mins} minute wait", flush=True)
-                            query_succeeded = True
-                            break
-
-                        except Exception as retry_e:
-                            if '429' not in str(retry_e):
-                                # Different error, re-raise
-                                raise retry_e
-                            # Still 429, continue to next delay
-                            continue
-
-                    if query_succeeded:
-                        break  # Break out of 503 retry loop too
-
-                    # All 429 retries exhausted - save what we have and abort
-                    all_seen = previously_seen.union(seen_urls)
-                    save_seen_arxiv_papers(config, all_seen)
-
-                    raise RateLimitAbort(
-                        topic=topic_name or "Unknown",
-                        keyword=keyword,
-                        query_num=global_query_num,
-                        total_queries=total_global_queries
-                    )
-
-                # Handle 503 errors with quick retries
-                elif '503' in error_str and attempt_503 < max_503_retries - 1:
-                    print(f"    503 error, retrying in {retry_delay_503}s (attempt {attempt_503 + 1}/{max_503_retries})...", flush=True)
-                    time.sleep(retry_delay_503)
-                    retry_delay_503 *= 2  # Exponential backoff
-                else:
-                    # Unknown error or final 503 attempt, raise
-                    raise
-
-    # Save all seen URLs (merge with previously seen)
-    all_seen = previously_seen.union(seen_urls)
-    save_seen_arxiv_papers(config, all_seen)
+                for keyword in matched:
+                    keyword_counts[keyword] += 1
 
-    return all_papers
+                candidate_topics = {topic for keyword in matched for topic in batch['topics'][keyword]}
+                topic = min(candidate_topics, key=topic_order.index)
 
-def load_seen_papers(config):
-    """Load previously seen Google Scholar papers from tracking file"""
-    research_root = Path(config['paths']['research_root']).expanduser().resolve()
-    data_dir = research_root / config['paths']['data']
-    tracking_file = data_dir / ".seen_scholar_papers.json"
+                paper['keywords'] = matched
+                batch_papers.setdefault(topic, []).append(paper)
+
+            for topic, papers in batch_papers.items():
+                query_metrics.add_kept(topic, len(papers))
+                query_metrics.add_kept_papers(papers)
+
+        # Record newly seen URLs as each batch finishes, so an abort or
+        # crash never loses a finished batch's results
+        for topic, papers in batch_papers.items():
+            topics_papers[topic].extend(papers)
+        seen_store.add([paper['url'] for papers in batch_papers.values() for paper in papers], ARXIV)
+        if checkpoint:
+            units = [(topic, keyword) for keyword in batch['keywords'] for topic in batch['topics'][keyword]]
+            checkpoint.complete(ARXIV, units, batch_papers)
+
+    return topics_papers
+
+def search_arxiv_harvest(topics, config, max_results=10, days_back=1, limiter=None, checkpoint=None, metrics=None):
+    """Fetch arXiv papers by harvesting the day's metadata and matching locally.
+
+    Downloads new metadata for arxiv.categories once over OAI-PMH (see
+    arxiv_harvest.py) and matches every keyword line against it with the
+    compiled keyword matcher. Papers are assigned to the first topic in
+    keywords.md order that lists a matching keyword, and each keyword keeps
+    at most max_results papers, as in search mode.
 
-    if tracking_file.exists():
-        with open(tracking_file, 'r') as f:
-            data = json.load(f)
-            return set(data.get('urls', []))
-    return set()
+    Args:
+        topics: Dict mapping topic names to lists of keywords
+        config: Configuration dict
+        max_results: Max results per keyword
+        days_back: Only include papers from last N days
+        limiter: TokenBucket pacing OAI-PMH requests (default: from config)
+        checkpoint: Optional FetchCheckpoint recording the finished harvest
+        metrics: Optional RunMetrics recording the harvest as one query
 
-def save_seen_papers(config, seen_urls):
-    """Load previously seen Google Scholar papers from tracking file"""
+    Returns:
+        Dict mapping topic names to lists of paper dicts
+    """
     research_root = Path(config['paths']['research_root']).expanduser().resolve()
     data_dir = research_root / config['paths']['data']
-    tracking_file = data_dir / ".seen_scholar_papers.json"
+    categories = config['arxiv'].get('categories') or []
+    if not categories:
+        raise ValueError("arxiv.fetch_mode is 'harvest' but arxiv.categories is empty")
+
+    metrics = metrics or RunMetrics()
+    harvest_topics = {topic: len(keywords) for topic, keywords in topics.items() if keywords}
+
+    with metrics.query(ARXIV, "OAI-PMH harvest", harvest_topics) as query_metrics:
+        stored = harvest(
+            data_dir, categories, days_back,
+            limiter=MeteredLimiter(limiter, metrics) if limiter else None,
+            session=get_transport(config).mount(TimedSession(metrics))
+        )
+        papers = load_harvested(
+            data_dir, categories, days_back,
+            keep_days=config['arxiv'].get('harvest_keep_days', 14)
+        )
+        print(f"  Harvested {stored} records; {len(papers)} new submissions in window", flush=True)
+        query_metrics.returned = len(papers)
+
+        keyword_topics = {}
+        for topic, keywords in topics.items():
+            for keyword in keywords:
+                keyword_topics.setdefault(keyword, []).append(topic)
+
+        matcher = KeywordMatcher(keyword_topics)
+        for keyword, error in matcher.errors.items():
+            print(f"  Warning: can't match keyword locally ({error})", flush=True)
+
+        topic_order = list(topics)
+        topics_papers = {topic: [] for topic in topics}
+        keyword_counts = {keyword: 0 for keyword in keyword_topics}
+
+        seen_store = get_seen_store(config)
+        previously_seen = seen_store.urls(ARXIV)
+        seen_urls = set()
+
+        for paper, matched in zip(papers, matcher.match_all(papers)):
+            if paper['url'] in previously_seen:
+                continue
 
-    with open(tracking_file, 'w') as f:
-        json.dump({
-            'urls': list(seen_urls),
-            'last_updated': datetime.now().isoformat()
-        }, f, indent=2)
+            # Cap each keyword at max_results, as a per-keyword search would
+            matched = [keyword for keyword in matched if keyword_counts[keyword] < max_results]
+            if not matched:
+                continue
 
-def search_google_scholar(keywords, config, api_key, max_results=5, days_back=7):
-    """Search Google Scholar for papers matching keywords"""
+            for keyword in matched:
+                keyword_counts[keyword] += 1
+
+            candidate_topics = {topic for keyword in matched for topic in keyword_topics[keyword]}
+            topic = min(candidate_topics, key=topic_order.index)
+
+            paper = {key: paper[key] for key in ('title', 'authors', 'year', 'abstract', 'url', 'pdf_url', 'source')}
+            paper['keywords'] = matched
+            topics_papers[topic].append(paper)
+            seen_urls.add(paper['url'])
+
+        for topic, topic_papers in topics_papers.items():
+            query_metrics.add_kept(topic, len(topic_papers))
+
+    seen_store.add(seen_urls, ARXIV)
+    if checkpoint:
+        units = [(topic, keyword) for keyword, kw_topics in keyword_topics.items() for topic in kw_topics]
+        checkpoint.complete(ARXIV, units, topics_papers)
+
+    return topics_papers
+
+def search_google_scholar(keywords, config, api_key, max_results=5, days_back=7, limiter=None, topic_name=None, checkpoint=None, metrics=None, keyword_max_results=None):
+    """Search Google Scholar for papers matching keywords.
+
+    limiter is the TokenBucket pacing SerpAPI requests (default: from
+    config). If a checkpoint is given, each finished keyword is recorded
+    under topic_name; if metrics (RunMetrics) is given, each query is
+    measured. keyword_max_results ({keyword: max_results}) overrides
+    max_results for scheduled keywords.
+    """
     import re
 
     # Search each keyword separately and combine results
@@ -317,219 +689,498 @@ def search_google_scholar(keywords, config, api_key, max_results=5, days_back=7)
     seen_urls = set()
 
     # Load previously seen papers to avoid duplicates across runs
-    previously_seen = load_seen_papers(config)
+    seen_store = get_seen_store(config)
+    previously_seen = seen_store.urls(GOOGLE_SCHOLAR)
     print(f"  [DEBUG] Loaded {len(previously_seen)} previously seen Google Scholar URLs", flush=True)
 
     # Calculate date range
     end_date = datetime.now()
     start_date = end_date - timedelta(days=days_back)
 
+    metrics = metrics or RunMetrics()
     client = serpapi.Client(api_key=api_key)
+    client.session = get_transport(config).mount(TimedSession(metrics))
+    limiter = limiter or source_limiter(config, 'google_scholar', SCHOLAR_REQUEST_INTERVAL)
+    cache = get_query_cache(config)
+    window = date_window(days_back)
+    keyword_max_results = keyword_max_results or {}
 
     for i, keyword in enumerate(keywords, 1):
         print(f"  [Scholar {i}/{len(keywords)}] Searching: {keyword[:80]}...", flush=True)
+        num = keyword_max_results.get(keyword, max_results)
+
+        with metrics.query(GOOGLE_SCHOLAR, keyword, topic_name, [keyword]) as query_metrics:
+            # Repeated queries within the cache TTL cost no SerpAPI credit
+            organic_results = cache.get(GOOGLE_SCHOLAR, keyword, num, window)
+            if organic_results is not None:
+                print(f"    Using cached results ({len(organic_results)} entries)", flush=True)
+                query_metrics.cached = True
+            else:
+                # Respect SerpAPI rate limit: free tier allows 50 searches/hour
+                # Add 2 second delay to be conservative (allows ~1800 searches/hour max)
+                query_metrics.sleep += limiter.acquire()
+
+                params = {
+                    "engine": "google_scholar",
+                    "q": keyword,  # Each line is searched individually
+                    "num": num,
+                    "as_ylo": start_date.year,  # Year low
+                    "scisbd": 1  # Sort by date (most recent first)
+                }
+
+                results = client.search(params)
+                organic_results = results.get('organic_results', [])
+                cache.put(GOOGLE_SCHOLAR, keyword, num, window, organic_results)
+
+            query_metrics.returned = len(organic_results or [])
+            keyword_papers = []
+
+            if organic_results:
+                for result in organic_results:
+                    # Skip duplicates (both from this run and previous runs)
+                    url = result.get('link', '')
+                    if url in seen_urls or url in previously_seen:
+                        continue
 
-        # Respect SerpAPI rate limit: free tier allows 50 searches/hour
-        # Add 2 second delay to be conservative (allows ~1800 searches/hour max)
-        if i > 1:
-            time.sleep(2)
-
-        params = {
-            "engine": "google_scholar",
-            "q": keyword,  # Each line is searched individually
-            "num": max_results,
-            "as_ylo": start_date.year,  # Year low
-            "scisbd": 1  # Sort by date (most recent first)
-        }
-
-        results = client.search(params)
-
-        if 'organic_results' in results:
-            for result in results['organic_results']:
-                # Skip duplicates (both from this run and previous runs)
-                url = result.get('link', '')
-                if url in seen_urls or url in previously_seen:
-                    continue
-
-                # Get publication info
-                pub_info = result.get('publication_info', {})
-                summary = pub_info.get('summary', '') if pub_info else ''
-
-                # Extract year from summary
-                year_match = re.search(r'\b(20\d{2})\b', summary)
-                year = year_match.group(1) if year_match else 'Unknown'
-
-                # Add the paper
-                all_papers.append({
-                    'title': result.get('title', 'No title'),
-                    'authors': pub_info.get('authors', [{}])[0].get('name', 'Unknown') if pub_info.get('authors') else 'Unknown',
-                    'year': year,
-                    'snippet': result.get('snippet', ''),
-                    'url': url,
-                    'citations': result.get('inline_links', {}).get('cited_by', {}).get('total', 0),
-                    'source': 'Google Scholar'
-                })
-                seen_urls.add(url)
-
-    # Save all seen URLs (merge with previously seen)
-    all_seen = previously_seen.union(seen_urls)
-    print(f"  [DEBUG] Saving {len(all_seen)} total URLs ({len(previously_seen)} previous + {len(seen_urls)} new)", flush=True)
-    print(f"  [DEBUG] Filtered out {len(previously_seen.intersection(seen_urls))} duplicate URLs during search", flush=True)
-    save_seen_papers(config, all_seen)
+                    # Get publication info
+                    pub_info = result.get('publication_info', {})
+                    summary = pub_info.get('summary', '') if pub_info else ''
+
+                    # Extract year from summary
+                    year_match = re.search(r'\b(20\d{2})\b', summary)
+                    year = year_match.group(1) if year_match else 'Unknown'
+
+                    # Add the paper
+                    keyword_papers.append({
+                        'title': result.get('title', 'No title'),
+                        'authors': pub_info.get('authors', [{}])[0].get('name', 'Unknown') if pub_info.get('authors') else 'Unknown',
+                        'year': year,
+                        'snippet': result.get('snippet', ''),
+                        'url': url,
+                        'citations': result.get('inline_links', {}).get('cited_by', {}).get('total', 0),
+                        'source': 'Google Scholar',
+                        'keywords': [keyword]
+                    })
+                    seen_urls.add(url)
+
+            query_metrics.add_kept(topic_name, len(keyword_papers))
+            query_metrics.add_kept_papers(keyword_papers)
+
+        # Record newly seen URLs as each query finishes
+        all_papers.extend(keyword_papers)
+        seen_store.add([paper['url'] for paper in keyword_papers], GOOGLE_SCHOLAR)
+        if checkpoint:
+            checkpoint.complete(GOOGLE_SCHOLAR, [(topic_name, keyword)], {topic_name: keyword_papers})
+
+    print(f"  [DEBUG] Saved {len(seen_urls)} new URLs ({len(previously_seen)} seen in total)", flush=True)
 
     return all_papers
 
-def generate_digest(topics_papers, output_path, rate_limit_note=None, total_keywords=0):
-    """Generate markdown digest from papers grouped by topic.
+def pending_topics(topics, source, checkpoint):
+    """Drop keywords the checkpoint already finished for a source"""
+    return {
+        topic: [keyword for keyword in keywords if not checkpoint.is_done(source, topic, keyword)]
+        for topic, keywords in topics.items()
+    }
+
+def fetch_arxiv(topics, config, limiter, aborted, checkpoint, metrics):
+    """Fetch arXiv papers for all topics using the configured fetch mode.
+
+    "harvest" downloads the day's metadata once and matches keywords
+    locally; "search" packs keywords into combined arXiv queries, or sends
+    one query per keyword when arxiv.max_keywords_per_query is 1. A failed
+    harvest falls back to search. Keywords the schedule skipped on earlier
+    days are searched back to their last check (see keyword_scheduler.py),
+    and keyword lines the run backfills (see keyword_coverage.py) are
+    searched last over the backfill window.
+    Keywords the checkpoint has already finished are skipped, and results
+    are recorded in the checkpoint.
 
     Args:
-        topics_papers: Dict mapping topic names to lists of paper dicts
-        output_path: Path to write the digest file
-        rate_limit_note: Optional note about rate limiting to include at top of digest
-        total_keywords: Total number of keywords searched across all topics
-    """
-    today = datetime.now().strftime('%Y-%m-%d')
-
-    content = [f"# Research Digest - {today}\n"]
-
-    # Add rate limit warning if present
-    if rate_limit_note:
-        content.append(f"\n> **Note:** {rate_limit_note}\n")
-
-    # Check if all searches returned 0 results
-    total_papers = sum(len(papers) for papers in topics_papers.values())
-    if total_papers == 0:
-        content.append("\n**No papers found today.**\n")
-        content.append("\nAll searches returned 0 results. This can happen when:\n")
-        content.append("- No new papers were published matching your keywords\n")
-        content.append("- arXiv had no new submissions in your research areas\n")
-        content.append("- The `days_back` setting is filtering out older papers\n")
-        content.append(f"\nSearched {total_keywords} keywords across {len(topics_papers)} topics.\n")
-
-    for topic, papers in topics_papers.items():
-        if not papers:
-            continue
-
-        content.append(f"\n## {topic}\n")
-
-        for paper in papers:
-            content.append(f"\n### {paper['title']}\n")
-            content.append(f"**Authors:** {paper['authors']}  \n")
-            content.append(f"**Year:** {paper['year']}")
-
-            if paper['source'] == 'Google Scholar' and paper.get('citations'):
-                content.append(f" | **Citations:** {paper['citations']}")
-
-            content.append("  \n")
+        topics: Dict mapping topic names to lists of keywords
+        config: Configuration dict
+        limiter: TokenBucket pacing arXiv requests
+        aborted: threading.Event set if arXiv rate limiting aborts the run
+        checkpoint: FetchCheckpoint for this run
+        metrics: RunMetrics for this run
 
-            # Add abstract or snippet
-            if 'abstract' in paper:
-                # Truncate long abstracts
-                abstract = paper['abstract'][:300] + '...' if len(paper['abstract']) > 300 else paper['abstract']
-                content.append(f"**Abstract:** {abstract}\n")
-            elif 'snippet' in paper:
-                content.append(f"**Snippet:** {paper['snippet']}\n")
+    Returns:
+        Rate limit note for the digest, or None if arXiv finished
+    """
+    arxiv_days = checkpoint.arxiv_days()
+    base_days = config['arxiv'].get('days_back', 1)
+    fetch_mode = config['arxiv'].get('fetch_mode', 'search')
+
+    topics = pending_topics(topics, ARXIV, checkpoint)
+    if not any(topics.values()):
+        print("\narXiv: all queries already finished", flush=True)
+        return None
+
+    backfill = set(checkpoint.backfill)
+    backfill_topics = {topic: [keyword for keyword in keywords if keyword in backfill] for topic, keywords in topics.items()}
+
+    # Group the other lines by window: the run's window, or a wider one
+    # for scheduled keywords last checked before it
+    windows = {}
+    for topic, keywords in topics.items():
+        for keyword in keywords:
+            if keyword not in backfill:
+                days = max(arxiv_days, checkpoint.keyword_days(keyword))
+                windows.setdefault(days, {name: [] for name in topics})[topic].append(keyword)
+    keyword_max_results = checkpoint.max_results(ARXIV)
+
+    for days, window_topics in sorted(windows.items()):
+        max_results = window_max_results(config['arxiv']['max_results'], days, base_days)
+        # Scheduled caps are per day's check: scale them to the window too
+        window_keyword_max_results = {
+            keyword: window_max_results(cap, days, base_days) for keyword, cap in keyword_max_results.items()
+        }
+        harvested = False
+        if days > arxiv_days:
+            count = len({keyword for keywords in window_topics.values() for keyword in keywords})
+            print(f"\nSearching {count} keyword line(s) last checked {days} days ago...", flush=True)
+        elif fetch_mode == 'harvest':
+            print("\nHarvesting new arXiv submissions...", flush=True)
+            try:
+                search_arxiv_harvest(window_topics, config, max_results, days, limiter=limiter, checkpoint=checkpoint, metrics=metrics)
+                harvested = True
+            except Exception as e:
+                print(f"  Error harvesting arXiv: {e}. Falling back to keyword search.", flush=True)
 
-            # Add links
-            links = [f"[View Paper]({paper['url']})"]
-            if 'pdf_url' in paper:
-                links.append(f"[PDF]({paper['pdf_url']})")
-            content.append(' | '.join(links) + '\n')
-            content.append('\n---\n')
+        if not harvested:
+            rate_limit_note = search_arxiv_topics(
+                window_topics, config, max_results, days, limiter, aborted, checkpoint, metrics, window_keyword_max_results
+            )
+            if rate_limit_note:
+                return rate_limit_note
+
+    # New and changed keyword lines: one search over the wider window
+    if any(backfill_topics.values()):
+        backfill_days = checkpoint.backfill_days()
+        print(f"\nBackfilling {len(backfill)} new keyword line(s) over the last {backfill_days} days...", flush=True)
+        return search_arxiv_topics(
+            backfill_topics,
+            config,
+            config['arxiv'].get('backfill_max_results', DEFAULT_BACKFILL_MAX_RESULTS),
+            backfill_days,
+            limiter, aborted, checkpoint, metrics
+        )
 
-    # Write to file
-    with open(output_path, 'w') as f:
-        f.write(''.join(content))
+    return None
 
-    return len([p for papers in topics_papers.values() for p in papers])
+def search_arxiv_topics(topics, config, max_results, days_back, limiter, aborted, checkpoint, metrics, keyword_max_results=None):
+    """Search arXiv for topics with combined queries, or one query per keyword.
 
-def main():
-    # Load configuration
-    config = load_config()
+    keyword_max_results optionally overrides max_results per keyword line.
 
-    # Setup logging to capture warnings and errors
-    logger = setup_logging(config)
-    logger.info("Starting fetch_papers.py")
-
-    # Load keywords by topic
-    research_root = config['paths']['research_root']
-    topics = load_keywords(research_root)
-
-    print(f"Found {len(topics)} topics with keywords", flush=True)
+    Returns:
+        Rate limit note for the digest, or None if the searches finished
+    """
+    if config['arxiv'].get('max_keywords_per_query', DEFAULT_MAX_KEYWORDS_PER_QUERY) > 1:
+        print("\nSearching arXiv for all topics...", flush=True)
+        try:
+            search_arxiv_planned(topics, config, max_results, days_back, limiter=limiter, checkpoint=checkpoint, metrics=metrics,
+                                 keyword_max_results=keyword_max_results)
+        except RateLimitAbort as e:
+            print(f"  ✗ arXiv rate limit exceeded after retries. Aborting remaining queries.", flush=True)
+            aborted.set()
+            return rate_limit_message(e)
+        except Exception as e:
+            print(f"  Error searching arXiv: {e}", flush=True)
+        return None
 
-    # Calculate total queries for progress tracking
+    # One query per keyword, topic by topic
     total_arxiv_queries = sum(len(keywords) for keywords in topics.values())
-
-    # Determine which sources to search
-    is_weekly = datetime.now().weekday() == 6  # Sunday = weekly Google Scholar search
-
-    # Fetch papers for each topic
-    topics_papers = {}
-    rate_limit_note = None
     global_query_offset = 0
 
     for topic_num, (topic, keywords) in enumerate(topics.items(), 1):
-        print(f"\n[{topic_num}/{len(topics)}] Searching for '{topic}' ({len(keywords)} keywords)...", flush=True)
-        papers = []
+        if not keywords:
+            continue
 
-        # Always search arXiv (daily)
+        print(f"\n[arXiv {topic_num}/{len(topics)}] Searching for '{topic}' ({len(keywords)} keywords)...", flush=True)
         try:
-            arxiv_days = config['arxiv'].get('days_back', 1)  # Default to 1 day
             arxiv_papers = search_arxiv(
                 keywords,
                 config,
-                config['arxiv']['max_results'],
-                arxiv_days,
+                max_results,
+                days_back,
                 topic_name=topic,
                 global_query_offset=global_query_offset,
-                total_global_queries=total_arxiv_queries
+                total_global_queries=total_arxiv_queries,
+                limiter=limiter,
+                checkpoint=checkpoint,
+                metrics=metrics,
+                keyword_max_results=keyword_max_results
             )
-            papers.extend(arxiv_papers)
-            print(f"  Found {len(arxiv_papers)} papers from arXiv", flush=True)
+            print(f"  Found {len(arxiv_papers)} papers from arXiv for '{topic}'", flush=True)
             global_query_offset += len(keywords)
 
         except RateLimitAbort as e:
             print(f"  ✗ arXiv rate limit exceeded after retries. Aborting remaining queries.", flush=True)
-            rate_limit_note = (
-                f"arXiv rate limiting encountered at topic \"{e.topic}\" "
-                f"(query {e.query_num} of {e.total_queries}). "
-                f"Papers from remaining topics may be incomplete."
-            )
-            topics_papers[topic] = papers
-            break  # Exit the topic loop entirely
+            aborted.set()
+            return rate_limit_message(e)
 
         except Exception as e:
             print(f"  Error searching arXiv: {e}", flush=True)
             global_query_offset += len(keywords)
 
-        # Search Google Scholar (weekly only)
-        if is_weekly:
-            try:
-                scholar_papers = search_google_scholar(
-                    keywords,
-                    config,
-                    config['serpapi']['api_key'],
-                    config['google_scholar']['max_results'],
-                    config['google_scholar']['search_days']
-                )
-                papers.extend(scholar_papers)
-                print(f"  Found {len(scholar_papers)} papers from Google Scholar", flush=True)
-            except Exception as e:
-                print(f"  Error searching Google Scholar: {e}", flush=True)
+    return None
 
-        topics_papers[topic] = papers
+def fetch_scholar(topics, config, limiter, aborted, checkpoint, metrics):
+    """Fetch Google Scholar papers for each topic in keywords.md order.
 
-    # Generate digest
-    today = datetime.now().strftime('%Y-%m-%d')
-    digest_path = Path(config['paths']['research_root']) / config['paths']['daily_digests'] / f"{today}.md"
+    Runs alongside fetch_arxiv and records results in the checkpoint.
+    Stops starting new topics once arXiv rate limiting aborts the run; the
+    remaining topics are picked up when the run is resumed.
+    """
+    topics = pending_topics(topics, GOOGLE_SCHOLAR, checkpoint)
+
+    for topic_num, (topic, keywords) in enumerate(topics.items(), 1):
+        if not keywords:
+            continue
+
+        if aborted.is_set():
+            print(f"  [Scholar] Stopping: arXiv run aborted", flush=True)
+            break
+
+        print(f"\n[Scholar {topic_num}/{len(topics)}] Searching for '{topic}' ({len(keywords)} keywords)...", flush=True)
+        try:
+            scholar_papers = search_google_scholar(
+                keywords,
+                config,
+                config['serpapi']['api_key'],
+                config['google_scholar']['max_results'],
+                config['google_scholar']['search_days'],
+                limiter=limiter,
+                topic_name=topic,
+                checkpoint=checkpoint,
+                metrics=metrics,
+                keyword_max_results=checkpoint.max_results(GOOGLE_SCHOLAR)
+            )
+            print(f"  Found {len(scholar_papers)} papers from Google Scholar for '{topic}'", flush=True)
+        except Exception as e:
+            print(f"  Error searching Google Scholar: {e}", flush=True)
+
+def topic_papers(topic, checkpoint):
+    """A topic's arXiv papers followed by its Google Scholar papers"""
+    return checkpoint.papers(ARXIV).get(topic, []) + checkpoint.papers(GOOGLE_SCHOLAR).get(topic, [])
 
-    total_papers = generate_digest(topics_papers, digest_path, rate_limit_note=rate_limit_note, total_keywords=total_arxiv_queries)
+def run_fetch(config, topics, checkpoint):
+    """Run (or resume) the fetch recorded in checkpoint and write its digest.
+
+    Each topic's digest section is written as soon as every source in the
+    run has finished its keywords (see digest_writer.py), and its papers
+    are appended to the structured digest store (see digest_store.py).
+    Papers are first deduplicated across sources and against past digests
+    (see dedupe.py) and, if prescore.mode is set, scored against the
+    filter profiles (see relevance_scorer.py).
+
+    Returns:
+        True if every query finished and the checkpoint was removed
+    """
+    digest_date = checkpoint.date
+    digest_path = Path(config['paths']['research_root']) / config['paths']['daily_digests'] / f"{digest_date}.md"
+    note = None
+    if checkpoint.catch_up:
+        days = checkpoint.state['arxiv_days']
+        cap = window_max_results(config['arxiv']['max_results'], days, config['arxiv'].get('days_back', 1))
+        note = (f"Catch-up digest: covers the {days} days since the last completed fetch ({checkpoint.catch_up}), "
+                f"with up to {cap} arXiv papers per keyword.")
+    writer = DigestWriter(digest_path, digest_date, topics, checkpoint.sections, note)
+    data_dir = Path(config['paths']['research_root']).expanduser().resolve() / config['paths']['data']
+    sources = [ARXIV, GOOGLE_SCHOLAR] if checkpoint.weekly else [ARXIV]
+    writer_lock = threading.Lock()
+
+    dedupe_index = get_dedupe_index(config)
+    scorer = get_scorer(config)
+    prescore_config = config.get('prescore') or {}
+
+    def write_topic(topic, publish=True):
+        papers = topic_papers(topic, checkpoint)
+        if dedupe_index:
+            papers, merged, dropped = dedupe_topic(dedupe_index, papers, digest_date)
+            if merged or dropped:
+                print(f"  '{topic}': merged {merged} cross-source duplicates, dropped {dropped} already in a digest", flush=True)
+
+        rejected, accepted = [], []
+        if scorer:
+            papers, rejected, accepted = prescore(
+                scorer, papers,
+                prescore_config.get('mode'),
+                prescore_config.get('accept_margin', DEFAULT_ACCEPT_MARGIN),
+                prescore_config.get('reject_margin', DEFAULT_REJECT_MARGIN)
+            )
+
+        section = writer.write_topic(topic, papers, publish)
+        # Dropped rejects stay in the store, marked as filtered out
+        append_papers(data_dir, digest_date, topic, papers + [paper for paper in rejected if paper not in papers])
+        if accepted or rejected:
+            mark_filtered(data_dir, digest_date, [paper_id(paper) for paper in accepted], [paper_id(paper) for paper in rejected])
+        return section
+
+    def write_finished_topics():
+        with writer_lock:
+            for topic, keywords in topics.items():
+                if topic in checkpoint.sections:
+                    continue
+                if all(checkpoint.is_done(source, topic, keyword) for source in sources for keyword in keywords):
+                    checkpoint.record_section(topic, write_topic(topic))
+
+    checkpoint.on_complete = write_finished_topics
+    write_finished_topics()
+
+    # arXiv and Google Scholar queues run concurrently, each paced by its
+    # own token bucket, so a Sunday run takes about as long as the slower
+    # source rather than the sum of both
+    arxiv_limiter = source_limiter(config, 'arxiv', ARXIV_REQUEST_INTERVAL)
+    scholar_limiter = source_limiter(config, 'google_scholar', SCHOLAR_REQUEST_INTERVAL)
+    arxiv_aborted = threading.Event()
+    metrics = RunMetrics(digest_date)
+    transport = get_transport(config)
+    transport.take_stats()
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        arxiv_future = pool.submit(fetch_arxiv, topics, config, arxiv_limiter, arxiv_aborted, checkpoint, metrics)
+        scholar_future = pool.submit(fetch_scholar, topics, config, scholar_limiter, arxiv_aborted, checkpoint, metrics) if checkpoint.weekly else None
+
+        rate_limit_note = arxiv_future.result()
+        if scholar_future:
+            scholar_future.result()
+
+    checkpoint.on_complete = None
+
+    # Topics left unfinished (search errors, or the abort) get whatever was
+    # collected. They are not recorded, so a resumed run rewrites them.
+    for topic in topics:
+        if topic not in writer.sections:
+            write_topic(topic, publish=False)
+
+    total_keywords = sum(len(keywords) for keywords in topics.values())
+    total_papers = writer.finalize(rate_limit_note, total_keywords, keep_part=bool(rate_limit_note))
+    if dedupe_index:
+        dedupe_index.close()
+
+    # Lines whose arXiv search finished need no backfill on later runs
+    covered = [
+        keyword for keywords in topics.values() for keyword in keywords
+        if all(checkpoint.is_done(ARXIV, topic, keyword) for topic, topic_keywords in topics.items() if keyword in topic_keywords)
+    ]
+    KeywordCoverage(data_dir).update(topics, covered)
+    record_run(config, metrics.queries)
+
+    hosts = transport.take_stats()
+    metrics_config = config.get('metrics') or {}
+    if metrics_config.get('enabled', True):
+        run = metrics.write(data_dir, metrics_config.get('textfile'), aborted=bool(rate_limit_note), hosts=hosts)['run']
+        print(f"\nRun metrics: {run['queries']} queries ({run['cached']} cached), {run['requests']} requests, "
+              f"{run['wall']:.0f}s wall, {run['sleep']:.0f}s sleeping, {run['http']:.0f}s HTTP", flush=True)
+    for line in format_host_stats(hosts):
+        print(f"  HTTP {line}", flush=True)
 
     if rate_limit_note:
         print(f"\n⚠ Generated partial digest with {total_papers} papers: {digest_path}", flush=True)
         print(f"  {rate_limit_note}", flush=True)
-    else:
-        print(f"\n✓ Generated digest with {total_papers} papers: {digest_path}", flush=True)
+        print(f"  Remaining queries will be resumed on the next run (or run with --resume).", flush=True)
+        return False
+
+    checkpoint.finish()
+    print(f"\n✓ Generated digest with {total_papers} papers: {digest_path}", flush=True)
+    return True
+
+def run(config, topics, resume_only=False):
+    """Finish any interrupted run, then run today's fetch.
+
+    Args:
+        config: Configuration dict
+        topics: Dict mapping topic names to lists of keywords
+        resume_only: Only finish an interrupted run (--resume)
+
+    Returns:
+        True if every query finished (nothing left to resume)
+    """
+    research_root = config['paths']['research_root']
+    data_dir = Path(research_root).expanduser().resolve() / config['paths']['data']
+    checkpoint = FetchCheckpoint(data_dir)
+    today = datetime.now().strftime('%Y-%m-%d')
+
+    # Finish an interrupted run first, merging into that run's digest
+    if checkpoint.load():
+        resumed_date = checkpoint.date
+        print(f"\nResuming interrupted run for {resumed_date}...", flush=True)
+        finished = run_fetch(config, topics, checkpoint)
+        if not finished or resume_only or resumed_date == today:
+            return finished
+    elif resume_only:
+        print("No interrupted run to resume.", flush=True)
+        return True
+
+    # Determine which sources to search
+    is_weekly = datetime.now().weekday() == 6  # Sunday = weekly Google Scholar search
+    arxiv_days = config['arxiv'].get('days_back', 1)
+
+    # Runs missed since the last completed one (machine asleep, failed job)
+    # are caught up in one pass with a widened window
+    catch_up = None
+    max_days = (config.get('catch_up') or {}).get('max_days', DEFAULT_CATCH_UP_DAYS)
+    last_run = checkpoint.last_run()
+    if last_run and max_days:
+        # Runs before covered_until was recorded: fall back to their start
+        covered_until = last_run.get('covered_until') or last_run['started']
+        gap = (datetime.now() - datetime.fromisoformat(covered_until)).days
+        if gap > arxiv_days:
+            catch_up = last_run['date']
+            print(f"\nCatching up {gap} days since the last completed fetch ({catch_up})", flush=True)
+            if gap > max_days:
+                print(f"  Only the last {max_days} days are searched (catch_up.max_days)", flush=True)
+            arxiv_days = max(arxiv_days, min(gap, max_days))
+
+        # A missed Sunday: search Google Scholar on the next run instead
+        scholar_started = last_run.get('scholar_started')
+        if scholar_started and (datetime.now() - datetime.fromisoformat(scholar_started)).days > 7:
+            is_weekly = True
+
+    # Keyword lines added or changed since the last run get a one-time backfill
+    backfill_days = config['arxiv'].get('backfill_days', DEFAULT_BACKFILL_DAYS)
+    backfill = KeywordCoverage(data_dir).uncovered(topics) if backfill_days > arxiv_days else []
+
+    # Low-yield keywords are checked less often (see keyword_scheduler.py)
+    schedule = None
+    if (config.get('schedule') or {}).get('enabled'):
+        sources = [GOOGLE_SCHOLAR] if is_weekly else []
+        if config['arxiv'].get('fetch_mode', 'search') != 'harvest':
+            sources.insert(0, ARXIV)
+        print("\nScheduling keywords from their yield history...", flush=True)
+        schedule = run_schedule(config, topics, sources)
+
+    checkpoint.start(today, arxiv_days, is_weekly, backfill, backfill_days, catch_up, schedule)
+    if schedule:
+        for source, keywords in schedule['skip'].items():
+            skip = set(keywords) - set(backfill)
+            units = [(topic, keyword) for topic, topic_keywords in topics.items() for keyword in topic_keywords if keyword in skip]
+            checkpoint.complete(source, units, {})
+    return run_fetch(config, topics, checkpoint)
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch papers from arXiv and Google Scholar and write the daily digest.")
+    parser.add_argument('--resume', action='store_true',
+                        help="Only finish an interrupted run (same time window and digest), then exit")
+    # Other flags (e.g. --test from the setup checks) were always ignored; keep it that way
+    args, _ = parser.parse_known_args()
+
+    # Load configuration
+    config = load_config()
+
+    # Setup logging to capture warnings and errors
+    logger = setup_logging(config)
+    logger.info("Starting fetch_papers.py")
+
+    # Load keywords by topic
+    research_root = config['paths']['research_root']
+    topics = load_keywords(research_root)
+
+    print(f"Found {len(topics)} topics with keywords", flush=True)
+
+    run(config, topics, resume_only=args.resume)
 
 if __name__ == "__main__":
     main()
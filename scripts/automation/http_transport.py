@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP transport for the arXiv API, OAI-PMH and SerpAPI.
+
+Each search function used to build its own arxiv.Client or serpapi.Client,
+each with a fresh requests.Session, so connections (and TLS handshakes)
+were not reused from one topic to the next, and the fetcher had no say in
+timeouts or caching headers.
+
+All sessions now mount one TransportAdapter per process. The adapter keeps
+a connection pool per host with keep-alive, asks for gzip, applies default
+timeouts, and revalidates responses that carried an ETag or Last-Modified
+header: the validators and body are kept in `.http_cache.db`, the next
+request for the same URL sends If-None-Match / If-Modified-Since, and a
+304 is answered from the stored body. Credential query parameters (the
+SerpAPI api_key) are stripped from the URL before it is used as the cache
+key, so no secret is written to disk. Per-host statistics (requests, new
+connections, bytes on the wire, revalidated responses) are printed and
+recorded with the run metrics.
+
+    transport = get_transport(config)
+    session = transport.mount(requests.Session())
+"""
+
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from requests.adapters import HTTPAdapter
+
+DB_FILE = ".http_cache.db"
+
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 60
+DEFAULT_CACHE_MAX_MB = 50
+POOL_SIZE = 4              # connections kept alive per host
+
+STAT_FIELDS = ('requests', 'connections', 'bytes', 'revalidated')
+
+# Query parameters that carry credentials and are never written to the cache
+CREDENTIAL_PARAMS = {'api_key', 'apikey', 'key', 'token', 'access_token'}
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+def cache_key(url):
+    """url without credential query parameters, for use as a cache key"""
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if k.lower() not in CREDENTIAL_PARAMS]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+class ValidatorStore:
+    """Responses with an ETag or Last-Modified header, keyed by URL, in SQLite.
+
+    Bodies are stored zlib-compressed; the least recently used responses are
+    evicted beyond max_mb. Safe to share between threads.
+    """
+
+    def __init__(self, data_dir, max_mb=DEFAULT_CACHE_MAX_MB):
+        data_dir = Path(data_dir)
+        data_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(data_dir / DB_FILE, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " url TEXT PRIMARY KEY,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " content_type TEXT,"
+            " body BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " used REAL NOT NULL)"
+        )
+        # Responses cached before credentials were stripped from the key
+        self._conn.execute("DELETE FROM responses WHERE url LIKE '%api_key=%'")
+        self._conn.commit()
+
+    def get(self, url):
+        """(etag, last_modified, content_type, body) stored for url, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, content_type, body FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE responses SET used = ? WHERE url = ?", (time.time(), url))
+        etag, last_modified, content_type, body = row
+        return etag, last_modified, content_type, zlib.decompress(body)
+
+    def put(self, url, etag, last_modified, content_type, body):
+        data = zlib.compress(body)
+        if len(data) > self.max_bytes:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (url, etag, last_modified, content_type, body, size, used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, content_type, data, len(data), time.time())
+            )
+            self._evict()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self._conn.execute("SELECT url, size FROM responses ORDER BY used").fetchall():
+            self._conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def close(self):
+        self._conn.close()
+
+
+class TransportAdapter(HTTPAdapter):
+    """HTTPAdapter with default timeouts, gzip, revalidation and per-host stats.
+
+    Args:
+        store: ValidatorStore for conditional requests (default: none)
+        timeout: Default (connect, read) timeout in seconds
+    """
+
+    def __init__(self, store=None, timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)):
+        super().__init__(pool_connections=8, pool_maxsize=POOL_SIZE)
+        self.store = store
+        self.timeout = timeout
+        self.hosts = {}
+        self._opened = {}          # host -> connections already reported
+        self._stats_lock = threading.Lock()
+
+    def _count(self, host, **counts):
+        with self._stats_lock:
+            stats = self.hosts.setdefault(host, dict.fromkeys(STAT_FIELDS, 0))
+            for field, value in counts.items():
+                stats[field] += value
+
+    def _connections(self, host):
+        """Connections opened so far by the pools for host ("name" or "name:port")"""
+        name, _, port = host.partition(':')
+        pools = self.poolmanager.pools
+        return sum(
+            pools[key].num_connections for key in pools.keys()
+            if key.key_host == name and (not port or str(key.key_port) == port)
+        )
+
+    def send(self, request, stream=False, timeout=None, **kwargs):
+        request.headers.setdefault('Accept-Encoding', 'gzip, deflate')
+        cached = None
+        key = cache_key(request.url) if self.store else None
+        if self.store and request.method == 'GET':
+            cached = self.store.get(key)
+            if cached:
+                etag, last_modified, _, _ = cached
+                if etag:
+                    request.headers['If-None-Match'] = etag
+                if last_modified:
+                    request.headers['If-Modified-Since'] = last_modified
+
+        host = urlsplit(request.url).netloc
+        response = super().send(request, stream=stream, timeout=timeout or self.timeout, **kwargs)
+        if not stream:
+            response.content
+        revalidated = response.status_code == 304 and cached is not None
+        self._count(
+            host,
+            requests=1,
+            bytes=response.raw.tell() if not stream else 0,
+            revalidated=int(revalidated),
+        )
+
+        if revalidated:
+            _, _, content_type, body = cached
+            response.status_code = 200
+            response.reason = 'OK (revalidated)'
+            response._content = body
+            if content_type:
+                response.headers['Content-Type'] = content_type
+            response.headers.pop('Content-Encoding', None)
+        elif (self.store and not stream and request.method == 'GET' and response.status_code == 200
+              and ('ETag' in response.headers or 'Last-Modified' in response.headers)):
+            self.store.put(
+                key,
+                response.headers.get('ETag'),
+                response.headers.get('Last-Modified'),
+                response.headers.get('Content-Type'),
+                response.content
+            )
+        return response
+
+    def take_stats(self):
+        """Per-host stats since the last call, as {host: {field: value}}"""
+        with self._stats_lock:
+            hosts, self.hosts = self.hosts, {}
+            for host, stats in hosts.items():
+                opened = self._connections(host)
+                stats['connections'] = max(0, opened - self._opened.get(host, 0))
+                self._opened[host] = opened
+        return hosts
+
+
+class Transport:
+    """One TransportAdapter shared by every session in the process"""
+
+    def __init__(self, adapter):
+        self.adapter = adapter
+
+    def mount(self, session):
+        """Route a requests.Session's HTTP(S) traffic through the shared adapter"""
+        session.mount('https://', self.adapter)
+        session.mount('http://', self.adapter)
+        return session
+
+    def take_stats(self):
+        return self.adapter.take_stats()
+
+
+def format_host_stats(hosts):
+    """One line per host, e.g. "export.arxiv.org: 12 requests over 1 connection, 340 KB, 0 revalidated" """
+    return [
+        f"{host}: {stats['requests']} requests over {stats['connections']} new connection(s), "
+        f"{stats['bytes'] / 1024:.0f} KB, {stats['revalidated']} revalidated"
+        for host, stats in sorted(hosts.items())
+    ]
+
+
+def get_transport(config):
+    """Return the process-wide Transport for the config's data directory.
+
+    Reads the `http` section: connect_timeout, timeout (read), revalidate
+    and cache_max_mb.
+    """
+    http_config = config.get('http') or {}
+    research_root = Path(config['paths']['research_root']).expanduser().resolve()
+    data_dir = research_root / config['paths']['data']
+    timeout = (
+        http_config.get('connect_timeout', DEFAULT_CONNECT_TIMEOUT),
+        http_config.get('timeout', DEFAULT_READ_TIMEOUT),
+    )
+    revalidate = http_config.get('revalidate', True)
+    key = (data_dir, timeout, revalidate)
+
+    with _transports_lock:
+        if key not in _transports:
+            store = ValidatorStore(data_dir, http_config.get('cache_max_mb', DEFAULT_CACHE_MAX_MB)) if revalidate else None
+            _transports[key] = Transport(TransportAdapter(store, timeout))
+        return _transports[key]
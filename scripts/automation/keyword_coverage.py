@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Record of which keyword lines have been searched, for one-time backfills.
+
+A keyword line added to keywords.md used to be searched over the normal
+`arxiv.days_back` window only, so the only way to see its earlier papers
+was to raise days_back for every keyword, re-querying all of them over the
+wider window on every run.
+
+Each keyword line is now fingerprinted (a hash of its whitespace-normalized
+text) and the fingerprints of lines whose arXiv search has finished are
+kept in `.keyword_coverage.json` in the data directory. At the start of a
+run, lines without a fingerprint - new lines, and edited ones - are
+searched once over `arxiv.backfill_days` instead of the daily window;
+every other line stays on the daily window. A line is recorded as covered
+once its arXiv search finishes, so an aborted backfill is retried by the
+resumed run.
+
+The first run with no coverage file records every current line without
+backfilling it: only lines added after that get a backfill. Lines removed
+from keywords.md are forgotten, so re-adding one backfills it again.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+from query_cache import normalize_query
+
+COVERAGE_FILE = ".keyword_coverage.json"
+
+DEFAULT_BACKFILL_DAYS = 90
+DEFAULT_BACKFILL_MAX_RESULTS = 25
+
+
+def fingerprint(keyword):
+    """Stable ID of a keyword line; whitespace-only edits keep it"""
+    return hashlib.sha1(normalize_query(keyword).encode('utf-8')).hexdigest()[:16]
+
+
+class KeywordCoverage:
+    """Fingerprints of keyword lines whose arXiv search has finished"""
+
+    def __init__(self, data_dir):
+        self.path = Path(data_dir) / COVERAGE_FILE
+        self.lines = None
+        if self.path.exists():
+            with open(self.path, 'r') as f:
+                self.lines = json.load(f)['lines']
+
+    def uncovered(self, topics):
+        """Keyword lines in topics that have not been searched yet.
+
+        Args:
+            topics: Dict mapping topic names to lists of keywords
+
+        Returns:
+            List of keyword lines in keywords.md order (empty before the
+            first run has recorded any coverage)
+        """
+        if self.lines is None:
+            return []
+        uncovered = {}
+        for keywords in topics.values():
+            for keyword in keywords:
+                if fingerprint(keyword) not in self.lines:
+                    uncovered.setdefault(keyword, None)
+        return list(uncovered)
+
+    def update(self, topics, covered):
+        """Record finished lines and forget lines no longer in keywords.md
+
+        Args:
+            topics: Dict mapping topic names to lists of keywords
+            covered: Keyword lines whose arXiv search finished in this run
+        """
+        today = datetime.now().strftime('%Y-%m-%d')
+        current = {fingerprint(keyword): keyword for keywords in topics.values() for keyword in keywords}
+        previous = self.lines or {}
+        if self.lines is None:
+            # First run: every current line counts as covered from here on
+            covered = current.values()
+        lines = {fp: entry for fp, entry in previous.items() if fp in current}
+        for keyword in covered:
+            fp = fingerprint(keyword)
+            if fp in current and fp not in lines:
+                lines[fp] = {'keyword': keyword, 'since': today}
+
+        if lines == previous and self.path.exists():
+            return
+        self.lines = lines
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({'lines': lines}, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path.replace(self.path)
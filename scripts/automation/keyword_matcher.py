@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Compile keywords.md expressions into in-process matchers.
+
+Keyword lines use arXiv query syntax: quoted phrases, AND / OR / ANDNOT,
+parentheses and field prefixes such as ti: or abs:. arXiv is the only
+place that has ever interpreted them; this module parses and compiles
+each line so paper records from any source (arXiv, Google Scholar,
+cached responses, harvested metadata) can be checked and attributed to
+topics locally.
+
+    matcher = KeywordMatcher(['LLM AND "knowledge work"', 'ti:interview'])
+    matcher.match(paper)            # -> ['LLM AND "knowledge work"']
+    matcher.match_all(papers)       # -> one list of matched lines per paper
+
+Matching is token-based with light suffix stemming, which approximates
+arXiv's server-side analysis closely enough to re-check and attribute
+results (it is not a byte-for-byte reimplementation of arXiv search).
+"""
+
+import re
+from functools import lru_cache
+
+# arXiv field prefixes mapped to the paper dict fields they search.
+# Google Scholar papers carry a snippet instead of an abstract.
+FIELDS = {
+    'ti': ('title',),
+    'au': ('authors',),
+    'abs': ('abstract', 'snippet'),
+    'co': ('comment',),
+    'jr': ('journal_ref',),
+    'cat': ('categories',),
+    'rn': ('report_number',),
+    'id': ('url',),
+}
+# all: covers every field except the identifier, as on arXiv
+FIELDS['all'] = tuple(field for name, fields in FIELDS.items() if name != 'id' for field in fields)
+
+_TOKEN_RE = re.compile(r'[a-z]+:"[^"]*"|"[^"]*"|\(|\)|[^\s()"]+')
+_FIELD_RE = re.compile(r'^([a-z]+):(.*)$', re.DOTALL)
+_WORD_RE = re.compile(r'[a-z0-9]+')
+_OPERATORS = ('AND', 'OR', 'ANDNOT')
+
+
+@lru_cache(maxsize=65536)
+def stem(word):
+    """Strip common English suffixes so plurals and verb forms still match.
+
+    A plural "s" is removed and then any final "e", so a singular and its
+    plural stem alike whether or not the singular ends in "e" (image and
+    images -> imag, approach and approaches -> approach). Words ending in
+    "ss", "us" or "is" (process, focus, analysis) keep their "s".
+    """
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    for suffix in ('ing', 'ed'):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    if word.endswith('s') and not word.endswith(('ss', 'us', 'is')) and len(word) > 3:
+        word = word[:-1]
+    if word.endswith('e') and len(word) > 3:
+        word = word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Lowercase, split on non-alphanumerics and stem"""
+    return [stem(word) for word in _WORD_RE.findall(text.lower())]
+
+
+def parse_expression(expression):
+    """Parse a keyword line into a syntax tree.
+
+    Nodes are tuples:
+        ('term', field, tokens)       word or quoted phrase
+        ('AND' | 'OR' | 'ANDNOT', left, right)
+
+    Adjacent terms without an operator are joined with AND, and "AND NOT"
+    is read as ANDNOT.
+
+    Raises:
+        ValueError: If the expression is empty or has unbalanced parentheses
+    """
+    tokens = _TOKEN_RE.findall(expression)
+    if not tokens:
+        raise ValueError(f"Empty keyword expression: {expression!r}")
+    pos = 0
+
+    def peek():
+        return tokens[pos] if pos < len(tokens) else None
+
+    def parse_or(field):
+        nonlocal pos
+        node = parse_and(field)
+        while peek() == 'OR':
+            pos += 1
+            node = ('OR', node, parse_and(field))
+        return node
+
+    def parse_and(field):
+        nonlocal pos
+        node = parse_atom(field)
+        while peek() not in (None, 'OR', ')'):
+            op = 'AND'
+            if peek() in ('AND', 'ANDNOT'):
+                op = tokens[pos]
+                pos += 1
+                if op == 'AND' and peek() == 'NOT':
+                    op = 'ANDNOT'
+                    pos += 1
+            node = (op, node, parse_atom(field))
+        return node
+
+    def parse_atom(field):
+        nonlocal pos
+        token = peek()
+        if token is None or token in _OPERATORS or token == ')':
+            raise ValueError(f"Expected a term at position {pos + 1} in keyword expression: {expression!r}")
+        pos += 1
+
+        if token == '(':
+            node = parse_or(field)
+            if peek() != ')':
+                raise ValueError(f"Unbalanced parentheses in keyword expression: {expression!r}")
+            pos += 1
+            return node
+
+        prefix = _FIELD_RE.match(token)
+        if prefix and prefix.group(1) in FIELDS:
+            field, token = prefix.group(1), prefix.group(2)
+            if not token:
+                # Field prefix applied to a parenthesized group, e.g. ti:(a OR b)
+                return parse_atom(field)
+
+        words = tokenize(token.strip('"'))
+        if not words:
+            raise ValueError(f"Term {token!r} has no searchable words in keyword expression: {expression!r}")
+        return ('term', field, tuple(words))
+
+    node = parse_or('all')
+    if pos != len(tokens):
+        raise ValueError(f"Unbalanced parentheses in keyword expression: {expression!r}")
+    return node
+
+
+def expression_terms(node):
+    """List the (field, tokens) terms that appear in a syntax tree"""
+    if node[0] == 'term':
+        return [(node[1], node[2])]
+    return expression_terms(node[1]) + expression_terms(node[2])
+
+
+def compile_expression(expression):
+    """Compile a keyword line into a predicate over prepared records.
+
+    Returns:
+        Function taking a record from prepare_record and returning bool
+    """
+    return _compile(parse_expression(expression))
+
+
+def _compile(node):
+    op = node[0]
+
+    if op == 'term':
+        _, field, words = node
+        if len(words) == 1:
+            word = words[0]
+            return lambda record: word in record[field]
+
+        first, rest = words[0], words[1:]
+
+        def match_phrase(record):
+            positions = record[field].get(first)
+            if not positions:
+                return False
+            tokens = record[field + ':tokens']
+            return any(tuple(tokens[p + 1:p + len(words)]) == rest for p in positions)
+
+        return match_phrase
+
+    left, right = _compile(node[1]), _compile(node[2])
+    if op == 'AND':
+        return lambda record: left(record) and right(record)
+    if op == 'OR':
+        return lambda record: left(record) or right(record)
+    return lambda record: left(record) and not right(record)
+
+
+def prepare_record(paper, fields=None):
+    """Tokenize a paper dict once so many expressions can be tested against it.
+
+    Each field prefix maps to a dict of token -> positions, with the token
+    list itself stored under '<prefix>:tokens' for phrase checks. Missing
+    fields are treated as empty; authors may be a string or a list.
+
+    Args:
+        paper: Paper dict (digest format, optionally with extra arXiv fields)
+        fields: Field prefixes to index (default: all). 'all' is always indexed.
+    """
+    names = FIELDS if fields is None else set(fields) | {'all'}
+    raw_tokens = {}
+    record = {}
+
+    for name in names:
+        tokens = []
+        for field in FIELDS[name]:
+            if field not in raw_tokens:
+                value = paper.get(field) or ''
+                if isinstance(value, (list, tuple)):
+                    value = ' '.join(str(v) for v in value)
+                raw_tokens[field] = tokenize(str(value))
+            tokens.extend(raw_tokens[field])
+            # Separate fields with a gap so phrases can't span two fields
+            tokens.append('')
+
+        positions = {}
+        for i, token in enumerate(tokens):
+            if token:
+                positions.setdefault(token, []).append(i)
+        record[name] = positions
+        record[name + ':tokens'] = tokens
+
+    return record
+
+
+def _triggers(node):
+    """(field, token) pairs of which at least one must appear in a record for node to match.
+
+    Returns None when no such set can be derived (the expression is then
+    evaluated against every record).
+    """
+    op = node[0]
+    if op == 'term':
+        return {(node[1], node[2][0])}
+    if op == 'OR':
+        left, right = _triggers(node[1]), _triggers(node[2])
+        return None if left is None or right is None else left | right
+    if op == 'ANDNOT':
+        return _triggers(node[1])
+    # AND: either side's triggers are necessary; keep the more selective one
+    candidates = [t for t in (_triggers(node[1]), _triggers(node[2])) if t is not None]
+    return min(candidates, key=len) if candidates else None
+
+
+class KeywordMatcher:
+    """Bulk matcher for many compiled keyword expressions.
+
+    Expressions are indexed by trigger tokens, so each record is only
+    evaluated against expressions that could possibly match it. Triggers
+    in fields that all: covers are looked up in the record's all: tokens;
+    the others (id:) in their own field. Lines that fail to parse are
+    reported in `errors` and never match.
+    """
+
+    def __init__(self, expressions):
+        self.expressions = []
+        self.errors = {}
+        self._predicates = []
+        self._index = {}           # field -> token -> expression numbers
+        self._always = []
+        self.fields = {'all'}
+
+        for expression in dict.fromkeys(expressions):
+            try:
+                tree = parse_expression(expression)
+            except ValueError as e:
+                self.errors[expression] = str(e)
+                continue
+
+            n = len(self.expressions)
+            self.expressions.append(expression)
+            self._predicates.append(_compile(tree))
+            self.fields.update(field for field, _ in expression_terms(tree))
+
+            triggers = _triggers(tree)
+            if triggers is None:
+                self._always.append(n)
+            else:
+                for field, token in triggers:
+                    if set(FIELDS[field]) <= set(FIELDS['all']):
+                        field = 'all'
+                    self._index.setdefault(field, {}).setdefault(token, []).append(n)
+
+    def _candidates(self, record):
+        candidates = set(self._always)
+        for field, index in self._index.items():
+            for token in record[field]:
+                candidates.update(index.get(token, ()))
+        return sorted(candidates)
+
+    def match(self, paper):
+        """Return the expressions (in input order) that match a paper dict"""
+        return self.match_prepared(prepare_record(paper, self.fields))
+
+    def match_prepared(self, record):
+        """Return the expressions that match a record from prepare_record.
+
+        The record must index every prefix in self.fields.
+        """
+        return [
+            self.expressions[n] for n in self._candidates(record)
+            if self._predicates[n](record)
+        ]
+
+    def match_all(self, papers):
+        """Match many paper dicts in one pass.
+
+        Returns:
+            List with one list of matched expressions per paper
+        """
+        return [self.match(paper) for paper in papers]
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Per-keyword yield history and a budgeted query schedule.
+
+Every keyword line used to be searched on arXiv every day (about ten
+seconds of rate-limited requests per keyword) and on Google Scholar every
+Sunday (one SerpAPI credit per keyword), whether or not it had produced a
+paper in months.
+
+After each fetch run, every keyword's check is recorded in
+`.keyword_yield.db`: new papers found (after the seen filter), time spent
+and SerpAPI credits used. Papers kept after deduplication and filtering
+come from the digest store (see digest_store.py). From this history the
+scheduler gives each keyword line, per source:
+
+- an interval: keywords keep their base frequency (daily for arXiv, weekly
+  for Scholar) while they yield about one kept paper every two checks,
+  and are checked half as often for each halving of their yield, up to
+  `schedule.max_interval_days` / `schedule.scholar_max_interval_days`
+- max_results: twice the most new papers a check has produced (at least
+  3, at most the configured max_results)
+
+If the projected cost still exceeds `schedule.daily_seconds` (arXiv time
+per day) or `schedule.scholar_credits` (SerpAPI credits per month), the
+keywords with the fewest kept papers per unit of cost are checked less
+often until it fits. A keyword line without history (new or edited) is
+always due. When an arXiv keyword is due after being skipped, it is
+searched over every day since its last check, with its max_results
+multiplied by the number of days covered, so the days it was skipped are
+not cut off by a one-day cap.
+
+The schedule is applied when `schedule.enabled` is true; history is always
+recorded. To see the yields, the schedule and the projected savings:
+
+    python3 keyword_scheduler.py
+"""
+
+import argparse
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import yaml
+
+from digest_store import query_papers
+from seen_store import ARXIV, GOOGLE_SCHOLAR
+
+DB_FILE = ".keyword_yield.db"
+
+DEFAULT_HISTORY_DAYS = 90
+DEFAULT_DAILY_SECONDS = 600          # arXiv time per day
+DEFAULT_SCHOLAR_CREDITS = 200        # SerpAPI credits per month
+DEFAULT_MAX_INTERVAL_DAYS = 28
+DEFAULT_SCHOLAR_MAX_INTERVAL_DAYS = 56
+
+BASE_INTERVAL_DAYS = {ARXIV: 1, GOOGLE_SCHOLAR: 7}
+# Cost of a check without history: seconds (arXiv) or credits (Scholar)
+DEFAULT_CHECK_COST = {ARXIV: 10.0, GOOGLE_SCHOLAR: 1.0}
+BUDGET_PERIOD_DAYS = {ARXIV: 1, GOOGLE_SCHOLAR: 30}
+COST_UNIT = {ARXIV: 's/day', GOOGLE_SCHOLAR: 'credits/month'}
+
+MIN_CHECKS = 4            # checks before a keyword's schedule is adjusted
+TARGET_KEPT = 0.5         # kept papers per check that earn the base frequency
+MIN_MAX_RESULTS = 3
+
+
+class YieldHistory:
+    """One row per (date, source, keyword) check, backed by SQLite"""
+
+    def __init__(self, data_dir):
+        data_dir = Path(data_dir)
+        data_dir.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(data_dir / DB_FILE)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checks ("
+            " date TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " keyword TEXT NOT NULL,"
+            " found INTEGER NOT NULL,"
+            " seconds REAL NOT NULL,"
+            " credits INTEGER NOT NULL,"
+            " PRIMARY KEY (date, source, keyword))"
+        )
+        self._conn.commit()
+
+    def record(self, date, queries):
+        """Record the keyword checks made by a run's queries.
+
+        Args:
+            date: Date of the checks (YYYY-MM-DD)
+            queries: QueryMetrics of the run; a combined query's time is
+                split evenly across its keywords, and a keyword searched
+                twice on one date (under two topics) counts as one check
+        """
+        rows = {}
+        for query in queries:
+            if not query.keywords:
+                continue
+            share = 1 / len(query.keywords)
+            credits = query.requests if query.source == GOOGLE_SCHOLAR else 0
+            for keyword in query.keywords:
+                found, seconds, used = rows.get((query.source, keyword), (0, 0.0, 0))
+                rows[(query.source, keyword)] = (
+                    found + query.kept_by_keyword.get(keyword, 0),
+                    seconds + query.wall * share,
+                    used + credits,
+                )
+
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO checks (date, source, keyword, found, seconds, credits) VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (date, source, keyword) DO UPDATE SET"
+                " found = found + excluded.found, seconds = seconds + excluded.seconds,"
+                " credits = credits + excluded.credits",
+                [(date, source, keyword, found, round(seconds, 3), used)
+                 for (source, keyword), (found, seconds, used) in rows.items()]
+            )
+
+    def stats(self, since):
+        """Per-keyword totals since a date, as {(source, keyword): {checks, found, peak, seconds, credits, last}}"""
+        rows = self._conn.execute(
+            "SELECT source, keyword, COUNT(*), SUM(found), MAX(found), SUM(seconds), SUM(credits), MAX(date)"
+            " FROM checks WHERE date >= ? GROUP BY source, keyword", (since,)
+        )
+        return {
+            (source, keyword): {'checks': checks, 'found': found, 'peak': peak,
+                                'seconds': seconds, 'credits': credits, 'last': last}
+            for source, keyword, checks, found, peak, seconds, credits, last in rows
+        }
+
+    def close(self):
+        self._conn.close()
+
+
+def kept_counts(data_dir, since):
+    """Papers kept in digests since a date, as {(source, keyword): count}.
+
+    Papers removed by /filter-research-digest or prescoring are not counted.
+    """
+    counts = {}
+    for record in query_papers(data_dir, start=since):
+        if record['filtered'] is False:
+            continue
+        for keyword in record.get('keywords', []):
+            key = (record['source'], keyword)
+            counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def plan_source(source, keywords, stats, kept, max_results, max_interval, budget, today):
+    """Schedule one source's keyword lines.
+
+    Args:
+        source: ARXIV or GOOGLE_SCHOLAR
+        keywords: Keyword lines, deduplicated, in keywords.md order
+        stats: YieldHistory.stats() result
+        kept: kept_counts() result
+        max_results: Configured max_results for the source
+        max_interval: Longest interval in days
+        budget: Cost allowed per budget period (seconds per day for arXiv,
+            credits per month for Scholar; None for no limit)
+        today: date of the run
+
+    Returns:
+        (entries, unscheduled, scheduled): entries maps each keyword to
+        {interval, max_results, due, days_since, checks, found, kept, rate,
+        cost}; unscheduled and scheduled are the projected cost per budget
+        period without and with the schedule
+    """
+    base = BASE_INTERVAL_DAYS[source]
+    period = BUDGET_PERIOD_DAYS[source]
+    max_interval = max(base, max_interval)
+
+    known_costs = []
+    for keyword in keywords:
+        history = stats.get((source, keyword))
+        if history:
+            spent = history['credits'] if source == GOOGLE_SCHOLAR else history['seconds']
+            known_costs.append(spent / history['checks'])
+    default_cost = sorted(known_costs)[len(known_costs) // 2] if known_costs else DEFAULT_CHECK_COST[source]
+
+    entries = {}
+    for keyword in keywords:
+        history = stats.get((source, keyword)) or {'checks': 0, 'found': 0, 'peak': 0, 'seconds': 0, 'credits': 0, 'last': None}
+        checks = history['checks']
+        kept_papers = kept.get((source, keyword), 0)
+        # A keyword without history starts at one kept paper per check
+        rate = (kept_papers + 1) / (checks + 1)
+        if checks:
+            cost = (history['credits'] if source == GOOGLE_SCHOLAR else history['seconds']) / checks
+        else:
+            cost = default_cost
+
+        interval, keyword_max_results = base, max_results
+        if checks >= MIN_CHECKS:
+            while interval * 2 <= max_interval and rate * interval / base < TARGET_KEPT:
+                interval *= 2
+            keyword_max_results = min(max_results, max(MIN_MAX_RESULTS, 2 * history['peak']))
+
+        days_since = (today - datetime.strptime(history['last'], '%Y-%m-%d').date()).days if history['last'] else None
+        entries[keyword] = {
+            'interval': interval, 'max_results': keyword_max_results, 'days_since': days_since,
+            'checks': checks, 'found': history['found'], 'kept': kept_papers,
+            'rate': rate, 'cost': cost,
+        }
+
+    def projected():
+        return sum(entry['cost'] * period / entry['interval'] for entry in entries.values())
+
+    unscheduled = sum(entry['cost'] * period / base for entry in entries.values())
+
+    # Over budget: check the least productive keywords (per unit of cost) less often
+    while budget is not None and projected() > budget:
+        candidates = [entry for entry in entries.values() if entry['checks'] and entry['interval'] * 2 <= max_interval]
+        if not candidates:
+            break
+        slowest = min(candidates, key=lambda entry: entry['rate'] / max(entry['cost'], 1e-6))
+        slowest['interval'] *= 2
+
+    for entry in entries.values():
+        # Keywords at the base frequency are searched on every run, reruns included
+        entry['due'] = entry['interval'] == base or entry['days_since'] is None or entry['days_since'] >= entry['interval']
+
+    return entries, unscheduled, projected()
+
+
+def data_dir_for(config):
+    research_root = Path(config['paths']['research_root']).expanduser().resolve()
+    return research_root / config['paths']['data']
+
+
+def plan(config, topics, sources, today=None):
+    """Schedule every keyword line for each source.
+
+    Returns:
+        Dict mapping source to (entries, unscheduled, scheduled), see plan_source
+    """
+    schedule_config = config.get('schedule') or {}
+    today = today or datetime.now().date()
+    since = (today - timedelta(days=schedule_config.get('history_days', DEFAULT_HISTORY_DAYS))).strftime('%Y-%m-%d')
+    data_dir = data_dir_for(config)
+
+    history = YieldHistory(data_dir)
+    try:
+        stats = history.stats(since)
+    finally:
+        history.close()
+    kept = kept_counts(data_dir, since)
+    keywords = list(dict.fromkeys(keyword for topic_keywords in topics.values() for keyword in topic_keywords))
+
+    settings = {
+        ARXIV: (config['arxiv']['max_results'],
+                schedule_config.get('max_interval_days', DEFAULT_MAX_INTERVAL_DAYS),
+                schedule_config.get('daily_seconds', DEFAULT_DAILY_SECONDS) or None),
+        GOOGLE_SCHOLAR: (config['google_scholar']['max_results'],
+                         schedule_config.get('scholar_max_interval_days', DEFAULT_SCHOLAR_MAX_INTERVAL_DAYS),
+                         schedule_config.get('scholar_credits', DEFAULT_SCHOLAR_CREDITS) or None),
+    }
+    return {
+        source: plan_source(source, keywords, stats, kept, *settings[source], today)
+        for source in sources
+    }
+
+
+def run_schedule(config, topics, sources):
+    """The schedule for this run, in the form the fetch checkpoint stores.
+
+    Returns:
+        {'skip': {source: [keyword]}, 'days': {keyword: arXiv days_back},
+        'max_results': {source: {keyword: max_results}}}, where max_results
+        is per base interval; fetch_papers.py scales it to wider windows
+    """
+    schedule = {'skip': {}, 'days': {}, 'max_results': {}}
+    for source, (entries, unscheduled, scheduled) in plan(config, topics, sources).items():
+        skip = [keyword for keyword, entry in entries.items() if not entry['due']]
+        schedule['skip'][source] = skip
+        schedule['max_results'][source] = {keyword: entry['max_results'] for keyword, entry in entries.items()}
+        if source == ARXIV:
+            # A due keyword skipped on earlier days is searched back to its last check
+            schedule['days'] = {
+                keyword: entry['days_since'] for keyword, entry in entries.items()
+                if entry['due'] and entry['days_since'] and entry['days_since'] > 1
+            }
+        print(f"  Schedule ({source}): {len(entries) - len(skip)} of {len(entries)} keyword lines due; "
+              f"projected {scheduled:.0f} {COST_UNIT[source]} instead of {unscheduled:.0f}", flush=True)
+    return schedule
+
+
+def record_run(config, queries, date=None):
+    """Add a run's keyword checks to the yield history"""
+    history = YieldHistory(data_dir_for(config))
+    try:
+        history.record(date or datetime.now().strftime('%Y-%m-%d'), queries)
+    finally:
+        history.close()
+
+
+def print_report(config, topics, sources):
+    for source, (entries, unscheduled, scheduled) in plan(config, topics, sources).items():
+        unit = COST_UNIT[source]
+        print(f"\n{source}")
+        print(f"  {'checks':>6} {'found':>5} {'kept':>4} {'cost':>6} {'every':>6} {'max':>4}  keyword")
+        for keyword, entry in sorted(entries.items(), key=lambda item: item[1]['rate']):
+            print(f"  {entry['checks']:>6} {entry['found']:>5} {entry['kept']:>4} {entry['cost']:>6.1f} "
+                  f"{str(entry['interval']) + 'd':>6} {entry['max_results']:>4}  {keyword[:70]}")
+        saved = unscheduled - scheduled
+        share = saved / unscheduled * 100 if unscheduled else 0
+        print(f"  Projected: {scheduled:.0f} {unit} instead of {unscheduled:.0f} ({saved:.0f} {unit} saved, {share:.0f}%)")
+
+
+def load_config():
+    config_path = Path.home() / ".claude" / "research-system-config" / "config.yaml"
+    with open(config_path, 'r') as f:
+        return yaml.safe_load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show keyword yields, the query schedule and its projected savings.")
+    parser.add_argument('--source', choices=(ARXIV, GOOGLE_SCHOLAR), help="Only this source (default: both)")
+    args = parser.parse_args()
+
+    from fetch_papers import load_keywords  # fetch_papers imports this module
+
+    config = load_config()
+    topics = load_keywords(config['paths']['research_root'])
+    print_report(config, topics, [args.source] if args.source else [ARXIV, GOOGLE_SCHOLAR])
+
+
+if __name__ == "__main__":
+    main()
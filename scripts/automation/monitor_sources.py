@@ -2,14 +2,23 @@
 """
 Monitor all topic folders for new PDFs in Sources/ directories.
 Create queue for PDF summarization.
+
+    python3 monitor_sources.py           # scan once
+    python3 monitor_sources.py --watch   # keep running, queue PDFs as they are saved
 """
 
+import argparse
 import os
-import json
+import time
 import yaml
 from datetime import datetime
 from pathlib import Path
 
+from research_queue import get_queue, DB_FILE as QUEUE_FILE
+from source_index import SourceIndex
+from text_cache import prepare_queued
+from source_watcher import SourceWatcher, inotify_available, DEFAULT_SETTLE_SECONDS, DEFAULT_POLL_SECONDS
+
 def load_config():
     """Load configuration from config.yaml"""
     # Config stored outside plugin directory to survive updates
@@ -34,104 +43,221 @@ def load_config():
 
     return config
 
-def get_processed_files(tracking_file):
-    """Load list of already processed files"""
-    if tracking_file.exists():
-        with open(tracking_file, 'r') as f:
-            return set(json.load(f))
-    return set()
+def summary_path(pdf_file):
+    """Notes/ summary of a PDF in a Sources/ folder"""
+    return pdf_file.parent.parent / 'Notes' / f"{pdf_file.stem}.md"
 
-def save_processed_files(tracking_file, processed):
-    """Save list of processed files"""
-    with open(tracking_file, 'w') as f:
-        json.dump(list(processed), f, indent=2)
+def find_new_pdfs(research_root, index, hold=()):
+    """Find PDFs in Sources/ folders that haven't been processed
 
-def find_new_pdfs(research_root, processed_files):
-    """Find all PDFs in Sources/ folders that haven't been processed
+    Only Sources/ folders changed since the last scan are listed (see
+    source_index.py). PDFs are identified by content hash, so a PDF that
+    was renamed, moved or saved to a second topic is matched to the PDF
+    already processed with the same content (or to one earlier in this
+    scan). PDFs in hold (still being written) are left for a later scan.
 
-    Returns: list of tuples (pdf_path, has_summary, pdf_id)
+    Returns: (list of tuples (pdf_path, has_summary, pdf_id, original), ScanDelta)
+        original is the earlier PDF with the same content whose summary
+        to link to, or None if the PDF needs a summary of its own
     """
+    delta = index.scan(research_root)
+    paths = [path for path in index.unprocessed() if path not in hold]
+    if paths:
+        index.hash_processed(paths)
+    hashes = index.content_hashes(paths)
     new_pdfs = []
+    first_seen = {}
 
-    # Walk through all topic folders
-    for topic_dir in research_root.iterdir():
-        if not topic_dir.is_dir() or topic_dir.name in ['scripts', 'daily-digests', '.research-data']:
+    for path in paths:
+        pdf_id = hashes.get(path)
+        if pdf_id is None:
+            # Removed since the scan
             continue
+        # Check if summary already exists in Notes/ folder
+        pdf_file = Path(path)
+        has_summary = summary_path(pdf_file).exists()
 
-        sources_dir = topic_dir / 'Sources'
-        notes_dir = topic_dir / 'Notes'
+        # Earlier copy whose summary exists, or is still to be written
+        original = None
+        for candidate in index.processed_by_hash(pdf_id) + first_seen.get(pdf_id, []):
+            candidate = Path(candidate)
+            if candidate != pdf_file and (summary_path(candidate).exists() or candidate.exists()):
+                original = candidate
+                break
+        if original is None:
+            first_seen.setdefault(pdf_id, []).append(path)
 
-        if not sources_dir.exists():
-            continue
+        # Add to new PDFs list with summary status, pdf_id and original
+        new_pdfs.append((pdf_file, has_summary, pdf_id, original))
 
-        # Find PDFs in Sources folder
-        for pdf_file in sources_dir.glob('*.pdf'):
-            # Use absolute path as identifier
-            pdf_id = str(pdf_file.absolute())
+    return new_pdfs, delta
 
-            if pdf_id not in processed_files:
-                # Check if summary already exists in Notes/ folder
-                summary_file = notes_dir / f"{pdf_file.stem}.md"
-                has_summary = summary_file.exists()
+def link_summary(pdf_file, original, research_root, link_format):
+    """Write a Notes/ entry for pdf_file pointing to original's summary"""
+    target = summary_path(original)
+    if link_format == 'markdown':
+        link = f"[{original.stem}]({os.path.relpath(target, summary_path(pdf_file).parent)})"
+    else:
+        link = f"[[{target.relative_to(research_root).with_suffix('').as_posix()}]]"
+    original_rel = original.relative_to(research_root).as_posix()
 
-                # Add to new PDFs list with summary status AND pdf_id
-                new_pdfs.append((pdf_file, has_summary, pdf_id))
+    note_file = summary_path(pdf_file)
+    note_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(note_file, 'w') as f:
+        f.write(f'---\ntitle: "{pdf_file.stem}"\nduplicate_of: "{original_rel}"\n---\n\n')
+        f.write(f"Same PDF as `{original_rel}`. See its summary: {link}\n")
 
-    return new_pdfs
+def queue_path(pdf_path, research_root):
+    """A PDF's path as stored in the queue: relative to research_root where possible"""
+    try:
+        return str(pdf_path.relative_to(research_root))
+    except ValueError:
+        # If path is not relative to research_root, use absolute path
+        return str(pdf_path)
 
-def create_queue(queue_file, pdf_paths, research_root):
-    """Create queue file with PDF paths relative to research_root"""
-    # Convert absolute paths to relative paths
-    relative_paths = []
-    for pdf_path in pdf_paths:
-        try:
-            rel_path = pdf_path.relative_to(research_root)
-            relative_paths.append(str(rel_path))
-        except ValueError:
-            # If path is not relative to research_root, use absolute path
-            relative_paths.append(str(pdf_path))
+def create_queue(queue, pdf_paths, research_root):
+    """Add PDF paths relative to research_root to the summarization queue
 
-    # Write queue file
-    queue_file.parent.mkdir(parents=True, exist_ok=True)
-    with open(queue_file, 'w') as f:
-        json.dump(relative_paths, f, indent=2)
+    PDFs already in the queue (not yet summarized) are kept.
 
-def main():
-    # Load configuration
-    config = load_config()
+    Returns: number of PDFs waiting in the queue
+    """
+    queue.enqueue([queue_path(pdf_path, research_root) for pdf_path in pdf_paths])
+    return queue.waiting()
+
+def plan_queued(config, queue, needs_summary, research_root):
+    """Extract queued PDFs' text and store their summary plans in the queue
+
+    Runs after the PDFs are queued, so a slow or failing extraction only
+    leaves them without a plan (summarizers then read the PDF itself).
+
+    Args:
+        needs_summary: Dict mapping content hashes to PDF paths
+    """
+    try:
+        plans = prepare_queued(config, needs_summary)
+    except Exception as e:
+        print(f"  Warning: could not extract queued PDFs ({e}); they are queued without a plan", flush=True)
+        return
+    queue.set_plans({
+        queue_path(pdf_path, research_root): plans.get(pdf_id) for pdf_id, pdf_path in needs_summary.items()
+    })
+
+def scan(config, hold=()):
+    """Queue new PDFs from every topic's Sources/ folder.
+
+    Args:
+        config: Configuration dictionary
+        hold: PDF paths still being written, not queued yet
+
+    Returns:
+        Number of PDFs queued
+    """
     research_root = Path(config['paths']['research_root']).expanduser().resolve()
     data_dir = research_root / config['paths']['data']
 
     # Setup tracking
-    tracking_file = data_dir / '.processed_pdfs.json'
-    processed_files = get_processed_files(tracking_file)
+    index = SourceIndex(data_dir)
+    try:
+        # Find new PDFs
+        new_pdfs, delta = find_new_pdfs(research_root, index, hold)
+        print(f"Scanned {delta.summary()}", flush=True)
 
-    # Find new PDFs
-    new_pdfs = find_new_pdfs(research_root, processed_files)
+        if not new_pdfs:
+            print("No new PDFs found.", flush=True)
+            return 0
 
-    if not new_pdfs:
-        print("No new PDFs found.")
-        return
+        print(f"Found {len(new_pdfs)} new PDF(s):", flush=True)
+
+        # Collect PDF paths; duplicates and moved PDFs link to the existing summary
+        link_format = config.get('links', {}).get('format', 'obsidian')
+        pdf_paths_to_queue = []
+        linked = 0
+        for pdf_path, has_summary, pdf_id, original in new_pdfs:
+            if original is not None:
+                if not has_summary:
+                    link_summary(pdf_path, original, research_root, link_format)
+                print(f"  • {pdf_path.name} (same PDF as {original.relative_to(research_root)}, linked to its summary)", flush=True)
+                linked += 1
+                continue
+            status = "summary exists, will link" if has_summary else "needs summary"
+            print(f"  • {pdf_path.name} ({status})", flush=True)
+            pdf_paths_to_queue.append(pdf_path)
 
-    print(f"Found {len(new_pdfs)} new PDF(s):")
+        # Add to the queue in the research data directory (before marking
+        # processed, so a PDF is never marked without being queued)
+        queue = get_queue(config) if pdf_paths_to_queue else None
+        try:
+            if queue:
+                queue_length = create_queue(queue, pdf_paths_to_queue, research_root)
 
-    # Collect PDF paths and mark as processed
-    pdf_paths_to_queue = []
-    for pdf_path, has_summary, pdf_id in new_pdfs:
-        status = "summary exists, will link" if has_summary else "needs summary"
-        print(f"  • {pdf_path.name} ({status})")
-        pdf_paths_to_queue.append(pdf_path)
-        processed_files.add(pdf_id)
+            # Save processed files tracking
+            index.mark_processed(
+                (str(pdf_path) for pdf_path, _, _, _ in new_pdfs),
+                hashes={str(pdf_path): pdf_id for pdf_path, _, pdf_id, _ in new_pdfs}
+            )
 
-    # Create queue file in research data directory
-    data_dir = research_root / config['paths']['data']
-    queue_file = data_dir / '.research-queue.json'
-    create_queue(queue_file, pdf_paths_to_queue, research_root)
+            # Then open each PDF that needs a summary once: extract its text
+            # and plan its summary (size, pages, sections), so the digest can
+            # dispatch summarizers straight away
+            needs_summary = {
+                pdf_id: pdf_path for pdf_path, has_summary, pdf_id, original in new_pdfs
+                if original is None and not has_summary
+            }
+            if queue and needs_summary:
+                plan_queued(config, queue, needs_summary, research_root)
+        finally:
+            if queue:
+                queue.close()
+    finally:
+        index.close()
 
-    # Save processed files tracking
-    save_processed_files(tracking_file, processed_files)
+    if linked:
+        print(f"\n✓ Linked {linked} duplicate or moved PDF(s) to existing summaries", flush=True)
+    if pdf_paths_to_queue:
+        print(f"\n✓ Queued {len(pdf_paths_to_queue)} PDF(s), {queue_length} waiting in queue: {data_dir / QUEUE_FILE}", flush=True)
+    return len(pdf_paths_to_queue)
+
+def watch(config):
+    """Queue PDFs as they are saved, until interrupted (see source_watcher.py)"""
+    research_root = Path(config['paths']['research_root']).expanduser().resolve()
+    monitor_config = config.get('monitor', {})
+    settle_seconds = monitor_config.get('settle_seconds', DEFAULT_SETTLE_SECONDS)
+    poll_seconds = monitor_config.get('poll_seconds', DEFAULT_POLL_SECONDS)
 
-    print(f"\n✓ Created queue with {len(pdf_paths_to_queue)} PDF(s): {queue_file}")
+    if not inotify_available():
+        print(f"inotify not available; scanning every {poll_seconds}s", flush=True)
+        while True:
+            scan(config)
+            time.sleep(poll_seconds)
+
+    # Watch first, then scan, so nothing saved in between is missed
+    watcher = SourceWatcher(research_root, settle_seconds)
+    try:
+        print(f"Watching {watcher.folders} Sources folder(s) under {research_root}", flush=True)
+        scan(config)
+        while True:
+            reason = watcher.wait()
+            print(f"\n[{datetime.now():%Y-%m-%d %H:%M:%S}] {reason}", flush=True)
+            scan(config, hold=watcher.held)
+    finally:
+        watcher.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue new PDFs in Sources/ folders for summarization.")
+    parser.add_argument('--watch', action='store_true',
+                        help="Keep running and queue PDFs within seconds of being saved (inotify on Linux)")
+    args = parser.parse_args()
+
+    # Load configuration
+    config = load_config()
+    if not args.watch:
+        scan(config)
+        return
+    try:
+        watch(config)
+    except KeyboardInterrupt:
+        print("\nStopped watching.", flush=True)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of search responses shared by every query in a run.
+
+The same keyword line can appear under several topics in keywords.md, and
+fetch_papers.py is often re-run by hand after tweaking filters. Both used
+to send identical arXiv and SerpAPI requests again. Responses are now
+cached in a SQLite database in the data directory, keyed by (source,
+normalized query, max_results, date window), so a repeated query within
+the TTL costs no request and no SerpAPI credit.
+
+Cached responses are the unfiltered results: seen-paper filtering still
+happens on every run, so a rerun only shows papers not already in a digest.
+Entries expire after `query_cache.ttl_hours`, and the least recently used
+entries are evicted once the cache grows past `query_cache.max_mb`;
+responses larger than a tenth of it are not cached at all.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+DB_FILE = ".query_cache.db"
+
+DEFAULT_TTL_HOURS = 12
+DEFAULT_MAX_MB = 50
+# Largest share of max_mb one response may take; larger ones are not cached
+MAX_ENTRY_SHARE = 0.1
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def normalize_query(query):
+    """Collapse whitespace so trivially different lines share an entry.
+
+    Case is kept: arXiv's AND/OR/ANDNOT operators are case-sensitive.
+    """
+    return ' '.join(query.split())
+
+
+def date_window(days_back):
+    """(start, end) dates (YYYY-MM-DD) of a days_back search window"""
+    end = datetime.now()
+    start = end - timedelta(days=days_back)
+    return start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+
+
+class QueryCache:
+    """TTL + size-bounded response cache, backed by SQLite.
+
+    Safe to share between the arXiv and Scholar worker threads. A
+    ttl_hours of 0 disables the cache (get always misses, put does nothing).
+    """
+
+    def __init__(self, data_dir, ttl_hours=DEFAULT_TTL_HOURS, max_mb=DEFAULT_MAX_MB):
+        self.ttl = ttl_hours * 3600
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        if not self.enabled:
+            return
+
+        data_dir = Path(data_dir)
+        data_dir.mkdir(parents=True, exist_ok=True)
+        self.path = data_dir / DB_FILE
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " source TEXT NOT NULL,"
+            " query TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " results TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._conn.commit()
+        self._expire()
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    @staticmethod
+    def key(source, query, max_results, window):
+        raw = json.dumps([source, normalize_query(query), max_results, list(window)])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, source, query, max_results, window):
+        """Return cached results, or None on a miss or expired entry"""
+        if not self.enabled:
+            return None
+
+        key = self.key(source, query, max_results, window)
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT created, results FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[0] > self.ttl:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[1])
+
+    def put(self, source, query, max_results, window, results):
+        """Store results (any JSON-serializable value), evicting LRU entries if over size.
+
+        Results larger than MAX_ENTRY_SHARE of max_mb are not stored, so
+        one huge response can't flush the rest of the cache.
+        """
+        if not self.enabled:
+            return
+
+        key = self.key(source, query, max_results, window)
+        data = json.dumps(results)
+        if len(data) > self.max_bytes * MAX_ENTRY_SHARE:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, source, query, created, last_used, size, results)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, source, normalize_query(query), now, now, len(data), data)
+            )
+            self._evict()
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (cutoff,))
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits max_mb (caller holds the lock)"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_used"
+        ).fetchall():
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def close(self):
+        if self._conn:
+            self._conn.close()
+
+
+def get_query_cache(config):
+    """Return the QueryCache for the configured data directory.
+
+    Opened once per process and shared by every search function. Reads
+    query_cache.ttl_hours and query_cache.max_mb from the config.
+    """
+    research_root = Path(config['paths']['research_root']).expanduser().resolve()
+    data_dir = research_root / config['paths']['data']
+
+    with _caches_lock:
+        if data_dir not in _caches:
+            cache_config = config.get('query_cache') or {}
+            _caches[data_dir] = QueryCache(
+                data_dir,
+                cache_config.get('ttl_hours', DEFAULT_TTL_HOURS),
+                cache_config.get('max_mb', DEFAULT_MAX_MB)
+            )
+        return _caches[data_dir]
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Plan arXiv searches by packing several keyword lines into one OR'd query.
+
+Each line in keywords.md is a complete arXiv query on its own. Instead of
+sending one rate-limited request per line, the planner groups lines into
+combined queries that stay under arXiv's URL and result limits. Papers
+returned by a combined query are attributed back to the keyword line(s)
+and topic(s) they match locally, so the digest looks the same as before.
+"""
+
+from urllib.parse import quote_plus
+
+from keyword_matcher import parse_expression, expression_terms
+
+# arXiv API limits: a single page holds at most 2000 entries and the API
+# refuses to page past 30000 results for one query.
+ARXIV_MAX_PAGE_SIZE = 2000
+ARXIV_MAX_RESULTS = 30000
+
+# Keep the encoded search_query well under typical URL limits (the full
+# request URL also carries start/max_results/sortBy parameters).
+DEFAULT_MAX_QUERY_LENGTH = 1000
+DEFAULT_MAX_KEYWORDS_PER_QUERY = 10
+
+
+def plan_queries(topics, max_results, max_query_length=DEFAULT_MAX_QUERY_LENGTH,
+                 max_keywords_per_query=DEFAULT_MAX_KEYWORDS_PER_QUERY):
+    """Group keyword lines from all topics into combined arXiv queries.
+
+    Keyword lines that appear under several topics are only searched once.
+    Batches follow the order of topics and keywords in keywords.md so that
+    a batch index maps back to a position in the run.
+
+    Args:
+        topics: Dict mapping topic names to lists of keyword lines
+        max_results: Max results per keyword line
+        max_query_length: Max URL-encoded length of a combined search_query
+        max_keywords_per_query: Max keyword lines packed into one query
+
+    Returns:
+        List of batch dicts with keys:
+            query: Combined arXiv search_query string
+            keywords: Keyword lines in this batch (in keywords.md order)
+            topics: Dict mapping each keyword line to the topics listing it
+            max_results: Total results to request for the combined query
+    """
+    keyword_topics = {}
+    for topic, keywords in topics.items():
+        for keyword in keywords:
+            keyword_topics.setdefault(keyword, [])
+            if topic not in keyword_topics[keyword]:
+                keyword_topics[keyword].append(topic)
+
+    batches = []
+    current = []
+
+    for keyword in keyword_topics:
+        candidate = current + [keyword]
+        too_long = len(quote_plus(combine_keywords(candidate))) > max_query_length
+        if current and (too_long or len(candidate) > max_keywords_per_query):
+            batches.append(current)
+            current = [keyword]
+        else:
+            current = candidate
+
+    if current:
+        batches.append(current)
+
+    return [
+        {
+            'query': combine_keywords(batch),
+            'keywords': batch,
+            'topics': {keyword: keyword_topics[keyword] for keyword in batch},
+            'max_results': min(max_results * len(batch), ARXIV_MAX_RESULTS),
+        }
+        for batch in batches
+    ]
+
+
+def combine_keywords(keywords):
+    """OR together keyword lines, parenthesizing each so its own operators bind first"""
+    if len(keywords) == 1:
+        return keywords[0]
+    return ' OR '.join(f'({keyword})' for keyword in keywords)
+
+
+def attribute_keywords(batch, matched, record):
+    """Work out which keyword lines of a batch a paper matched.
+
+    arXiv only reports that a paper matched the combined query, so the
+    lines are re-checked locally with keyword_matcher. Local matching can't
+    reproduce arXiv's server-side analysis exactly; if no line of the batch
+    matched, the paper is attributed to the line sharing the most terms
+    with it so it still reaches the digest.
+
+    Args:
+        batch: Batch dict from plan_queries
+        matched: Keyword lines the local matcher found for the paper
+        record: The paper as returned by keyword_matcher.prepare_record
+
+    Returns:
+        List of matched keyword lines from the batch (never empty)
+    """
+    in_batch = [keyword for keyword in batch['keywords'] if keyword in matched]
+    if in_batch:
+        return in_batch
+
+    def overlap(keyword):
+        try:
+            terms = expression_terms(parse_expression(keyword))
+        except ValueError:
+            return 0
+        return sum(1 for _, words in terms if all(word in record['all'] for word in words))
+
+    return [max(batch['keywords'], key=overlap)]
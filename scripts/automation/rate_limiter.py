@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Token-bucket rate limiting shared by everything that calls one source.
+
+Each source (arXiv, SerpAPI) gets one TokenBucket per run. Every request
+takes a token first; tokens refill at one per `interval` seconds up to
+`burst`. With burst=1 this reproduces the old fixed sleeps between
+queries, but the limit now holds across threads and functions, so sources
+can run concurrently without tripping each other's limits.
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    Args:
+        interval: Seconds to refill one token (i.e. the steady request spacing)
+        burst: Max tokens held at once (requests allowed back-to-back)
+        clock: Monotonic time function (injectable for tests/benchmarks)
+        sleep: Sleep function (injectable for tests/benchmarks)
+    """
+
+    def __init__(self, interval, burst=1, clock=time.monotonic, sleep=time.sleep):
+        self.interval = float(interval)
+        self.burst = max(1, int(burst))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        if self.interval > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) / self.interval)
+        else:
+            self._tokens = self.burst
+        self._updated = now
+
+    def acquire(self):
+        """Block until a token is available, then take it.
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) * self.interval
+            self._sleep(wait)
+            waited += wait
+
+
+def source_limiter(config, section, default_interval):
+    """Build the TokenBucket for a config section (arxiv, google_scholar).
+
+    Reads `request_interval` (seconds between requests) and `request_burst`
+    from the section, falling back to default_interval and a burst of 1.
+    """
+    source_config = config.get(section) or {}
+    return TokenBucket(
+        source_config.get('request_interval', default_interval),
+        source_config.get('request_burst', 1)
+    )
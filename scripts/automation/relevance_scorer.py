@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Local BM25 relevance pre-scoring against the config's filter profiles.
+
+filter-research-digest sends every digest paper to LLM agents, hundreds on
+a Sunday. This stage scores papers during the fetch instead: the
+`filter` section of config.yaml becomes two query profiles, "relevant"
+(business_focus, relevant_topics, relevance_criteria) and "irrelevant"
+(irrelevant_topics), and each batch of papers is scored against both with
+BM25 over title + abstract/snippet.
+
+Scoring is batched through an inverted index of the batch: every profile
+term walks only the postings of the papers that contain it, which is the
+sparse matrix-vector product without a NumPy dependency. Document
+frequencies accumulate across runs in `.relevance_stats.json`, so IDF
+weights are stable even when a topic contributes only a few papers. Each
+paper is counted once, however often its topic is rescored (unfinished
+topics, resumed runs): the URLs counted in the last COUNTED_DAYS days are
+kept with the stats. Once more than MAX_DOCS papers are counted, all
+counts are halved and terms left below one occurrence are dropped, so
+the stats stay bounded and follow recent papers.
+
+A paper's score is relevant minus irrelevant BM25. With `prescore.mode`
+"rank", papers in each topic are ordered by score; "drop" also removes
+clear rejects (score <= -reject_margin) from the markdown digest. Clear
+accepts (score >= accept_margin) and rejects are recorded as filter
+decisions in the digest store, so the LLM filter only needs to look at
+the borderline papers (digest_store.py --unfiltered).
+"""
+
+import json
+import math
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from keyword_matcher import tokenize
+
+STATS_FILE = ".relevance_stats.json"
+
+MODES = ('off', 'rank', 'drop')
+DEFAULT_ACCEPT_MARGIN = 4.0
+DEFAULT_REJECT_MARGIN = 2.0
+
+# Days a counted paper's URL is remembered, so rescoring it is not counted again
+COUNTED_DAYS = 30
+# Papers counted before all document frequencies are halved
+MAX_DOCS = 50000
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Words that carry no topic signal in filter phrases like "product
+# management and discovery" (already stemmed, as tokenize() returns them)
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'how',
+    'in', 'into', 'is', 'it', 'its', 'of', 'on', 'or', 'paper', 'that', 'the',
+    'their', 'this', 'to', 'we', 'what', 'which', 'with', 'must',
+    'relat', 'about',
+}
+
+
+def text_terms(text):
+    """Stemmed content words of a text"""
+    return [term for term in tokenize(text) if term not in STOPWORDS]
+
+
+def paper_terms(paper):
+    """Terms of a paper's title and abstract (arXiv) or snippet (Scholar)"""
+    return text_terms(' '.join((paper.get('title', ''), paper.get('abstract') or paper.get('snippet') or '')))
+
+
+def profile_terms(phrases):
+    """Distinct terms of a list of filter phrases"""
+    return set(term for phrase in phrases if phrase for term in text_terms(phrase))
+
+
+class RelevanceScorer:
+    """BM25 scorer for the relevant and irrelevant filter profiles.
+
+    Args:
+        filter_config: The config's `filter` section
+        stats_path: JSON file accumulating document frequencies across runs
+            (default: in-memory only)
+    """
+
+    def __init__(self, filter_config, stats_path=None):
+        filter_config = filter_config or {}
+        self.relevant = profile_terms(
+            [filter_config.get('business_focus'), filter_config.get('relevance_criteria')]
+            + list(filter_config.get('relevant_topics') or [])
+        )
+        self.irrelevant = profile_terms(filter_config.get('irrelevant_topics') or []) - self.relevant
+
+        self.stats_path = Path(stats_path) if stats_path else None
+        self.stats = {'docs': 0, 'length': 0, 'df': {}}
+        if self.stats_path and self.stats_path.exists():
+            with open(self.stats_path, 'r') as f:
+                self.stats = json.load(f)
+
+    @property
+    def enabled(self):
+        return bool(self.relevant or self.irrelevant)
+
+    def _update_stats(self, papers, docs):
+        """Add the papers not counted yet to the document frequencies"""
+        today = datetime.now().date()
+        counted = self.stats.setdefault('counted', {})
+        new_docs = []
+        for paper, terms in zip(papers, docs):
+            key = paper.get('url') or paper.get('title', '')
+            if key not in counted:
+                counted[key] = today.isoformat()
+                new_docs.append(terms)
+        if not new_docs:
+            return
+
+        df = self.stats['df']
+        for terms in new_docs:
+            for term in set(terms):
+                df[term] = df.get(term, 0) + 1
+        self.stats['docs'] += len(new_docs)
+        self.stats['length'] += sum(len(terms) for terms in new_docs)
+
+        if self.stats['docs'] > MAX_DOCS:
+            self._decay()
+        cutoff = (today - timedelta(days=COUNTED_DAYS)).isoformat()
+        self.stats['counted'] = {key: date for key, date in counted.items() if date >= cutoff}
+
+        if self.stats_path:
+            tmp_path = self.stats_path.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(self.stats, f)
+            os.replace(tmp_path, self.stats_path)
+
+    def _decay(self):
+        """Halve all counts, dropping terms that fall below one occurrence"""
+        self.stats['docs'] //= 2
+        self.stats['length'] //= 2
+        self.stats['df'] = {term: n // 2 for term, n in self.stats['df'].items() if n >= 2}
+
+    def score(self, papers):
+        """Score a batch of papers against both profiles.
+
+        Returns:
+            List of (relevant, irrelevant) BM25 scores, in paper order
+        """
+        docs = [paper_terms(paper) for paper in papers]
+        if not docs:
+            return []
+        self._update_stats(papers, docs)
+
+        total_docs = self.stats['docs']
+        avg_length = self.stats['length'] / total_docs or 1
+        df = self.stats['df']
+
+        # Inverted index of the batch: term -> [(paper index, term frequency)]
+        postings = {}
+        for index, terms in enumerate(docs):
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((index, tf))
+
+        norms = [K1 * (1 - B + B * len(terms) / avg_length) for terms in docs]
+
+        def profile_scores(profile):
+            scores = [0.0] * len(docs)
+            for term in profile:
+                if term not in postings:
+                    continue
+                n = df.get(term, 0)
+                idf = math.log(1 + (total_docs - n + 0.5) / (n + 0.5))
+                for index, tf in postings[term]:
+                    scores[index] += idf * tf * (K1 + 1) / (tf + norms[index])
+            return scores
+
+        return list(zip(profile_scores(self.relevant), profile_scores(self.irrelevant)))
+
+
+def prescore(scorer, papers, mode='rank', accept_margin=DEFAULT_ACCEPT_MARGIN, reject_margin=DEFAULT_REJECT_MARGIN):
+    """Score a topic's papers and split off clear rejects.
+
+    Each paper gets a 'relevance' score (relevant minus irrelevant BM25).
+
+    Returns:
+        (papers for the digest, rejected papers, accepted papers). In
+        "rank" mode nothing is rejected; the digest papers are ordered by
+        score, highest first.
+    """
+    if not papers or not scorer.enabled:
+        return papers, [], []
+
+    for paper, (relevant, irrelevant) in zip(papers, scorer.score(papers)):
+        paper['relevance'] = round(relevant - irrelevant, 2)
+
+    ranked = sorted(papers, key=lambda paper: paper['relevance'], reverse=True)
+    accepted = [paper for paper in ranked if paper['relevance'] >= accept_margin]
+    rejected = [paper for paper in ranked if paper['relevance'] <= -reject_margin]
+    if mode == 'drop':
+        ranked = [paper for paper in ranked if paper['relevance'] > -reject_margin]
+    return ranked, rejected, accepted
+
+
+def get_scorer(config):
+    """Return a RelevanceScorer for the config, or None if prescore.mode is off"""
+    mode = (config.get('prescore') or {}).get('mode', 'off')
+    if mode not in MODES:
+        raise ValueError(f"prescore.mode must be one of {', '.join(MODES)}, got {mode!r}")
+    if mode == 'off':
+        return None
+
+    research_root = Path(config['paths']['research_root']).expanduser().resolve()
+    data_dir = research_root / config['paths']['data']
+    scorer = RelevanceScorer(config.get('filter'), data_dir / STATS_FILE)
+    return scorer if scorer.enabled else None
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Optional long-running daemon for the fetch and monitor jobs.
+
+With cron, every scheduled run is a cold Python process: it re-imports
+arxiv, lxml and serpapi, re-reads config.yaml and keywords.md and reloads
+the seen-paper index, and the cron entries break whenever the plugin
+moves (hence /fix-scheduled-scripts). The daemon runs both jobs from one
+process on an internal daily schedule instead:
+
+- config.yaml is re-read when it changes (checked every few seconds) and
+  keywords.md when it changes before a fetch
+- the seen-paper store and imported modules stay warm between runs (the
+  store reloads itself if a CLI fetch wrote to it in the meantime)
+- runs can be triggered on demand over a Unix socket in the data directory
+
+    python3 research_daemon.py                   # run in the foreground
+    python3 research_daemon.py status            # schedule and last results
+    python3 research_daemon.py fetch --wait      # run a fetch now, wait for it
+    python3 research_daemon.py monitor           # queue new PDFs now
+    python3 research_daemon.py reload | stop
+
+Run times come from `daemon.fetch_time` and `daemon.monitor_time` in
+config.yaml. Only one job of each kind runs at a time; a trigger for a
+job that is already running waits on (or reports) the running one.
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import yaml
+
+import fetch_papers
+import monitor_sources
+
+CONFIG_PATH = Path.home() / ".claude" / "research-system-config" / "config.yaml"
+SOCKET_FILE = "daemon.sock"
+
+JOBS = ('fetch', 'monitor')
+DEFAULT_TIMES = {'fetch': "06:00", 'monitor': "06:30"}
+RELOAD_CHECK_SECONDS = 5
+
+
+def log(message):
+    print(f"{datetime.now():%Y-%m-%d %H:%M:%S} [daemon] {message}", flush=True)
+
+
+def socket_path(config):
+    research_root = Path(config['paths']['research_root']).expanduser().resolve()
+    return research_root / config['paths']['data'] / SOCKET_FILE
+
+
+def next_run(at, now):
+    """Next datetime after now at local time at ("HH:MM")"""
+    hour, minute = (int(part) for part in str(at).split(':'))
+    run_at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return run_at if run_at > now else run_at + timedelta(days=1)
+
+
+class ResearchDaemon:
+    """Schedules fetch and monitor runs and serves on-demand triggers"""
+
+    def __init__(self):
+        self.config = None
+        self.config_mtime = None
+        self.topics = None
+        self.keywords_mtime = None
+        self.schedule = {}
+        self.running = {}              # job -> threading.Event set when it finishes
+        self.results = {}              # job -> result of the last run
+        self.started = datetime.now()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.logger = None
+        self.load_config()
+
+    def load_config(self):
+        """(Re)load config.yaml and recompute the schedule"""
+        config = fetch_papers.load_config()
+        self.config = config
+        self.config_mtime = CONFIG_PATH.stat().st_mtime
+        daemon_config = config.get('daemon') or {}
+        now = datetime.now()
+        self.schedule = {}
+        for job in JOBS:
+            at = daemon_config.get(f'{job}_time', DEFAULT_TIMES[job])
+            if at:
+                self.schedule[job] = next_run(at, now)
+        log("Loaded config; next runs: " + ', '.join(f"{job} {at:%Y-%m-%d %H:%M}" for job, at in self.schedule.items()))
+
+    def config_changed(self):
+        try:
+            return CONFIG_PATH.stat().st_mtime != self.config_mtime
+        except FileNotFoundError:
+            return False
+
+    def load_topics(self, config):
+        """keywords.md topics, re-read only when the file changes"""
+        research_root = config['paths']['research_root']
+        keywords_path = Path(research_root) / ".research-data" / "keywords.md"
+        mtime = keywords_path.stat().st_mtime if keywords_path.exists() else None
+        if self.topics is None or mtime != self.keywords_mtime:
+            self.topics = fetch_papers.load_keywords(research_root)
+            self.keywords_mtime = mtime
+        return self.topics
+
+    def run_job(self, job, config):
+        start = time.monotonic()
+        result = {'job': job, 'started': datetime.now().isoformat(timespec='seconds')}
+        try:
+            if job == 'fetch':
+                self.logger.info("Starting fetch_papers.py (daemon)")
+                result['finished'] = fetch_papers.run(config, self.load_topics(config))
+            else:
+                result['queued'] = monitor_sources.scan(config)
+            result['ok'] = True
+        except Exception as e:
+            traceback.print_exc()
+            result.update(ok=False, error=str(e))
+        result['seconds'] = round(time.monotonic() - start, 3)
+        log(f"{job} {'finished' if result['ok'] else 'failed'} in {result['seconds']:.1f}s")
+        return result
+
+    def start_job(self, job):
+        """Start job in the background unless it is already running.
+
+        Returns:
+            threading.Event set when the (new or running) job finishes
+        """
+        with self._lock:
+            if job in self.running:
+                return self.running[job]
+            done = threading.Event()
+            self.running[job] = done
+            config = self.config
+
+        def worker():
+            result = self.run_job(job, config)
+            with self._lock:
+                self.results[job] = result
+                del self.running[job]
+            done.set()
+
+        log(f"Starting {job}")
+        threading.Thread(target=worker, name=job, daemon=True).start()
+        return done
+
+    def status(self):
+        with self._lock:
+            return {
+                'started': self.started.isoformat(timespec='seconds'),
+                'running': sorted(self.running),
+                'next': {job: at.isoformat(timespec='minutes') for job, at in self.schedule.items()},
+                'last': dict(self.results),
+            }
+
+    def handle(self, request):
+        """Answer one socket request ({"command": ..., "wait": bool})"""
+        command = request.get('command')
+        if command == 'status':
+            return self.status()
+        if command == 'reload':
+            self.load_config()
+            return self.status()
+        if command == 'stop':
+            self._stop.set()
+            return {'stopping': True}
+        if command in JOBS:
+            done = self.start_job(command)
+            if request.get('wait'):
+                done.wait()
+                return self.results[command]
+            return {'started': command}
+        return {'error': f"unknown command {command!r}"}
+
+    def serve(self):
+        """Run the schedule and the trigger socket until stopped"""
+        path = socket_path(self.config)
+        if path.exists():
+            try:
+                send_command(self.config, {'command': 'status'})
+                raise SystemExit(f"Daemon already running (socket {path})")
+            except OSError:
+                path.unlink()
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                try:
+                    response = daemon.handle(json.loads(self.rfile.readline()))
+                except Exception as e:
+                    response = {'error': str(e)}
+                self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Fetch warnings and errors go to fetch_papers.log, as from cron
+        self.logger = fetch_papers.setup_logging(self.config)
+        server = socketserver.ThreadingUnixStreamServer(str(path), Handler)
+        server.daemon_threads = True
+        os.chmod(path, 0o600)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: self._stop.set())
+        log(f"Listening on {path}")
+
+        try:
+            while not self._stop.is_set():
+                if self.config_changed():
+                    try:
+                        self.load_config()
+                    except Exception as e:
+                        log(f"Keeping previous config: {e}")
+                        self.config_mtime = CONFIG_PATH.stat().st_mtime
+
+                now = datetime.now()
+                for job, at in list(self.schedule.items()):
+                    if now >= at:
+                        self.schedule[job] = next_run(at.strftime('%H:%M'), now)
+                        self.start_job(job)
+
+                due = min(self.schedule.values(), default=now + timedelta(seconds=RELOAD_CHECK_SECONDS))
+                self._stop.wait(min(RELOAD_CHECK_SECONDS, max(0.0, (due - now).total_seconds())))
+        finally:
+            server.shutdown()
+            server.server_close()
+            path.unlink(missing_ok=True)
+            log("Stopped")
+
+
+def send_command(config, request, timeout=None):
+    """Send a request to the running daemon and return its response"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(str(socket_path(config)))
+        client.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with client.makefile('rb') as response:
+            return json.loads(response.readline())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the fetch and monitor jobs from one long-running process.")
+    parser.add_argument('command', nargs='?', default='serve', choices=('serve', 'status', 'reload', 'stop') + JOBS,
+                        help="serve (default) runs the daemon; the others talk to a running daemon")
+    parser.add_argument('--wait', action='store_true', help="With fetch/monitor: wait for the run and print its result")
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        ResearchDaemon().serve()
+        return
+
+    with open(CONFIG_PATH, 'r') as f:
+        config = yaml.safe_load(f)
+    try:
+        response = send_command(config, {'command': args.command, 'wait': args.wait})
+    except OSError:
+        sys.exit(f"Daemon is not running (no socket at {socket_path(config)})")
+    print(json.dumps(response, indent=2))
+
+
+if __name__ == "__main__":
+    main()
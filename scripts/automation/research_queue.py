@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Durable summarization queue with claim/ack, for one or more consumers.
+
+The queue used to be `.research-queue.json`, a list of PDF paths that
+monitor_sources.py rewrote and /generate-research-digest read and then
+emptied. A PDF queued between those two steps could be lost, a PDF whose
+summary failed was dropped with the rest, and only one consumer could
+work the list at a time.
+
+The queue is now `.research_queue.db`, a SQLite database in WAL mode in
+the data directory:
+
+- enqueue: monitor_sources.py adds PDF paths (relative to research_root)
+  with their file size; a path already waiting is not added twice
+- claim: a consumer takes the next items and holds a lease on them for
+  `queue.lease_minutes`; claims are atomic, so parallel consumers never
+  get the same item, and an item whose lease runs out (a consumer that
+  crashed) can be claimed again
+- ack: the consumer marks an item done once its summary is written
+- fail: the item is retried after a delay, and marked failed after
+  `queue.max_attempts` attempts
+
+Items are handed out largest PDF first by default (`queue.priority`):
+large PDFs are split into sections and take longest, so starting them
+first lets parallel consumers finish together. Consumers use the command
+line:
+
+    python3 research_queue.py claim --worker digest-1 --limit 5
+    python3 research_queue.py ack 12 13
+    python3 research_queue.py fail 14 --error "summarizer timed out"
+    python3 research_queue.py renew 12           # extend the lease
+    python3 research_queue.py status
+    python3 research_queue.py retry              # requeue failed items
+    python3 research_queue.py add "AI/Sources/paper.pdf"
+
+Each command prints JSON. Items queued by monitor_sources.py carry a
+summary plan (size, pages, outline, estimated tokens and the sections to
+summarize, see text_cache.py); `claim --export DIR` also writes each
+item's sections as text files, so summarizers can start at once:
+
+    python3 research_queue.py claim --limit 5 --export /tmp/research-sections-123
+
+An existing `.research-queue.json` is imported
+on first use and renamed to .research-queue.json.migrated.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import yaml
+
+DB_FILE = ".research_queue.db"
+LEGACY_FILE = ".research-queue.json"
+
+DEFAULT_LEASE_MINUTES = 30
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_PRIORITY = 'largest'
+
+# A failed item is retried after this many seconds per attempt so far
+RETRY_DELAY_SECONDS = 300
+
+# Done items are kept this long for `status`
+DONE_KEEP_DAYS = 30
+
+PRIORITY_ORDER = {
+    'largest': "size DESC, id",
+    'smallest': "size ASC, id",
+    'oldest': "id",
+}
+
+QUEUED, CLAIMED, DONE, FAILED = 'queued', 'claimed', 'done', 'failed'
+
+
+def get_queue(config):
+    """Open the queue in config's data directory with its queue settings"""
+    research_root = Path(config['paths']['research_root']).expanduser().resolve()
+    queue_config = config.get('queue', {})
+    return ResearchQueue(
+        research_root / config['paths']['data'],
+        research_root=research_root,
+        lease_minutes=queue_config.get('lease_minutes', DEFAULT_LEASE_MINUTES),
+        max_attempts=queue_config.get('max_attempts', DEFAULT_MAX_ATTEMPTS),
+        priority=queue_config.get('priority', DEFAULT_PRIORITY),
+    )
+
+
+class ResearchQueue:
+    """PDFs waiting for a summary, backed by SQLite in WAL mode"""
+
+    def __init__(self, data_dir, research_root=None, lease_minutes=DEFAULT_LEASE_MINUTES,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, priority=DEFAULT_PRIORITY):
+        if priority not in PRIORITY_ORDER:
+            raise ValueError(f"queue.priority must be one of {', '.join(PRIORITY_ORDER)}, not {priority!r}")
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.research_root = Path(research_root) if research_root else self.data_dir.parent
+        self.lease_seconds = lease_minutes * 60
+        self.max_attempts = max_attempts
+        self.order = PRIORITY_ORDER[priority]
+
+        # isolation_level=None: transactions are begun explicitly, so a claim
+        # can take the write lock (BEGIN IMMEDIATE) before reading
+        self._conn = sqlite3.connect(self.data_dir / DB_FILE, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS items ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " path TEXT NOT NULL UNIQUE,"
+            " size INTEGER NOT NULL DEFAULT 0,"
+            " state TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " worker TEXT,"
+            " lease_until REAL,"
+            " available_at REAL NOT NULL DEFAULT 0,"
+            " error TEXT,"
+            " enqueued TEXT NOT NULL,"
+            " updated TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS items_state ON items (state, available_at);"
+        )
+        # Summary plans (added after the first release)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(items)")]
+        if 'plan' not in columns:
+            self._conn.execute("ALTER TABLE items ADD COLUMN plan TEXT")
+        self._migrate_json()
+
+    def _migrate_json(self):
+        """Import the legacy queue file once, then rename it"""
+        legacy_file = self.data_dir / LEGACY_FILE
+        if not legacy_file.exists():
+            return
+        with open(legacy_file, 'r') as f:
+            paths = json.load(f)
+        added = self.enqueue(paths)
+        legacy_file.rename(legacy_file.with_name(LEGACY_FILE + '.migrated'))
+        print(f"  Migrated {added} queued PDF(s) from {LEGACY_FILE}", flush=True)
+
+    def _size(self, path):
+        """File size of a queued path (0 if it can't be read)"""
+        try:
+            return os.path.getsize(self.research_root / path)
+        except OSError:
+            return 0
+
+    def enqueue(self, paths, plans=None):
+        """Add paths to the queue; paths already waiting are left as they are.
+
+        Paths that were done or had failed are queued again.
+
+        Args:
+            paths: PDF paths relative to research_root (or absolute)
+            plans: Optional dict mapping paths to summary plans (see
+                text_cache.split_plan), handed to consumers with the item;
+                a requeued path without one keeps its stored plan
+
+        Returns:
+            Number of paths added or requeued
+        """
+        plans = plans or {}
+        now = datetime.now().isoformat()
+        added = 0
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            for path in paths:
+                path = str(path)
+                plan = json.dumps(plans[path]) if plans.get(path) else None
+                cursor = self._conn.execute(
+                    "INSERT INTO items (path, size, state, plan, enqueued, updated) VALUES (?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (path) DO UPDATE SET"
+                    "  state = excluded.state, size = excluded.size, plan = COALESCE(excluded.plan, items.plan), attempts = 0,"
+                    "  worker = NULL, lease_until = NULL, available_at = 0, error = NULL,"
+                    "  enqueued = excluded.enqueued, updated = excluded.updated"
+                    " WHERE items.state IN (?, ?)",
+                    (path, self._size(path), QUEUED, plan, now, now, DONE, FAILED)
+                )
+                added += cursor.rowcount
+                if plan and not cursor.rowcount:
+                    # Already waiting: keep its place, add the plan if it had none
+                    self._conn.execute("UPDATE items SET plan = ? WHERE path = ? AND plan IS NULL", (plan, path))
+            cutoff = (datetime.now() - timedelta(days=DONE_KEEP_DAYS)).isoformat()
+            self._conn.execute("DELETE FROM items WHERE state = ? AND updated < ?", (DONE, cutoff))
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def claim(self, worker, limit=1):
+        """Lease the next queued items to worker.
+
+        Items whose lease expired are claimable again; one that has used
+        up its attempts is marked failed instead.
+
+        Args:
+            worker: Name of the consumer
+            limit: Most items to claim (0 = all available)
+
+        Returns:
+            List of dicts with id, path, size, attempts, lease_until and
+            plan (None if the PDF was queued without one)
+        """
+        now = time.time()
+        updated = datetime.now().isoformat()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                "UPDATE items SET state = ?, worker = NULL, lease_until = NULL, error = ?, updated = ?"
+                " WHERE state = ? AND lease_until < ? AND attempts >= ?",
+                (FAILED, "lease expired", updated, CLAIMED, now, self.max_attempts)
+            )
+            rows = self._conn.execute(
+                "SELECT id, path, size, attempts, plan FROM items"
+                " WHERE (state = ? AND available_at <= ?) OR (state = ? AND lease_until < ?)"
+                f" ORDER BY {self.order} LIMIT ?",
+                (QUEUED, now, CLAIMED, now, limit or -1)
+            ).fetchall()
+            lease_until = now + self.lease_seconds
+            self._conn.executemany(
+                "UPDATE items SET state = ?, worker = ?, lease_until = ?, attempts = attempts + 1, updated = ?"
+                " WHERE id = ?",
+                ((CLAIMED, worker, lease_until, updated, row[0]) for row in rows)
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return [
+            {'id': item_id, 'path': path, 'size': size, 'attempts': attempts + 1, 'lease_until': lease_until,
+             'plan': json.loads(plan) if plan else None}
+            for item_id, path, size, attempts, plan in rows
+        ]
+
+    def _finish(self, sql, params):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            count = self._conn.executemany(sql, params).rowcount
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return count
+
+    def ack(self, item_ids):
+        """Mark claimed items done.
+
+        Returns:
+            Number of items marked done
+        """
+        now = datetime.now().isoformat()
+        return self._finish(
+            "UPDATE items SET state = ?, worker = NULL, lease_until = NULL, error = NULL, updated = ?"
+            " WHERE id = ? AND state = ?",
+            [(DONE, now, item_id, CLAIMED) for item_id in item_ids]
+        )
+
+    def fail(self, item_ids, error=None):
+        """Return claimed items for a later retry, or mark them failed
+
+        Returns:
+            Number of items released
+        """
+        now = time.time()
+        updated = datetime.now().isoformat()
+        return self._finish(
+            "UPDATE items SET"
+            "  state = CASE WHEN attempts >= ? THEN ? ELSE ? END,"
+            "  available_at = ? + ? * attempts,"
+            "  worker = NULL, lease_until = NULL, error = ?, updated = ?"
+            " WHERE id = ? AND state = ?",
+            [(self.max_attempts, FAILED, QUEUED, now, RETRY_DELAY_SECONDS, error, updated, item_id, CLAIMED)
+             for item_id in item_ids]
+        )
+
+    def renew(self, item_ids):
+        """Extend the lease on claimed items
+
+        Returns:
+            Number of leases extended
+        """
+        lease_until = time.time() + self.lease_seconds
+        return self._finish(
+            "UPDATE items SET lease_until = ? WHERE id = ? AND state = ?",
+            [(lease_until, item_id, CLAIMED) for item_id in item_ids]
+        )
+
+    def retry(self):
+        """Queue every failed item again
+
+        Returns:
+            Number of items requeued
+        """
+        paths = [row[0] for row in self._conn.execute("SELECT path FROM items WHERE state = ?", (FAILED,))]
+        return self.enqueue(paths)
+
+    def status(self):
+        """Item counts by state, and the items that are claimed or failed"""
+        counts = {state: 0 for state in (QUEUED, CLAIMED, DONE, FAILED)}
+        counts.update(self._conn.execute("SELECT state, COUNT(*) FROM items GROUP BY state"))
+        claimed = [
+            {'id': item_id, 'path': path, 'worker': worker,
+             'lease_until': datetime.fromtimestamp(lease_until).isoformat(timespec='seconds')}
+            for item_id, path, worker, lease_until in self._conn.execute(
+                "SELECT id, path, worker, lease_until FROM items WHERE state = ? ORDER BY id", (CLAIMED,)
+            )
+        ]
+        failed = [
+            {'id': item_id, 'path': path, 'attempts': attempts, 'error': error}
+            for item_id, path, attempts, error in self._conn.execute(
+                "SELECT id, path, attempts, error FROM items WHERE state = ? ORDER BY id", (FAILED,)
+            )
+        ]
+        return {'counts': counts, 'claimed': claimed, 'failed': failed}
+
+    def set_plans(self, plans):
+        """Store summary plans for items queued without one
+
+        Args:
+            plans: Dict mapping queued paths to split_plan() dicts
+
+        Returns:
+            Number of items updated
+        """
+        now = datetime.now().isoformat()
+        return self._finish(
+            "UPDATE items SET plan = ?, updated = ? WHERE path = ? AND state IN (?, ?)",
+            [(json.dumps(plan), now, str(path), QUEUED, CLAIMED) for path, plan in plans.items() if plan]
+        )
+
+    def waiting(self):
+        """Number of items queued or claimed"""
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM items WHERE state IN (?, ?)", (QUEUED, CLAIMED)
+        ).fetchone()[0]
+
+    def waiting_paths(self):
+        """Paths of items queued or claimed, in claim order"""
+        return [row[0] for row in self._conn.execute(
+            f"SELECT path FROM items WHERE state IN (?, ?) ORDER BY {self.order}", (QUEUED, CLAIMED)
+        )]
+
+    def close(self):
+        self._conn.close()
+
+
+def export_items(config, items, output_dir):
+    """Write the planned sections of claimed items as text files.
+
+    Adds 'files' (section text files in plan order) to each item whose
+    plan has usable text; items without one are left for the consumer to
+    handle from the PDF.
+    """
+    from text_cache import get_text_cache, export_sections
+
+    research_root = Path(config['paths']['research_root']).expanduser().resolve()
+    cache = get_text_cache(config)
+    try:
+        for item in items:
+            plan = item['plan']
+            if not plan or not plan['text']:
+                continue
+            pdf_path = research_root / item['path']
+            # Re-extracted if it was evicted from the cache since it was queued
+            cache.extract({plan['sha256']: pdf_path})
+            exported = export_sections(cache, plan['sha256'], pdf_path,
+                                       os.path.join(output_dir, str(item['id'])), parts=plan['sections'])
+            if not exported.get('error'):
+                item['files'] = [section['file_path'] for section in exported['sections']]
+    finally:
+        cache.close()
+
+
+def load_config():
+    config_path = Path.home() / ".claude" / "research-system-config" / "config.yaml"
+    with open(config_path, 'r') as f:
+        return yaml.safe_load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Work the PDF summarization queue.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    claim = commands.add_parser('claim', help="Lease the next items")
+    claim.add_argument('--worker', default=f"worker-{os.getpid()}", help="Consumer name (default: worker-PID)")
+    claim.add_argument('--limit', type=int, default=1, help="Most items to claim (0 = all available)")
+    claim.add_argument('--export', metavar='DIR',
+                       help="Write each item's planned sections as text files to DIR/<id>/ (adds 'files')")
+    for name, help_text in (('ack', "Mark items done"), ('renew', "Extend the lease on items")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('ids', type=int, nargs='+')
+    fail = commands.add_parser('fail', help="Release items for a retry (failed after queue.max_attempts)")
+    fail.add_argument('ids', type=int, nargs='+')
+    fail.add_argument('--error', help="Why the item failed")
+    add = commands.add_parser('add', help="Queue PDFs (paths relative to research_root)")
+    add.add_argument('paths', nargs='+')
+    commands.add_parser('retry', help="Queue every failed item again")
+    commands.add_parser('status', help="Counts by state, claimed and failed items")
+    args = parser.parse_args()
+
+    config = load_config()
+    queue = get_queue(config)
+    try:
+        if args.command == 'claim':
+            result = queue.claim(args.worker, args.limit)
+            if args.export:
+                export_items(config, result, args.export)
+        elif args.command == 'ack':
+            result = {'done': queue.ack(args.ids)}
+        elif args.command == 'fail':
+            result = {'released': queue.fail(args.ids, args.error)}
+        elif args.command == 'renew':
+            result = {'renewed': queue.renew(args.ids)}
+        elif args.command == 'add':
+            result = {'added': queue.enqueue(args.paths)}
+        elif args.command == 'retry':
+            result = {'requeued': queue.retry()}
+        else:
+            result = queue.status()
+    finally:
+        queue.close()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
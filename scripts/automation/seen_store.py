@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Indexed store of papers already shown in a digest.
+
+Replaces .seen_arxiv_papers.json and .seen_scholar_papers.json, which were
+re-parsed and rewritten in full (with indent=2) once per topic. The store
+is a single SQLite database in the data directory: it is loaded once per
+run into per-source sets for O(1) membership checks, new URLs are written
+with batched inserts, and each row records when and from which source the
+paper was first seen so old entries can be expired.
+
+The legacy JSON files are imported on first use and renamed to
+*.json.migrated.
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+DB_FILE = ".seen_papers.db"
+
+ARXIV = 'arXiv'
+GOOGLE_SCHOLAR = 'Google Scholar'
+
+# Legacy tracking files and the source their URLs belong to
+LEGACY_FILES = {
+    ".seen_arxiv_papers.json": ARXIV,
+    ".seen_scholar_papers.json": GOOGLE_SCHOLAR,
+}
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class SeenStore:
+    """Seen-paper URLs keyed by source, backed by SQLite.
+
+    Safe to share between the arXiv and Scholar worker threads.
+    """
+
+    def __init__(self, data_dir, expire_days=0):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.data_dir / DB_FILE
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            " url TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " first_seen TEXT NOT NULL,"
+            " PRIMARY KEY (source, url))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS seen_first_seen ON seen (first_seen)")
+        self._conn.commit()
+
+        self._migrate_json()
+        if expire_days:
+            self.expire(expire_days)
+
+        self._load()
+
+    def _load(self):
+        """Read every URL into the per-source sets"""
+        urls = {}
+        for url, source in self._conn.execute("SELECT url, source FROM seen"):
+            urls.setdefault(source, set()).add(url)
+        self._urls = urls
+        self._version = self._data_version()
+
+    def _data_version(self):
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def refresh(self):
+        """Reload the URL sets if another process has written to the store.
+
+        A long-lived store (research_daemon.py) would otherwise miss the
+        papers a concurrent fetch_papers.py run recorded. SQLite's
+        data_version only changes for other connections' commits, so this
+        costs one query when nothing changed.
+
+        Returns:
+            True if the sets were reloaded
+        """
+        with self._lock:
+            if self._data_version() == self._version:
+                return False
+            self._load()
+        return True
+
+    def _migrate_json(self):
+        """Import legacy .seen_*.json files once, then rename them"""
+        for filename, source in LEGACY_FILES.items():
+            legacy_file = self.data_dir / filename
+            if not legacy_file.exists():
+                continue
+
+            with open(legacy_file, 'r') as f:
+                data = json.load(f)
+            first_seen = data.get('last_updated') or datetime.now().isoformat()
+
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO seen (url, source, first_seen) VALUES (?, ?, ?)",
+                    ((url, source, first_seen) for url in data.get('urls', []))
+                )
+            legacy_file.rename(legacy_file.with_name(filename + '.migrated'))
+            print(f"  Migrated {len(data.get('urls', []))} seen {source} URLs from {filename}", flush=True)
+
+    def urls(self, source):
+        """Set of URLs already seen for a source (do not modify; use add)"""
+        return self._urls.setdefault(source, set())
+
+    def __contains__(self, url):
+        return any(url in urls for urls in self._urls.values())
+
+    def add(self, urls, source):
+        """Record URLs as seen in one batched insert"""
+        urls = [url for url in urls if url not in self.urls(source)]
+        if not urls:
+            return
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO seen (url, source, first_seen) VALUES (?, ?, ?)",
+                ((url, source, now) for url in urls)
+            )
+            self._urls[source].update(urls)
+
+    def expire(self, days):
+        """Forget papers first seen more than `days` days ago.
+
+        Returns:
+            Number of entries removed
+        """
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+        with self._lock, self._conn:
+            removed = self._conn.execute("DELETE FROM seen WHERE first_seen < ?", (cutoff,)).rowcount
+        if removed:
+            print(f"  Expired {removed} seen papers older than {days} days", flush=True)
+        return removed
+
+    def close(self):
+        self._conn.close()
+
+
+def get_seen_store(config):
+    """Return the run's SeenStore for the configured data directory.
+
+    The store is opened (and migrated/expired) once per process and shared
+    by every search function; it is reloaded if another process wrote to
+    it since it was last used.
+    """
+    research_root = Path(config['paths']['research_root']).expanduser().resolve()
+    data_dir = research_root / config['paths']['data']
+
+    with _stores_lock:
+        if data_dir not in _stores:
+            expire_days = (config.get('seen_papers') or {}).get('expire_days', 0)
+            _stores[data_dir] = SeenStore(data_dir, expire_days)
+        store = _stores[data_dir]
+    store.refresh()
+    return store
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Snapshot index of the Sources/ folders, for incremental PDF scans.
+
+monitor_sources.py used to list every topic folder and glob every
+Sources/ folder on each run, stat a Notes/ summary for every unprocessed
+PDF, and load `.processed_pdfs.json` (a flat list of every PDF ever
+queued). On a large research tree on a synced drive that is slow even
+when nothing has changed.
+
+The index keeps, in `.sources_index.db`, the modification time of the
+research root and of every Sources/ folder, and the (size, mtime, inode)
+of every PDF in them. A scan stats the root and each Sources/ folder
+once; a folder whose mtime is unchanged is skipped without listing it
+(adding, removing or renaming a file always changes its folder's mtime).
+Only changed folders are listed, and the scan reports the delta: PDFs
+added, changed and removed since the last scan. Processed PDFs are kept
+in the same database; `.processed_pdfs.json` is imported on first use
+and renamed to .processed_pdfs.json.migrated.
+
+A folder modified within the last couple of seconds is rescanned next
+time regardless, since a file added in the same mtime tick would not
+change its mtime again.
+
+Processed PDFs are also recorded by content (SHA-256), so a PDF that was
+renamed, moved to another topic or saved to a second topic is recognized
+as one already summarized. Hashes are computed in 1 MiB chunks, in a
+process pool when there are several PDFs to hash, and cached by (inode,
+size, mtime), so an unchanged file - including one renamed or moved on
+the same drive - is never read again. PDFs processed before hashes were
+recorded are hashed lazily: only one with the same size as a new PDF can
+have its content, so each scan reads just those, rather than the whole
+library (which on a synced drive would mean downloading it) at once.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+DB_FILE = ".sources_index.db"
+LEGACY_FILE = ".processed_pdfs.json"
+
+# Top-level folders that are never topic folders
+SKIP_DIRS = ('scripts', 'daily-digests', '.research-data')
+
+# Folders modified this recently are not trusted to be unchanged next time
+RACY_SECONDS = 2
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+# Fewer PDFs than this to hash are hashed without starting a process pool
+POOL_MIN_FILES = 4
+
+
+def hash_file(path):
+    """SHA-256 of a file's contents, read in chunks (None if it is gone)"""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+                digest.update(chunk)
+    except (FileNotFoundError, IsADirectoryError):
+        return None
+    return digest.hexdigest()
+
+
+class ScanDelta:
+    """What changed in the Sources/ folders since the last scan"""
+
+    def __init__(self):
+        self.added = []        # PDF paths, sorted
+        self.changed = []
+        self.removed = []
+        self.folders = 0       # Sources/ folders found
+        self.listed = 0        # of those, folders listed because they changed
+
+    def summary(self):
+        return (f"{self.folders} Sources folder(s), {self.listed} changed: "
+                f"{len(self.added)} PDF(s) added, {len(self.changed)} changed, {len(self.removed)} removed")
+
+
+class SourceIndex:
+    """Directory and PDF snapshot plus processed PDFs, backed by SQLite"""
+
+    def __init__(self, data_dir):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.data_dir / DB_FILE)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS dirs ("
+            " path TEXT PRIMARY KEY,"
+            " mtime_ns INTEGER NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS topics ("
+            " path TEXT PRIMARY KEY);"
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY,"
+            " dir TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " inode INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS files_dir ON files (dir);"
+            "CREATE TABLE IF NOT EXISTS processed ("
+            " path TEXT PRIMARY KEY,"
+            " queued TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS pending ("
+            " path TEXT PRIMARY KEY);"
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            " inode INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " sha256 TEXT NOT NULL,"
+            " PRIMARY KEY (inode, size, mtime_ns));"
+        )
+        # Content hashes of processed PDFs (added after the first release)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(processed)")]
+        if 'sha256' not in columns:
+            self._conn.execute("ALTER TABLE processed ADD COLUMN sha256 TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS processed_sha256 ON processed (sha256)")
+        self._conn.commit()
+        self._migrate_json()
+
+    def _migrate_json(self):
+        """Import the legacy processed PDF list once, then rename it"""
+        legacy_file = self.data_dir / LEGACY_FILE
+        if not legacy_file.exists():
+            return
+        with open(legacy_file, 'r') as f:
+            paths = json.load(f)
+        self.mark_processed(paths)
+        legacy_file.rename(legacy_file.with_name(LEGACY_FILE + '.migrated'))
+        print(f"  Migrated {len(paths)} processed PDFs from {LEGACY_FILE}", flush=True)
+
+    def _trusted_mtime(self, stat, now):
+        """mtime to record for a folder (-1 if too recent to trust)"""
+        return stat.st_mtime_ns if now - stat.st_mtime >= RACY_SECONDS else -1
+
+    def scan(self, research_root):
+        """Update the snapshot from the Sources/ folders under research_root.
+
+        Returns:
+            ScanDelta
+        """
+        research_root = Path(research_root)
+        now = time.time()
+        delta = ScanDelta()
+        dirs = dict(self._conn.execute("SELECT path, mtime_ns FROM dirs"))
+        updated_dirs = {}
+
+        # Topic folders: re-listed only when the research root changed
+        root_stat = os.stat(research_root)
+        if dirs.get(str(research_root)) == root_stat.st_mtime_ns:
+            topic_dirs = [row[0] for row in self._conn.execute("SELECT path FROM topics")]
+        else:
+            topic_dirs = sorted(
+                entry.path for entry in os.scandir(research_root)
+                if entry.is_dir() and entry.name not in SKIP_DIRS
+            )
+            with self._conn:
+                self._conn.execute("DELETE FROM topics")
+                self._conn.executemany("INSERT INTO topics (path) VALUES (?)", ((path,) for path in topic_dirs))
+        updated_dirs[str(research_root)] = self._trusted_mtime(root_stat, now)
+
+        sources_dirs = set()
+        with self._conn:
+            for topic_dir in topic_dirs:
+                sources_dir = os.path.join(topic_dir, 'Sources')
+                try:
+                    stat = os.stat(sources_dir)
+                except (FileNotFoundError, NotADirectoryError):
+                    continue
+                sources_dirs.add(sources_dir)
+                delta.folders += 1
+                if dirs.get(sources_dir) == stat.st_mtime_ns:
+                    continue
+
+                delta.listed += 1
+                self._scan_folder(sources_dir, delta)
+                updated_dirs[sources_dir] = self._trusted_mtime(stat, now)
+
+            # Sources/ folders that disappeared (or whose topic did)
+            for path in dirs.keys() - sources_dirs - {str(research_root)}:
+                delta.removed.extend(row[0] for row in self._conn.execute("SELECT path FROM files WHERE dir = ?", (path,)))
+                self._conn.execute("DELETE FROM pending WHERE path IN (SELECT path FROM files WHERE dir = ?)", (path,))
+                self._conn.execute("DELETE FROM files WHERE dir = ?", (path,))
+                self._conn.execute("DELETE FROM dirs WHERE path = ?", (path,))
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO dirs (path, mtime_ns) VALUES (?, ?)", updated_dirs.items()
+            )
+
+        for paths in (delta.added, delta.changed, delta.removed):
+            paths.sort()
+        return delta
+
+    def _scan_folder(self, sources_dir, delta):
+        """List one changed Sources/ folder and record its PDFs' delta"""
+        previous = {
+            path: (size, mtime_ns, inode) for path, size, mtime_ns, inode in self._conn.execute(
+                "SELECT path, size, mtime_ns, inode FROM files WHERE dir = ?", (sources_dir,)
+            )
+        }
+        current = {}
+        for entry in os.scandir(sources_dir):
+            if entry.name.endswith('.pdf') and entry.is_file():
+                stat = entry.stat()
+                current[entry.path] = (stat.st_size, stat.st_mtime_ns, entry.inode())
+
+        added = []
+        for path, snapshot in current.items():
+            if path not in previous:
+                added.append(path)
+            elif previous[path] != snapshot:
+                delta.changed.append(path)
+        removed = previous.keys() - current.keys()
+        delta.added.extend(added)
+        delta.removed.extend(removed)
+
+        self._conn.executemany("DELETE FROM files WHERE path = ?", ((path,) for path in removed))
+        self._conn.executemany("DELETE FROM pending WHERE path = ?", ((path,) for path in removed))
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO pending (path) SELECT ? WHERE NOT EXISTS (SELECT 1 FROM processed WHERE path = ?)",
+            ((path, path) for path in added)
+        )
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO files (path, dir, size, mtime_ns, inode) VALUES (?, ?, ?, ?, ?)",
+            ((path, sources_dir, *snapshot) for path, snapshot in current.items() if previous.get(path) != snapshot)
+        )
+
+    def unprocessed(self):
+        """Indexed PDFs not yet queued, sorted by path.
+
+        Usually the PDFs just added, but also any left over by a run that
+        stopped between scanning and queueing.
+        """
+        return [row[0] for row in self._conn.execute("SELECT path FROM pending ORDER BY path")]
+
+    def content_hashes(self, paths):
+        """SHA-256 of each PDF, from the cache where its file is unchanged
+
+        Args:
+            paths: PDF paths
+
+        Returns:
+            Dict mapping each path that still exists to its hash
+        """
+        hashes = {}
+        to_hash = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            row = self._conn.execute(
+                "SELECT sha256 FROM hashes WHERE inode = ? AND size = ? AND mtime_ns = ?", key
+            ).fetchone()
+            if row:
+                hashes[path] = row[0]
+            else:
+                to_hash[path] = key
+
+        if len(to_hash) >= POOL_MIN_FILES:
+            with ProcessPoolExecutor() as pool:
+                computed = list(pool.map(hash_file, to_hash, chunksize=8))
+        else:
+            computed = [hash_file(path) for path in to_hash]
+
+        with self._conn:
+            for (path, key), sha256 in zip(to_hash.items(), computed):
+                if sha256 is None:
+                    continue
+                hashes[path] = sha256
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO hashes (inode, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+                    (*key, sha256)
+                )
+        return hashes
+
+    def hash_processed(self, new_paths):
+        """Hash the processed PDFs without a content hash that could match new PDFs
+
+        Only processed PDFs recorded without a hash and with the same size
+        as one of new_paths are read; the rest keep no hash until a new
+        PDF of their size turns up.
+
+        Args:
+            new_paths: Paths of indexed PDFs about to be checked
+        """
+        sizes = set()
+        for path in new_paths:
+            row = self._conn.execute("SELECT size FROM files WHERE path = ?", (path,)).fetchone()
+            if row:
+                sizes.add(row[0])
+        rows = self._conn.execute(
+            "SELECT p.path, f.size FROM processed p LEFT JOIN files f ON f.path = p.path WHERE p.sha256 IS NULL"
+        ).fetchall()
+        paths = [path for path, size in rows if size in sizes]
+        # PDFs that no longer exist get an empty hash so they are not retried
+        gone = [path for path, size in rows if size is None and not os.path.exists(path)]
+        if not paths and not gone:
+            return
+        if paths:
+            print(f"  Hashing {len(paths)} previously processed PDF(s) of the same size as new ones", flush=True)
+        hashes = self.content_hashes(paths)
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE processed SET sha256 = ? WHERE path = ?",
+                ((hashes.get(path, ''), path) for path in paths + gone)
+            )
+
+    def processed_by_hash(self, sha256):
+        """Paths of processed PDFs with this content, oldest first"""
+        return [row[0] for row in self._conn.execute(
+            "SELECT path FROM processed WHERE sha256 = ? ORDER BY queued, path", (sha256,)
+        )]
+
+    def mark_processed(self, paths, hashes=None):
+        """Record PDFs as queued for summarization (or linked to a summary)
+
+        Args:
+            paths: PDF paths
+            hashes: Optional dict mapping paths to content hashes
+        """
+        hashes = hashes or {}
+        now = datetime.now().isoformat()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO processed (path, queued, sha256) VALUES (?, ?, ?)",
+                ((str(path), now, hashes.get(str(path))) for path in paths)
+            )
+            self._conn.execute("DELETE FROM pending WHERE path IN (SELECT path FROM processed)")
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Live inotify watch of the Sources/ folders, for `monitor_sources.py --watch`.
+
+The scheduled monitor run queues a PDF hours after it was saved. In watch
+mode the monitor instead subscribes to Linux inotify events (through libc
+with ctypes, so no extra dependency) on:
+
+- the research root, for topic folders created or moved in later
+- every topic folder, for a Sources/ folder created later
+- every Sources/ folder, for PDFs created, written, moved in or deleted
+
+and sleeps in select() until an event arrives, so an idle watcher uses no
+CPU. A PDF is not queued while it is still being written: after a
+close-write or move-in it waits a short moment for further events, and a
+PDF that was only created (e.g. by a downloader that keeps it open) waits
+until its size is unchanged over `monitor.settle_seconds`. Settled PDFs
+trigger an incremental scan (see source_index.py), which queues them; PDFs
+still settling are held back and queued once they settle.
+
+On systems without inotify the watch falls back to running the
+incremental scan every `monitor.poll_seconds`.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+
+from source_index import SKIP_DIRS
+
+DEFAULT_SETTLE_SECONDS = 1.0
+DEFAULT_POLL_SECONDS = 30
+
+# How long a closed or moved-in PDF waits for further events
+CLOSED_SETTLE_SECONDS = 0.25
+
+# inotify event masks (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASKS = {
+    'root': IN_CREATE | IN_MOVED_TO | IN_ONLYDIR,
+    'topic': IN_CREATE | IN_MOVED_TO | IN_ONLYDIR,
+    'sources': IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE | IN_MOVED_FROM | IN_ONLYDIR,
+}
+
+EVENT_HEADER = struct.Struct('iIII')   # wd, mask, cookie, len (then name)
+
+
+def _libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    except OSError:
+        return None
+    if not hasattr(libc, 'inotify_init1'):
+        return None
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+
+def inotify_available():
+    return _libc() is not None
+
+
+class Inotify:
+    """Minimal non-blocking inotify file descriptor"""
+
+    def __init__(self):
+        self._libc = _libc()
+        if self._libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available on this system")
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code))
+
+    def add_watch(self, path, mask):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            code = ctypes.get_errno()
+            if code == errno.ENOSPC:
+                raise OSError(code, f"inotify watch limit reached at {path} "
+                                    f"(raise fs.inotify.max_user_watches)")
+            raise OSError(code, os.strerror(code), str(path))
+        return wd
+
+    def read(self, timeout=None):
+        """Wait up to timeout seconds (None = forever) for events.
+
+        Returns:
+            List of (wd, mask, name) tuples
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class SourceWatcher:
+    """Waits for PDFs in Sources/ folders to be added and finish writing"""
+
+    def __init__(self, research_root, settle_seconds=DEFAULT_SETTLE_SECONDS):
+        self.research_root = str(research_root)
+        self.settle_seconds = settle_seconds
+        self.inotify = Inotify()
+        self.watches = {}      # wd -> (kind, path)
+        self.settling = {}     # PDF path -> [due, last size, closed]
+        self.rescan = False
+
+        self._watch(self.research_root, 'root')
+        for entry in os.scandir(self.research_root):
+            if entry.is_dir() and entry.name not in SKIP_DIRS:
+                self._watch_topic(entry.path)
+
+    @property
+    def folders(self):
+        """Number of Sources/ folders being watched"""
+        return sum(1 for kind, _ in self.watches.values() if kind == 'sources')
+
+    @property
+    def held(self):
+        """PDFs that are still being written"""
+        return set(self.settling)
+
+    def _watch(self, path, kind):
+        try:
+            wd = self.inotify.add_watch(path, WATCH_MASKS[kind])
+        except OSError as e:
+            if e.errno in (errno.ENOENT, errno.ENOTDIR):
+                return False
+            raise
+        self.watches[wd] = (kind, path)
+        return True
+
+    def _watch_topic(self, topic_dir):
+        """Watch a topic folder and its Sources/ folder (True if it has one)"""
+        if not self._watch(topic_dir, 'topic'):
+            return False
+        return self._watch(os.path.join(topic_dir, 'Sources'), 'sources')
+
+    def _handle(self, wd, mask, name, now):
+        if mask & IN_Q_OVERFLOW:
+            # Events were dropped: let the scan find whatever they were
+            self.rescan = True
+            return
+        if wd not in self.watches:
+            return
+        kind, path = self.watches[wd]
+        if mask & IN_IGNORED:
+            # Watched folder was removed
+            del self.watches[wd]
+            return
+
+        full_path = os.path.join(path, name)
+        if kind == 'root':
+            if mask & IN_ISDIR and name not in SKIP_DIRS and self._watch_topic(full_path):
+                # A topic folder arrived with a Sources/ folder that may hold PDFs
+                self.rescan = True
+        elif kind == 'topic':
+            if mask & IN_ISDIR and name == 'Sources' and self._watch(full_path, 'sources'):
+                self.rescan = True
+        elif not mask & IN_ISDIR and name.endswith('.pdf'):
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                self.settling.pop(full_path, None)
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                self.settling[full_path] = [now + CLOSED_SETTLE_SECONDS, None, True]
+            else:
+                self.settling[full_path] = [now + self.settle_seconds, None, False]
+
+    def _settled(self, now):
+        """PDFs whose writing has finished, removed from the settling set"""
+        settled = []
+        for path, entry in list(self.settling.items()):
+            due, size, closed = entry
+            if now < due:
+                continue
+            try:
+                current = os.stat(path).st_size
+            except FileNotFoundError:
+                del self.settling[path]
+                continue
+            if (closed and current > 0) or current == size:
+                del self.settling[path]
+                settled.append(path)
+            else:
+                entry[:] = [now + self.settle_seconds, current, False]
+        return settled
+
+    def wait(self):
+        """Block until there is something to scan for.
+
+        Returns:
+            Short description of why a scan is due
+        """
+        while True:
+            if self.rescan:
+                self.rescan = False
+                return "new Sources folder or missed events"
+            timeout = None
+            if self.settling:
+                timeout = max(0.0, min(entry[0] for entry in self.settling.values()) - time.monotonic())
+            events = self.inotify.read(timeout)
+            now = time.monotonic()
+            for wd, mask, name in events:
+                self._handle(wd, mask, name, now)
+            settled = self._settled(now)
+            if settled:
+                self.rescan = False
+                return f"{len(settled)} PDF(s) saved"
+
+    def close(self):
+        self.inotify.close()
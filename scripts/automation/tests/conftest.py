@@ -0,0 +1,6 @@
+"""The automation scripts are flat modules run from their own folder; import them the same way"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
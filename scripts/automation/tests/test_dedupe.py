@@ -0,0 +1,50 @@
+import sqlite3
+
+from dedupe import DB_FILE, DedupeIndex, Fingerprint, dedupe_topic
+
+PAPER = {'title': 'Continuous discovery habits of product teams', 'authors': 'Jane Doe, John Roe',
+         'url': 'http://arxiv.org/abs/2401.01234v1'}
+
+
+def counts(tmp_path):
+    conn = sqlite3.connect(tmp_path / DB_FILE)
+    try:
+        return tuple(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ('papers', 'bands'))
+    finally:
+        conn.close()
+
+
+def test_rewritten_topic_is_not_indexed_twice(tmp_path):
+    index = DedupeIndex(tmp_path)
+    index.add([PAPER], '2026-10-17')
+    before = counts(tmp_path)
+    index.add([PAPER], '2026-10-17')
+    index.close()
+    assert counts(tmp_path) == before == (1, len(Fingerprint(PAPER).bands))
+
+
+def test_same_paper_is_not_a_duplicate_of_itself(tmp_path):
+    index = DedupeIndex(tmp_path)
+    assert dedupe_topic(index, [PAPER], '2026-10-17') == ([PAPER], 0, 0)
+    assert dedupe_topic(index, [PAPER], '2026-10-17') == ([PAPER], 0, 0)
+
+
+def test_scholar_copy_of_an_earlier_digest_paper_is_dropped(tmp_path):
+    index = DedupeIndex(tmp_path)
+    index.add([PAPER], '2026-10-16')
+    scholar = {'title': 'Continuous Discovery Habits of Product Teams', 'authors': 'J Doe',
+               'url': 'https://example.org/paper'}
+    assert index.find(scholar) == (PAPER['url'], '2026-10-16')
+
+
+def test_rows_added_twice_before_the_fix_are_removed(tmp_path):
+    index = DedupeIndex(tmp_path)
+    index.add([PAPER], '2026-10-17')
+    index._conn.execute("DROP INDEX papers_url_date")
+    index._conn.commit()
+    index.add([PAPER], '2026-10-17')
+    index.close()
+    assert counts(tmp_path)[0] == 2
+
+    DedupeIndex(tmp_path).close()
+    assert counts(tmp_path) == (1, len(Fingerprint(PAPER).bands))
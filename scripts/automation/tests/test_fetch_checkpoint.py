@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+from fetch_checkpoint import FetchCheckpoint
+
+
+def test_no_checkpoint_to_resume(tmp_path):
+    assert not FetchCheckpoint(tmp_path).load()
+
+
+def test_resume_skips_finished_units_and_keeps_papers(tmp_path):
+    checkpoint = FetchCheckpoint(tmp_path)
+    checkpoint.start('2026-10-17', 1, weekly=True)
+    checkpoint.complete('arXiv', [('A', 'agents')], {'A': [{'url': 'u1'}]})
+
+    resumed = FetchCheckpoint(tmp_path)
+    assert resumed.load()
+    assert resumed.date == '2026-10-17'
+    assert resumed.weekly
+    assert resumed.is_done('arXiv', 'A', 'agents')
+    assert not resumed.is_done('Google Scholar', 'A', 'agents')
+    assert resumed.papers('arXiv') == {'A': [{'url': 'u1'}]}
+
+
+def test_complete_calls_on_complete(tmp_path):
+    checkpoint = FetchCheckpoint(tmp_path)
+    checkpoint.start('2026-10-17', 1, weekly=False)
+    calls = []
+    checkpoint.on_complete = lambda: calls.append(1)
+    checkpoint.complete('arXiv', [('A', 'agents')], {})
+    assert calls == [1]
+
+
+def test_written_sections_drop_their_papers(tmp_path):
+    checkpoint = FetchCheckpoint(tmp_path)
+    checkpoint.start('2026-10-17', 1, weekly=False)
+    checkpoint.complete('arXiv', [('A', 'agents'), ('B', 'teams')], {'A': [{'url': 'u1'}], 'B': [{'url': 'u2'}]})
+    checkpoint.record_section('A', [0, 100, 1])
+
+    resumed = FetchCheckpoint(tmp_path)
+    resumed.load()
+    assert resumed.sections == {'A': [0, 100, 1]}
+    assert resumed.papers('arXiv') == {'B': [{'url': 'u2'}]}
+
+
+def test_resumed_windows_are_extended_to_now(tmp_path):
+    checkpoint = FetchCheckpoint(tmp_path)
+    schedule = {'days': {'rare': 5}, 'max_results': {'arXiv': {'rare': 3}}}
+    checkpoint.start('2026-10-14', 1, weekly=False, backfill=['new'], backfill_days=90, schedule=schedule)
+    checkpoint.state['started'] = (datetime.now() - timedelta(days=3, hours=1)).isoformat()
+
+    assert checkpoint.arxiv_days() == 4
+    assert checkpoint.keyword_days('rare') == 8
+    assert checkpoint.keyword_days('daily') == 0
+    assert checkpoint.backfill_days() == 93
+    assert checkpoint.max_results('arXiv') == {'rare': 3}
+
+
+def test_finish_records_the_covered_window(tmp_path):
+    checkpoint = FetchCheckpoint(tmp_path)
+    checkpoint.start('2026-10-14', 1, weekly=True)
+    started = (datetime.now() - timedelta(days=3)).isoformat()
+    checkpoint.state['started'] = started
+    checkpoint.finish()
+
+    assert not (tmp_path / '.fetch_checkpoint.json').exists()
+    last_run = checkpoint.last_run()
+    assert last_run['date'] == '2026-10-14'
+    assert last_run['started'] == started
+    assert last_run['scholar_started'] == started
+    # A resumed run covered up to when it finished, not when it started
+    assert datetime.now() - datetime.fromisoformat(last_run['covered_until']) < timedelta(minutes=1)
+
+
+def test_finish_keeps_the_last_scholar_run_on_weekdays(tmp_path):
+    checkpoint = FetchCheckpoint(tmp_path)
+    checkpoint.start('2026-10-11', 1, weekly=True)
+    checkpoint.finish()
+    scholar_started = checkpoint.last_run()['scholar_started']
+
+    checkpoint.start('2026-10-12', 1, weekly=False)
+    checkpoint.finish()
+    assert checkpoint.last_run()['scholar_started'] == scholar_started
@@ -0,0 +1,102 @@
+import pytest
+
+from keyword_matcher import KeywordMatcher, compile_expression, parse_expression, prepare_record, stem, tokenize
+
+
+@pytest.mark.parametrize('singular, plural', [
+    ('image', 'images'),
+    ('case', 'cases'),
+    ('workplace', 'workplaces'),
+    ('interview', 'interviews'),
+    ('approach', 'approaches'),
+    ('process', 'processes'),
+    ('box', 'boxes'),
+    ('study', 'studies'),
+])
+def test_singular_and_plural_stem_alike(singular, plural):
+    assert stem(singular) == stem(plural)
+
+
+def test_s_endings_that_are_not_plurals_are_kept():
+    assert stem('focus') == 'focus'
+    assert stem('analysis') == 'analysis'
+    assert stem('process') == 'process'
+
+
+def test_tokenize_lowercases_and_stems():
+    assert tokenize('Use-Cases of LLMs') == ['use', 'cas', 'of', 'llm']
+
+
+def test_parse_expression_operators_and_fields():
+    tree = parse_expression('ti:"use case" AND NOT robot OR abs:(survey)')
+    assert tree == (
+        'OR',
+        ('ANDNOT', ('term', 'ti', ('use', 'cas')), ('term', 'all', ('robot',))),
+        ('term', 'abs', ('survey',)),
+    )
+
+
+def test_adjacent_terms_are_joined_with_and():
+    assert parse_expression('product discovery')[0] == 'AND'
+
+
+@pytest.mark.parametrize('expression', ['', '(a OR b', 'a OR', '"  "'])
+def test_parse_expression_rejects_malformed_lines(expression):
+    with pytest.raises(ValueError):
+        parse_expression(expression)
+
+
+@pytest.mark.parametrize('keyword, title', [
+    ('"use case"', 'Use cases for language models'),
+    ('"use cases"', 'A use case study'),
+    ('workplace', 'AI in workplaces'),
+    ('images', 'Image generation at scale'),
+])
+def test_plural_and_singular_phrases_match(keyword, title):
+    record = prepare_record({'title': title})
+    assert compile_expression(keyword)(record)
+
+
+def test_phrase_words_must_be_adjacent():
+    record = prepare_record({'title': 'Use of the case method'})
+    assert not compile_expression('"use case"')(record)
+
+
+def test_phrases_do_not_span_fields():
+    record = prepare_record({'title': 'A study of knowledge', 'abstract': 'work in teams'})
+    assert not compile_expression('"knowledge work"')(record)
+
+
+def test_field_prefix_restricts_the_match():
+    paper = {'title': 'Survey of agents', 'abstract': 'We interview product managers'}
+    matcher = KeywordMatcher(['ti:interview', 'abs:interview', 'interview'])
+    assert matcher.match(paper) == ['abs:interview', 'interview']
+
+
+def test_andnot_excludes():
+    matcher = KeywordMatcher(['agents ANDNOT robot'])
+    assert matcher.match({'title': 'Agents for teams'}) == ['agents ANDNOT robot']
+    assert matcher.match({'title': 'Robot agents'}) == []
+
+
+def test_id_only_expression_matches_the_url():
+    matcher = KeywordMatcher(['id:2401.01234', 'ti:interview'])
+    paper = {'title': 'Other', 'url': 'http://arxiv.org/abs/2401.01234'}
+    assert matcher.match(paper) == ['id:2401.01234']
+
+
+def test_all_excludes_the_identifier():
+    matcher = KeywordMatcher(['2401'])
+    assert matcher.match({'title': 'Other', 'url': 'http://arxiv.org/abs/2401.01234'}) == []
+
+
+def test_unparseable_lines_are_reported_and_never_match():
+    matcher = KeywordMatcher(['(broken', 'agents'])
+    assert list(matcher.errors) == ['(broken']
+    assert matcher.match({'title': 'Agents'}) == ['agents']
+
+
+def test_match_all_keeps_paper_order():
+    matcher = KeywordMatcher(['agents', 'survey'])
+    papers = [{'title': 'A survey'}, {'title': 'Nothing here'}, {'title': 'Agents survey'}]
+    assert matcher.match_all(papers) == [['survey'], [], ['agents', 'survey']]
@@ -0,0 +1,50 @@
+from keyword_matcher import KeywordMatcher, prepare_record
+from query_planner import attribute_keywords, combine_keywords, plan_queries
+
+
+def batch_for(keywords):
+    return plan_queries({'Topic': keywords}, 10)[0]
+
+
+def test_plan_queries_searches_shared_keywords_once():
+    batches = plan_queries({'A': ['agents', 'survey'], 'B': ['survey', 'teams']}, 10)
+    assert len(batches) == 1
+    batch = batches[0]
+    assert batch['keywords'] == ['agents', 'survey', 'teams']
+    assert batch['topics'] == {'agents': ['A'], 'survey': ['A', 'B'], 'teams': ['B']}
+    assert batch['query'] == '(agents) OR (survey) OR (teams)'
+    assert batch['max_results'] == 30
+
+
+def test_plan_queries_respects_the_keyword_limit():
+    batches = plan_queries({'A': [f'kw{i}' for i in range(5)]}, 10, max_keywords_per_query=2)
+    assert [batch['keywords'] for batch in batches] == [['kw0', 'kw1'], ['kw2', 'kw3'], ['kw4']]
+
+
+def test_plan_queries_respects_the_query_length():
+    batches = plan_queries({'A': ['a' * 30, 'b' * 30, 'c' * 30]}, 10, max_query_length=60)
+    assert all(len(batch['keywords']) == 1 for batch in batches)
+
+
+def test_single_keyword_is_not_parenthesized():
+    assert combine_keywords(['a AND b']) == 'a AND b'
+
+
+def test_attribute_keywords_keeps_batch_order():
+    batch = batch_for(['agents', 'survey', 'teams'])
+    record = prepare_record({'title': 'A survey of agents'})
+    matched = KeywordMatcher(batch['keywords']).match_prepared(record)
+    assert attribute_keywords(batch, matched, record) == ['agents', 'survey']
+
+
+def test_attribute_keywords_ignores_lines_outside_the_batch():
+    batch = batch_for(['agents', 'survey'])
+    record = prepare_record({'title': 'A survey of agents'})
+    assert attribute_keywords(batch, ['teams', 'survey'], record) == ['survey']
+
+
+def test_attribute_keywords_falls_back_to_the_most_overlapping_line():
+    batch = batch_for(['"product discovery" AND interviews', 'robot AND arm'])
+    # arXiv matched it, but the local matcher could not confirm either line
+    record = prepare_record({'title': 'Product discovery in startups'})
+    assert attribute_keywords(batch, [], record) == ['"product discovery" AND interviews']
@@ -0,0 +1,156 @@
+import json
+
+import pytest
+
+import research_queue
+from research_queue import RETRY_DELAY_SECONDS, ResearchQueue
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time() for leases and retry delays"""
+    now = [1_000_000.0]
+    monkeypatch.setattr(research_queue.time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def root(tmp_path):
+    sources = tmp_path / 'AI' / 'Sources'
+    sources.mkdir(parents=True)
+    for name, size in (('small.pdf', 10), ('large.pdf', 1000), ('medium.pdf', 100)):
+        (sources / name).write_bytes(b'x' * size)
+    return tmp_path
+
+
+def open_queue(root, **kwargs):
+    return ResearchQueue(root / '.research-data', research_root=root, **kwargs)
+
+
+PATHS = ['AI/Sources/small.pdf', 'AI/Sources/large.pdf', 'AI/Sources/medium.pdf']
+
+
+def test_claims_largest_first_by_default(root, clock):
+    queue = open_queue(root)
+    assert queue.enqueue(PATHS) == 3
+    assert [item['path'] for item in queue.claim('w', limit=0)] == [
+        'AI/Sources/large.pdf', 'AI/Sources/medium.pdf', 'AI/Sources/small.pdf'
+    ]
+
+
+def test_oldest_priority_follows_enqueue_order(root, clock):
+    queue = open_queue(root, priority='oldest')
+    queue.enqueue(PATHS)
+    assert [item['path'] for item in queue.claim('w', limit=0)] == PATHS
+
+
+def test_unknown_priority_is_rejected(root):
+    with pytest.raises(ValueError):
+        open_queue(root, priority='random')
+
+
+def test_waiting_paths_are_not_enqueued_twice(root, clock):
+    queue = open_queue(root)
+    queue.enqueue(PATHS)
+    assert queue.enqueue(PATHS) == 0
+    assert queue.waiting() == 3
+
+
+def test_claims_do_not_overlap_between_consumers(root, clock):
+    queue = open_queue(root)
+    other = open_queue(root)
+    queue.enqueue(PATHS)
+    first = queue.claim('w1', limit=2)
+    second = other.claim('w2', limit=2)
+    assert len(first) == 2 and len(second) == 1
+    assert not {item['id'] for item in first} & {item['id'] for item in second}
+    assert other.claim('w2') == []
+
+
+def test_ack_marks_done(root, clock):
+    queue = open_queue(root)
+    queue.enqueue(PATHS[:1])
+    item, = queue.claim('w')
+    assert queue.ack([item['id']]) == 1
+    assert queue.ack([item['id']]) == 0
+    assert queue.waiting() == 0
+    assert queue.status()['counts']['done'] == 1
+
+
+def test_done_items_can_be_queued_again(root, clock):
+    queue = open_queue(root)
+    queue.enqueue(PATHS[:1])
+    queue.ack([queue.claim('w')[0]['id']])
+    assert queue.enqueue(PATHS[:1]) == 1
+    assert queue.claim('w')[0]['attempts'] == 1
+
+
+def test_fail_retries_after_a_delay_then_gives_up(root, clock):
+    queue = open_queue(root, max_attempts=2)
+    queue.enqueue(PATHS[:1])
+    item, = queue.claim('w')
+    assert queue.fail([item['id']], error="timed out") == 1
+
+    assert queue.claim('w') == []
+    clock[0] += RETRY_DELAY_SECONDS
+    item, = queue.claim('w')
+    assert item['attempts'] == 2
+
+    queue.fail([item['id']], error="timed out again")
+    status = queue.status()
+    assert status['counts']['failed'] == 1
+    assert status['failed'][0]['error'] == "timed out again"
+
+
+def test_expired_lease_can_be_claimed_again(root, clock):
+    queue = open_queue(root, lease_minutes=10)
+    queue.enqueue(PATHS[:1])
+    item, = queue.claim('crashed')
+
+    clock[0] += 5 * 60
+    assert queue.claim('w') == []
+    assert queue.renew([item['id']]) == 1
+    clock[0] += 9 * 60
+    assert queue.claim('w') == []
+
+    clock[0] += 2 * 60
+    retried, = queue.claim('w')
+    assert retried['id'] == item['id']
+    assert retried['attempts'] == 2
+    # The crashed consumer's lease is gone
+    assert queue.ack([item['id']]) == 1
+
+
+def test_expired_lease_after_the_last_attempt_fails_the_item(root, clock):
+    queue = open_queue(root, lease_minutes=1, max_attempts=1)
+    queue.enqueue(PATHS[:1])
+    queue.claim('crashed')
+    clock[0] += 120
+    assert queue.claim('w') == []
+    assert queue.status()['failed'][0]['error'] == "lease expired"
+
+
+def test_retry_requeues_failed_items_with_their_plan(root, clock):
+    queue = open_queue(root, max_attempts=1)
+    queue.enqueue(PATHS[:1], plans={PATHS[0]: {'split': False}})
+    queue.fail([queue.claim('w')[0]['id']])
+    assert queue.retry() == 1
+    item, = queue.claim('w')
+    assert item['plan'] == {'split': False}
+
+
+def test_plans_can_be_added_after_queueing(root, clock):
+    queue = open_queue(root)
+    queue.enqueue(PATHS[:2])
+    assert queue.set_plans({PATHS[0]: {'split': True}, PATHS[1]: None}) == 1
+    plans = {item['path']: item['plan'] for item in queue.claim('w', limit=0)}
+    assert plans == {PATHS[0]: {'split': True}, PATHS[1]: None}
+
+
+def test_legacy_queue_file_is_migrated(root, clock):
+    data_dir = root / '.research-data'
+    data_dir.mkdir()
+    (data_dir / '.research-queue.json').write_text(json.dumps(PATHS))
+    queue = open_queue(root)
+    assert queue.waiting() == 3
+    assert (data_dir / '.research-queue.json.migrated').exists()
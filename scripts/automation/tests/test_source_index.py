@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+from monitor_sources import find_new_pdfs
+from source_index import SourceIndex, hash_file
+
+
+@pytest.fixture
+def root(tmp_path):
+    for topic in ('AI', 'Teams'):
+        (tmp_path / topic / 'Sources').mkdir(parents=True)
+        (tmp_path / topic / 'Notes').mkdir()
+    (tmp_path / 'daily-digests').mkdir()
+    return tmp_path
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SourceIndex(tmp_path / '.research-data')
+    yield index
+    index.close()
+
+
+def write_pdf(path, content):
+    path.write_bytes(b'%PDF-1.4\n' + content)
+    return path
+
+
+def process_all(root, index):
+    """Queue everything found, as monitor_sources.scan does"""
+    new_pdfs, _ = find_new_pdfs(root, index)
+    index.mark_processed([str(pdf) for pdf, *_ in new_pdfs], {str(pdf): pdf_id for pdf, _, pdf_id, _ in new_pdfs})
+    return new_pdfs
+
+
+def test_scan_reports_added_changed_and_removed(root, index):
+    paper = write_pdf(root / 'AI' / 'Sources' / 'paper.pdf', b'one')
+    delta = index.scan(root)
+    assert delta.added == [str(paper)]
+    assert index.unprocessed() == [str(paper)]
+
+    write_pdf(paper, b'one, edited')
+    assert index.scan(root).changed == [str(paper)]
+
+    paper.unlink()
+    delta = index.scan(root)
+    assert delta.removed == [str(paper)]
+    assert index.unprocessed() == []
+
+
+def test_processed_pdfs_are_not_reported_again(root, index):
+    write_pdf(root / 'AI' / 'Sources' / 'paper.pdf', b'one')
+    assert len(process_all(root, index)) == 1
+    assert process_all(root, index) == []
+
+
+def test_renamed_pdf_is_matched_to_the_processed_one(root, index):
+    original = write_pdf(root / 'AI' / 'Sources' / 'paper.pdf', b'one')
+    process_all(root, index)
+    (root / 'AI' / 'Notes' / 'paper.md').write_text('summary')
+
+    renamed = root / 'AI' / 'Sources' / 'renamed.pdf'
+    os.rename(original, renamed)
+    (pdf, has_summary, pdf_id, found), = process_all(root, index)
+    assert pdf == renamed
+    assert not has_summary
+    assert pdf_id == hash_file(renamed)
+    assert found == original
+
+
+def test_pdf_moved_to_another_topic_is_matched(root, index):
+    original = write_pdf(root / 'AI' / 'Sources' / 'paper.pdf', b'one')
+    process_all(root, index)
+    (root / 'AI' / 'Notes' / 'paper.md').write_text('summary')
+
+    moved = root / 'Teams' / 'Sources' / 'paper.pdf'
+    os.rename(original, moved)
+    (pdf, _, _, found), = process_all(root, index)
+    assert pdf == moved
+    assert found == original
+
+
+def test_copies_in_one_scan_point_at_the_first(root, index):
+    first = write_pdf(root / 'AI' / 'Sources' / 'a.pdf', b'same')
+    second = write_pdf(root / 'Teams' / 'Sources' / 'b.pdf', b'same')
+    other = write_pdf(root / 'Teams' / 'Sources' / 'c.pdf', b'different')
+    found = {pdf: original for pdf, _, _, original in process_all(root, index)}
+    assert found == {first: None, second: first, other: None}
+
+
+def test_legacy_processed_pdfs_are_hashed_only_when_sizes_match(root, index):
+    same_size = write_pdf(root / 'AI' / 'Sources' / 'a.pdf', b'aaaa')
+    other_size = write_pdf(root / 'AI' / 'Sources' / 'b.pdf', b'bbbbbbbb')
+    index.scan(root)
+    # Processed before content hashes were recorded
+    index.mark_processed([str(same_size), str(other_size)])
+    (root / 'AI' / 'Notes' / 'a.md').write_text('summary')
+
+    copy = write_pdf(root / 'Teams' / 'Sources' / 'a-copy.pdf', b'aaaa')
+    (pdf, _, _, found), = process_all(root, index)
+    assert (pdf, found) == (copy, same_size)
+    unhashed = [row[0] for row in index._conn.execute("SELECT path FROM processed WHERE sha256 IS NULL")]
+    assert unhashed == [str(other_size)]
+
+
+def test_held_pdfs_are_left_for_a_later_scan(root, index):
+    paper = write_pdf(root / 'AI' / 'Sources' / 'paper.pdf', b'one')
+    new_pdfs, _ = find_new_pdfs(root, index, hold={str(paper)})
+    assert new_pdfs == []
+    assert index.unprocessed() == [str(paper)]
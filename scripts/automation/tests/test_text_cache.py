@@ -0,0 +1,52 @@
+import random
+import string
+
+from text_cache import TextCache, sections, split_plan
+
+
+def noise(seed, length):
+    """Text that does not compress, so stored sizes are predictable"""
+    return ''.join(random.Random(seed).choices(string.ascii_letters, k=length))
+
+
+def result(pages):
+    return {'pages': pages, 'outline': [], 'error': None}
+
+
+def test_pages_round_trip(tmp_path):
+    cache = TextCache(tmp_path)
+    cache.put('a', result(['first page ' * 20, 'second page ' * 20]))
+    assert 'a' in cache
+    assert cache.document('a') == (2, [], None)
+    assert cache.pages('a', 1, 1) == ['second page ' * 20]
+
+
+def test_pdf_without_text_layer_is_flagged(tmp_path):
+    cache = TextCache(tmp_path)
+    cache.put('scan', result(['', '']))
+    assert cache.document('scan')[2] == "no text layer (scanned PDF?)"
+
+
+def test_least_recently_used_pdfs_are_evicted(tmp_path):
+    cache = TextCache(tmp_path, max_mb=0.01)
+    cache.put('old', result([noise(1, 8000)]))
+    cache.put('new', result([noise(2, 8000)]))
+    assert 'old' not in cache
+    assert 'new' in cache
+
+
+def test_pdf_larger_than_the_cache_is_kept_when_stored(tmp_path):
+    cache = TextCache(tmp_path, max_mb=0.001)
+    cache.put('huge', result([noise(3, 20000)]))
+    assert 'huge' in cache
+    assert cache.plan('huge', __file__) is not None
+
+
+def test_sections_fall_back_to_chunks_without_an_outline():
+    assert [(part['start_page'], part['end_page']) for part in sections([], 40)] == [(0, 14), (15, 29), (30, 39)]
+
+
+def test_small_pdf_is_one_section():
+    plan = split_plan('a', 1000, [1000] * 10, [], True)
+    assert not plan['split']
+    assert len(plan['sections']) == 1
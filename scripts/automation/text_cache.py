@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+"""
+Page text and outline of queued PDFs, extracted once ahead of summarizing.
+
+/generate-research-digest and /research-summary used to hand the raw PDF
+to the research-summarizer agent, after splitting a large one into
+section PDFs with split_pdf_by_sections.py, so every summary paid for
+parsing the PDF on the interactive path, and a large PDF was parsed once
+to split it and again by every section's agent.
+
+monitor_sources.py now extracts the text of each PDF it queues, page by
+page, together with its outline, using pypdf in a process pool. The
+result is stored in `.text_cache.db` in the data directory, keyed by the
+PDF's content hash (see source_index.py), with each page's text
+zlib-compressed in its own row so any page range can be read without
+decompressing the rest. The least recently used PDFs are evicted beyond
+`text_cache.max_mb`.
+
+Each queued PDF also gets a summary plan, stored with its queue entry
+(see research_queue.py): file size, page count, whether it has an
+outline, estimated text tokens, and the sections to summarize. PDFs of
+5 MB or more, or with more than about 50k tokens of text, are split by
+their outline (or into 15-page chunks); others are one section. The
+digest can then dispatch summarizers without opening the PDF again.
+
+The summarizing commands read slices from the command line:
+
+    python3 text_cache.py export "AI/Sources/paper.pdf" /tmp/research-text-123
+    python3 text_cache.py pages "AI/Sources/paper.pdf" 1-15
+    python3 text_cache.py extract [PDF...]    # extract now (default: queued PDFs)
+    python3 text_cache.py status
+
+`export` writes one text file per section (from the outline, or 15-page
+chunks; with --single, one file for the whole PDF) and prints the sections as JSON, in the same shape as
+split_pdf_by_sections.py. A PDF not in the cache yet is extracted on the
+spot. A PDF without a text layer (e.g. a scan) is reported as an error,
+and the commands fall back to handing over the PDF itself.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+import zlib
+from functools import partial
+from multiprocessing import Pool
+from pathlib import Path
+
+import yaml
+from pypdf import PdfReader
+
+DB_FILE = ".text_cache.db"
+
+DEFAULT_MAX_MB = 200
+
+# Pages per section when a PDF has no usable outline
+CHUNK_PAGES = 15
+
+# PDFs averaging less text per page than this have no usable text layer
+MIN_CHARS_PER_PAGE = 100
+
+# PDFs summarized in sections: 5 MB and up (as before), or this much text
+LARGE_PDF_BYTES = 5 * 1024 * 1024
+SPLIT_TOKENS = 50000
+
+CHARS_PER_TOKEN = 4
+
+
+def extract_pdf(path, text=True):
+    """Per-page text and flattened outline of a PDF (run in a worker process).
+
+    Args:
+        path: PDF path
+        text: Extract page text (False: pages are empty strings, for the
+            page count and outline only)
+
+    Returns:
+        Dict with pages (list of str), outline (list of dicts with title,
+        page and level) and error (None, or why extraction failed)
+    """
+    # Malformed PDFs are reported through the result, not pypdf's warnings
+    logging.getLogger('pypdf').setLevel(logging.ERROR)
+    try:
+        reader = PdfReader(path)
+        pages = []
+        for page in reader.pages:
+            if not text:
+                pages.append('')
+                continue
+            try:
+                pages.append(page.extract_text() or '')
+            except Exception:
+                pages.append('')
+        outline = []
+        try:
+            _flatten_outline(reader, reader.outline, 0, outline)
+        except Exception:
+            outline = []
+    except Exception as e:
+        return {'pages': [], 'outline': [], 'error': str(e)}
+    return {'pages': pages, 'outline': outline, 'error': None}
+
+
+def _extract_with_path(path, text):
+    return path, extract_pdf(path, text)
+
+
+def extract_pdfs(paths, workers=None, text=True):
+    """Yield (path, extract_pdf() result) for each path as it finishes.
+
+    Several paths are extracted in a process pool, in completion order.
+    Results are handed over one at a time rather than collected, so only
+    the PDFs being worked on are held in memory however many there are.
+    """
+    if len(paths) <= 1:
+        for path in paths:
+            yield _extract_with_path(path, text)
+        return
+    with Pool(workers) as pool:
+        yield from pool.imap_unordered(partial(_extract_with_path, text=text), paths)
+
+
+def _flatten_outline(reader, items, level, outline):
+    for item in items:
+        if isinstance(item, list):
+            _flatten_outline(reader, item, level + 1, outline)
+            continue
+        try:
+            page = reader.get_destination_page_number(item)
+        except Exception:
+            continue
+        if page is not None and page >= 0:
+            outline.append({'title': str(getattr(item, 'title', item)), 'page': page, 'level': level})
+
+
+def sections(outline, total_pages):
+    """Split pages into sections by top-level outline entries, else chunks.
+
+    Mirrors split_pdf_by_sections.py: fewer than 3 outline sections means
+    fixed 15-page chunks. Pages before the first outline entry (title
+    page, abstract, contents) form a section of their own.
+
+    Returns:
+        List of dicts with title, start_page and end_page (0-based, inclusive)
+    """
+    top = sorted((entry for entry in outline if entry['level'] == 0), key=lambda entry: entry['page'])
+    result = []
+    for i, entry in enumerate(top):
+        end = top[i + 1]['page'] - 1 if i + 1 < len(top) else total_pages - 1
+        end = max(entry['page'], end)
+        if entry['page'] < total_pages:
+            result.append({'title': entry['title'], 'start_page': entry['page'], 'end_page': min(end, total_pages - 1)})
+    if len(result) >= 3:
+        if result[0]['start_page'] > 0:
+            result.insert(0, {'title': "Front matter", 'start_page': 0, 'end_page': result[0]['start_page'] - 1})
+        return result
+    return [
+        {'title': f"Pages {start + 1}-{min(start + CHUNK_PAGES, total_pages)}",
+         'start_page': start, 'end_page': min(start + CHUNK_PAGES, total_pages) - 1}
+        for start in range(0, total_pages, CHUNK_PAGES)
+    ]
+
+
+def split_plan(sha256, size, page_chars, outline, text):
+    """How to summarize a PDF: its vitals and the sections to dispatch.
+
+    Args:
+        sha256: Content hash (the key into the text cache)
+        size: File size in bytes
+        page_chars: Characters of text on each page
+        outline: Flattened outline from extract_pdf()
+        text: Whether the PDF's text is in the cache and usable
+
+    Returns:
+        Dict with sha256, bytes, pages, has_outline, tokens (estimated,
+        None without text), text, split and sections (title, start_page,
+        end_page, tokens; a single section unless split)
+    """
+    total_pages = len(page_chars)
+    tokens = sum(page_chars) // CHARS_PER_TOKEN if text else None
+    split = size >= LARGE_PDF_BYTES or (tokens or 0) > SPLIT_TOKENS
+    if not total_pages:
+        parts = []
+    elif split:
+        parts = sections(outline, total_pages)
+    else:
+        parts = [{'title': "Full text", 'start_page': 0, 'end_page': total_pages - 1}]
+    for part in parts:
+        part['tokens'] = (
+            sum(page_chars[part['start_page']:part['end_page'] + 1]) // CHARS_PER_TOKEN if text else None
+        )
+    return {
+        'sha256': sha256,
+        'bytes': size,
+        'pages': total_pages,
+        'has_outline': bool(outline),
+        'tokens': tokens,
+        'text': text,
+        'split': split,
+        'sections': parts,
+    }
+
+
+class TextCache:
+    """Extracted page text and outlines keyed by PDF content hash, in SQLite"""
+
+    def __init__(self, data_dir, max_mb=DEFAULT_MAX_MB):
+        data_dir = Path(data_dir)
+        data_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._conn = sqlite3.connect(data_dir / DB_FILE, timeout=30)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " sha256 TEXT PRIMARY KEY,"
+            " pages INTEGER NOT NULL,"
+            " chars INTEGER NOT NULL,"
+            " outline TEXT NOT NULL,"
+            " error TEXT,"
+            " size INTEGER NOT NULL,"
+            " used REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " sha256 TEXT NOT NULL,"
+            " page INTEGER NOT NULL,"
+            " text BLOB NOT NULL,"
+            " PRIMARY KEY (sha256, page));"
+        )
+        self._conn.commit()
+
+    def __contains__(self, sha256):
+        return self._conn.execute("SELECT 1 FROM documents WHERE sha256 = ?", (sha256,)).fetchone() is not None
+
+    def extract(self, pdfs, workers=None):
+        """Extract and store the PDFs not in the cache yet.
+
+        Args:
+            pdfs: Dict mapping content hashes to PDF paths
+            workers: Worker processes (default: one per CPU)
+
+        Returns:
+            (PDFs extracted, pages extracted)
+        """
+        missing = {str(path): sha256 for sha256, path in pdfs.items() if sha256 not in self}
+        if not missing:
+            return 0, 0
+
+        # Each PDF is stored as soon as it is extracted
+        pages = 0
+        for path, result in extract_pdfs(list(missing), workers):
+            self.put(missing[path], result)
+            pages += len(result['pages'])
+        return len(missing), pages
+
+    def put(self, sha256, result):
+        """Store one extract_pdf() result"""
+        error = result['error']
+        chars = sum(len(text) for text in result['pages'])
+        if not error and chars < MIN_CHARS_PER_PAGE * max(1, len(result['pages'])):
+            error = "no text layer (scanned PDF?)"
+        blobs = [zlib.compress(text.encode('utf-8')) for text in result['pages']]
+        with self._conn:
+            self._conn.execute("DELETE FROM pages WHERE sha256 = ?", (sha256,))
+            self._conn.executemany(
+                "INSERT INTO pages (sha256, page, text) VALUES (?, ?, ?)",
+                ((sha256, page, blob) for page, blob in enumerate(blobs))
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (sha256, pages, chars, outline, error, size, used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (sha256, len(blobs), chars, json.dumps(result['outline']), error,
+                 sum(len(blob) for blob in blobs), time.time())
+            )
+            self._evict(keep=sha256)
+
+    def document(self, sha256):
+        """(pages, outline, error) of a cached PDF, or None"""
+        row = self._conn.execute(
+            "SELECT pages, outline, error FROM documents WHERE sha256 = ?", (sha256,)
+        ).fetchone()
+        if row is None:
+            return None
+        with self._conn:
+            self._conn.execute("UPDATE documents SET used = ? WHERE sha256 = ?", (time.time(), sha256))
+        return row[0], json.loads(row[1]), row[2]
+
+    def pages(self, sha256, start, end):
+        """Text of pages start..end (0-based, inclusive) of a cached PDF"""
+        return [
+            zlib.decompress(blob).decode('utf-8') for (blob,) in self._conn.execute(
+                "SELECT text FROM pages WHERE sha256 = ? AND page BETWEEN ? AND ? ORDER BY page",
+                (sha256, start, end)
+            )
+        ]
+
+    def plan(self, sha256, pdf_path):
+        """split_plan() of a cached PDF (None if it is not cached)"""
+        document = self.document(sha256)
+        if document is None:
+            return None
+        total_pages, outline, error = document
+        page_chars = [len(text) for text in self.pages(sha256, 0, total_pages - 1)]
+        try:
+            size = os.path.getsize(pdf_path)
+        except OSError:
+            return None
+        return split_plan(sha256, size, page_chars, outline, error is None)
+
+    def _evict(self, keep):
+        """Drop least recently used PDFs beyond max_mb, except keep (just stored).
+
+        A PDF whose text alone exceeds max_mb stays cached until the next
+        one is stored, so its plan and sections can still be read.
+        """
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM documents").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for sha256, size in self._conn.execute(
+            "SELECT sha256, size FROM documents WHERE sha256 != ? ORDER BY used", (keep,)
+        ).fetchall():
+            self._conn.execute("DELETE FROM pages WHERE sha256 = ?", (sha256,))
+            self._conn.execute("DELETE FROM documents WHERE sha256 = ?", (sha256,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def status(self):
+        documents, pages, size, failed = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(pages), 0), COALESCE(SUM(size), 0), COUNT(error) FROM documents"
+        ).fetchone()
+        return {'pdfs': documents, 'pages': pages, 'mb': round(size / 1024 / 1024, 1), 'without_text': failed}
+
+    def close(self):
+        self._conn.close()
+
+
+def get_text_cache(config):
+    research_root = Path(config['paths']['research_root']).expanduser().resolve()
+    return TextCache(
+        research_root / config['paths']['data'],
+        max_mb=config.get('text_cache', {}).get('max_mb', DEFAULT_MAX_MB)
+    )
+
+
+def prepare_queued(config, pdfs):
+    """Extract newly queued PDFs and plan their summaries (called by monitor_sources.py)
+
+    Each PDF is opened once, in a process pool. With the text cache
+    disabled only the page count and outline are read.
+
+    Args:
+        config: Configuration dictionary
+        pdfs: Dict mapping content hashes to PDF paths
+
+    Returns:
+        Dict mapping content hashes to split_plan() dicts
+    """
+    if not pdfs:
+        return {}
+    text_config = config.get('text_cache', {})
+    workers = text_config.get('workers')
+
+    if not text_config.get('enabled', True):
+        plans = {}
+        hashes = {str(path): sha256 for sha256, path in pdfs.items()}
+        for path, result in extract_pdfs(list(hashes), workers, text=False):
+            sha256 = hashes[path]
+            if result['error'] is None and os.path.exists(path):
+                plans[sha256] = split_plan(sha256, os.path.getsize(path), [0] * len(result['pages']),
+                                           result['outline'], False)
+        return plans
+
+    start = time.time()
+    cache = get_text_cache(config)
+    try:
+        extracted, pages = cache.extract(pdfs, workers)
+        plans = {sha256: cache.plan(sha256, path) for sha256, path in pdfs.items()}
+    finally:
+        cache.close()
+    if extracted:
+        print(f"✓ Extracted text of {extracted} PDF(s), {pages} page(s), in {time.time() - start:.1f}s", flush=True)
+    return {sha256: plan for sha256, plan in plans.items() if plan is not None}
+
+
+def _lookup(config, cache, pdf_path):
+    """Content hash of a PDF, extracting it into the cache if needed"""
+    from source_index import SourceIndex
+
+    research_root = Path(config['paths']['research_root']).expanduser().resolve()
+    pdf_path = (research_root / pdf_path).resolve()
+    index = SourceIndex(research_root / config['paths']['data'])
+    try:
+        sha256 = index.content_hashes([str(pdf_path)]).get(str(pdf_path))
+    finally:
+        index.close()
+    if sha256 is None:
+        sys.exit(json.dumps({'error': f"PDF not found: {pdf_path}", 'sections': []}))
+    cache.extract({sha256: pdf_path})
+    return sha256, pdf_path
+
+
+def _format_pages(texts, first_page):
+    return ''.join(f"\n--- Page {first_page + i + 1} ---\n\n{text.strip()}\n" for i, text in enumerate(texts))
+
+
+def export_sections(cache, sha256, pdf_path, output_dir, single=False, parts=None):
+    """Write one text file per section, in the shape of split_pdf_by_sections.py
+
+    With single, the whole PDF goes to one file; parts (e.g. the sections
+    of a split_plan()) overrides the sections from the outline.
+    """
+    document = cache.document(sha256)
+    if document is None:
+        return {'error': "not in the text cache", 'sections': []}
+    total_pages, outline, error = document
+    if error:
+        return {'error': error, 'sections': []}
+    os.makedirs(output_dir, exist_ok=True)
+    if parts is None and single:
+        parts = [{'title': "Full text", 'start_page': 0, 'end_page': total_pages - 1}]
+    elif parts is None:
+        parts = sections(outline, total_pages)
+    section_files = []
+    for i, section in enumerate(parts):
+        safe_title = "".join(c for c in section['title'] if c.isalnum() or c in (' ', '-', '_')).strip()[:50]
+        output_path = os.path.join(output_dir, f"{i:03d}_{safe_title}.txt")
+        texts = cache.pages(sha256, section['start_page'], section['end_page'])
+        with open(output_path, 'w') as f:
+            f.write(f"# {section['title']} (pages {section['start_page'] + 1}-{section['end_page'] + 1} of {pdf_path.name})\n")
+            f.write(_format_pages(texts, section['start_page']))
+        section_files.append({
+            'title': section['title'],
+            'start_page': section['start_page'],
+            'end_page': section['end_page'],
+            'file_path': output_path,
+            'page_count': section['end_page'] - section['start_page'] + 1,
+        })
+    return {
+        'source_pdf': str(pdf_path),
+        'total_pages': total_pages,
+        'section_count': len(section_files),
+        'output_dir': output_dir,
+        'sections': section_files,
+    }
+
+
+def load_config():
+    config_path = Path.home() / ".claude" / "research-system-config" / "config.yaml"
+    with open(config_path, 'r') as f:
+        return yaml.safe_load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read and fill the extracted PDF text cache.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help="Write a PDF's text as one file per section")
+    export.add_argument('pdf', help="PDF path (absolute or relative to research_root)")
+    export.add_argument('output_dir')
+    export.add_argument('--single', action='store_true', help="One file for the whole PDF instead of one per section")
+    pages = commands.add_parser('pages', help="Print the text of a page range")
+    pages.add_argument('pdf')
+    pages.add_argument('range', help="1-based page range, e.g. 1-15 or 7")
+    extract = commands.add_parser('extract', help="Extract PDFs now (default: every PDF waiting in the queue)")
+    extract.add_argument('pdfs', nargs='*')
+    commands.add_parser('status', help="Cached PDFs, pages and size")
+    args = parser.parse_args()
+
+    config = load_config()
+    cache = get_text_cache(config)
+    try:
+        if args.command == 'status':
+            print(json.dumps(cache.status(), indent=2))
+        elif args.command == 'extract':
+            from research_queue import get_queue
+            from source_index import SourceIndex
+
+            research_root = Path(config['paths']['research_root']).expanduser().resolve()
+            paths = args.pdfs
+            if not paths:
+                queue = get_queue(config)
+                try:
+                    paths = queue.waiting_paths()
+                finally:
+                    queue.close()
+            paths = [str((research_root / path).resolve()) for path in paths]
+            index = SourceIndex(research_root / config['paths']['data'])
+            try:
+                hashes = index.content_hashes(paths)
+            finally:
+                index.close()
+            extracted, page_count = cache.extract({sha256: path for path, sha256 in hashes.items()},
+                                                  config.get('text_cache', {}).get('workers'))
+            print(json.dumps({'extracted': extracted, 'pages': page_count}, indent=2))
+        else:
+            sha256, pdf_path = _lookup(config, cache, args.pdf)
+            if args.command == 'export':
+                print(json.dumps(export_sections(cache, sha256, pdf_path, args.output_dir, args.single), indent=2))
+            else:
+                first, _, last = args.range.partition('-')
+                first = int(first)
+                print(_format_pages(cache.pages(sha256, first - 1, int(last or first) - 1), first - 1))
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()